@@ -0,0 +1,90 @@
+"""
+aem_helper/$/$
+
+Copyright (c) .year Vic Kelson, Kelson Engineering LLC
+All Rights Reserved
+
+Benchmark: per-element memory and construction time of a layer of wells in four layouts:
+the former __dict__-based layout (one list of tuples and one set of attribute objects per
+element), slotted elements that share one LayerStore, slotted elements built without a
+store (each keeps its geometry in a private array), and a ColumnarLayer, which keeps the
+geometry and the attributes of the whole layer in typed columns and only creates element
+objects while the model input is written. Both realistic wells (unique names and pumping
+rates) and wells with highly repetitive attributes are measured.
+
+The goal was 3x less memory per element. At 1M wells, slotted elements reach 1.7x with
+unique attributes and 2.25x with repeated ones, because each element still owns its name,
+its pumping rate and its offset into the store as separate Python objects; elements
+without a store take 320 and 264 bytes each. The columnar layer meets the goal, at 5.7x
+(70 bytes per well) and 5.9x (58 bytes per well).
+
+    python benchmarks/bench_elements.py [n_elements]
+
+"""
+
+import sys
+import time
+import tracemalloc
+
+from aem_helper.aem_element import LayerStore
+from aem_helper.aem_io import ColumnarLayer
+from aem_helper.modaem.well import Wl0Element
+
+
+class DictWell:
+    """ The element layout before LayerStore: a __dict__, a list of tuples, and no interning """
+
+    def __init__(self, xy, attrs, config=None):
+        self.element_id = None
+        self.xy = list(xy[0:1])
+        self.name = str(attrs.get("NAME", ""))
+        self.qw = float(eval(attrs.get("QW"), config))
+        self.rw = float(eval(attrs.get("RW"), config))
+
+
+def shapes(n: int, repeated: bool):
+    """
+    Wells with unique names and pumping rates, as in real well inventories, or (if
+    `repeated`) with blank names and only ten distinct rates
+    """
+    for i in range(n):
+        if repeated:
+            yield [(1000.0 + i, 2000.0 + i % 977)], {"NAME": "", "QW": f"{100.0 * (i % 10)}", "RW": "0.5"}
+        else:
+            yield [(1000.0 + i, 2000.0 + i % 977)], {"NAME": f"W{i}", "QW": f"{100.0 + 0.37 * i}", "RW": "0.5"}
+
+
+def measure(n: int, build, repeated: bool) -> tuple[float, float]:
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    layer = build(shapes(n, repeated))
+    elapsed = time.perf_counter() - t0
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del layer
+    return elapsed, current
+
+
+def main(n: int) -> None:
+    print(f"{'values':>10} {'layout':>10} {'n':>10} {'time (s)':>10} {'us/elem':>10} {'bytes/elem':>12}")
+    for repeated in (False, True):
+        store = LayerStore()
+        cases = [("dict", lambda rdr: [DictWell(xy, attrs, {}) for xy, attrs in rdr]),
+                 ("slotted", lambda rdr: [Wl0Element(xy, attrs, {}, store) for xy, attrs in rdr]),
+                 ("private", lambda rdr: [Wl0Element(xy, attrs, {}) for xy, attrs in rdr]),
+                 ("columnar", ColumnarLayer)]
+        results = {}
+        values = "repeated" if repeated else "unique"
+        for label, build in cases:
+            elapsed, memory = measure(n, build, repeated)
+            results[label] = (elapsed, memory)
+            print(f"{values:>10} {label:>10} {n:>10} {elapsed:>10.3f} {1e6 * elapsed / n:>10.2f} {memory / n:>12.1f}")
+        for label in ("slotted", "columnar"):
+            reduction = results["dict"][1] / results[label][1]
+            print(f"{values:>10} {label} memory reduction: {reduction:.2f}x "
+                  f"({'meets' if reduction >= 3.0 else 'misses'} the 3x target), "
+                  f"time reduction: {results['dict'][0] / results[label][0]:.2f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,47 @@
+"""
+aem_helper/$/$
+
+Copyright (c) .year Vic Kelson, Kelson Engineering LLC
+All Rights Reserved
+
+Benchmark: eager vs. lazy attribute evaluation, for a run that reads a regional layer of
+wells and keeps only the ones inside a small local tile.
+
+    python benchmarks/bench_lazy.py [n_wells]
+
+"""
+
+import sys
+import time
+
+from aem_helper.aem_tiling import grid_tiles
+from aem_helper.modaem.model import Model
+
+
+def wells(n: int):
+    return [([(float(i % 1000), float(i // 1000))], {"NAME": f"W{i}", "QW": "Q * 1.5", "RW": "RW0"})
+            for i in range(n)]
+
+
+def run(shapes, lazy: bool) -> tuple[float, int]:
+    model = Model(0.0, 10.0, 1.0, 0.2)
+    model.config = {"Q": 100.0, "RW0": 0.5}
+    model.lazy = lazy
+    t0 = time.perf_counter()
+    model.read_element_shapefile("wl0", shapes)
+    # Keep a 100 x 100 tile of the 1000-wide layer
+    local, = model.tile(grid_tiles(0.0, 0.0, 100.0, 100.0, 1, 1))
+    text = "".join(local.build())
+    return time.perf_counter() - t0, len(local.elements)
+
+
+def main(n: int) -> None:
+    shapes = wells(n)
+    print(f"{'mode':>8} {'n':>10} {'kept':>8} {'time (s)':>10}")
+    for lazy in (False, True):
+        elapsed, kept = run(shapes, lazy)
+        print(f"{'lazy' if lazy else 'eager':>8} {n:>10} {kept:>8} {elapsed:>10.3f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
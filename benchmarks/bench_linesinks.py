@@ -0,0 +1,67 @@
+"""
+aem_helper/$/$
+
+Copyright (c) .year Vic Kelson, Kelson Engineering LLC
+All Rights Reserved
+
+Benchmark: rendering a stream network of Ls2 linesinks, in batches from a RaggedStore
+vs. element by element with one f-string per (x, y) vertex tuple.
+
+    python benchmarks/bench_linesinks.py [n_vertices] [vertices_per_string]
+
+"""
+
+import sys
+import time
+
+from aem_helper.aem_io import INDENT
+from aem_helper.modaem.model import Model
+
+
+def streams(n_vertices: int, per_string: int):
+    shapes = []
+    for k in range(n_vertices // per_string):
+        xy = [(float(i), float(k) + 0.001 * i) for i in range(per_string)]
+        shapes.append((xy, {"NAME": f"S{k}", "HEAD": f"{100.0 - 0.01 * k}", "COND": "2.5", "WIDTH": "10.0",
+                            "DEPTH": "1.0"}))
+    return shapes
+
+
+def render_per_vertex(model: Model) -> str:
+    """
+    The element-by-element rendering, for comparison
+    """
+    parts = [f"ls2 {len(model.elements)}\n"]
+    for el in model.elements:
+        xy = el.xy
+        parts.append(f"{INDENT}str {len(xy)} {el.conductance} {el.width} {el.depth} {el.element_id}\n")
+        for x, y in xy:
+            parts.append(f"{INDENT}{INDENT}({x}, {y}) {el.head}\n")
+    parts.append("end\n")
+    return "".join(parts)
+
+
+def main(n_vertices: int, per_string: int) -> None:
+    shapes = streams(n_vertices, per_string)
+    model = Model(0.0, 10.0, 1.0, 0.2)
+    t0 = time.perf_counter()
+    model.read_element_shapefile("ls2", shapes)
+    t_read = time.perf_counter() - t0
+    print(f"{len(model.elements)} strings, {n_vertices} vertices, read in {t_read:.2f} s")
+
+    t0 = time.perf_counter()
+    batched = "".join(model.build())
+    t_batched = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    per_vertex = render_per_vertex(model)
+    t_per_vertex = time.perf_counter() - t0
+    assert batched == f"aem\n{per_vertex}eod\n"
+
+    print(f"{'rendering':>12} {'time (s)':>10} {'vertices/s':>12}")
+    for label, t in (("batched", t_batched), ("per-vertex", t_per_vertex)):
+        print(f"{label:>12} {t:>10.2f} {n_vertices / t:>12.0f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 100)
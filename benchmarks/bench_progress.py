@@ -0,0 +1,43 @@
+"""
+aem_helper/$/$
+
+Copyright (c) .year Vic Kelson, Kelson Engineering LLC
+All Rights Reserved
+
+Benchmark: the overhead of progress events on reading and writing a layer of wells.
+
+    python benchmarks/bench_progress.py [n_wells]
+
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from aem_helper.aem_events import Progress
+from aem_helper.modaem.model import Model
+
+
+def run(shapes, file_name: str, progress: Progress | None) -> float:
+    model = Model(0.0, 10.0, 1.0, 0.2)
+    model.progress = progress
+    t0 = time.perf_counter()
+    model.read_element_shapefile("wl0", shapes)
+    model.write(file_name)
+    return time.perf_counter() - t0
+
+
+def main(n: int) -> None:
+    shapes = [([(float(i), 0.0)], {"NAME": "", "QW": "100.0", "RW": "0.5"}) for i in range(n)]
+    events = []
+    with tempfile.TemporaryDirectory() as tmpdirname:
+        file_name = os.path.join(tmpdirname, "model.aem")
+        print(f"{'progress':>10} {'n':>10} {'time (s)':>10} {'events':>8}")
+        for label, progress in (("off", None), ("on", Progress([events.append]))):
+            elapsed = min(run(shapes, file_name, progress) for _ in range(3))
+            print(f"{label:>10} {n:>10} {elapsed:>10.3f} {len(events) // 3 if progress else 0:>8}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
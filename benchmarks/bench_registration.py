@@ -0,0 +1,61 @@
+"""
+aem_helper/$/$
+
+Copyright (c) .year Vic Kelson, Kelson Engineering LLC
+All Rights Reserved
+
+Benchmark: element registration throughput for add_element(), the batch add_elements(),
+and threaded ElementProducers.
+
+    python benchmarks/bench_registration.py [n_elements] [n_threads]
+
+"""
+
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from aem_helper.modaem.model import Model
+
+
+def make_elements(model: Model, n: int):
+    return model.make_elements("wl0", [([(float(i), 0.0)], {"QW": "1.0", "RW": "0.5"}) for i in range(n)])
+
+
+def main(n: int, n_threads: int) -> None:
+    model = Model(0.0, 10.0, 1.0, 0.2)
+    elements = make_elements(model, n)
+    print(f"{'method':>24} {'n':>10} {'elements/s':>14}")
+
+    t0 = time.perf_counter()
+    for el in elements:
+        model.add_element(el)
+    print(f"{'add_element':>24} {n:>10} {n / (time.perf_counter() - t0):>14.0f}")
+
+    model = Model(0.0, 10.0, 1.0, 0.2)
+    t0 = time.perf_counter()
+    model.add_elements(elements)
+    print(f"{'add_elements':>24} {n:>10} {n / (time.perf_counter() - t0):>14.0f}")
+
+    model = Model(0.0, 10.0, 1.0, 0.2)
+    chunk = n // n_threads
+    producers = [model.producer() for _ in range(n_threads)]
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(n_threads) as pool:
+        for k, p in enumerate(producers):
+            pool.submit(p.add_elements, elements[k * chunk: (k + 1) * chunk])
+    model.commit_producers()
+    label = f"{n_threads} producers + commit"
+    print(f"{label:>24} {n:>10} {chunk * n_threads / (time.perf_counter() - t0):>14.0f}")
+
+    model = Model(0.0, 10.0, 1.0, 0.2)
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(n_threads) as pool:
+        for k in range(n_threads):
+            pool.submit(lambda k=k: [model.add_element(el) for el in elements[k * chunk: (k + 1) * chunk]])
+    label = f"{n_threads} threads add_element"
+    print(f"{label:>24} {n:>10} {chunk * n_threads / (time.perf_counter() - t0):>14.0f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000, int(sys.argv[2]) if len(sys.argv) > 2 else 4)
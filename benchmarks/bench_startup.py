@@ -0,0 +1,71 @@
+"""
+aem_helper/$/$
+
+Copyright (c) .year Vic Kelson, Kelson Engineering LLC
+All Rights Reserved
+
+Benchmark: start-up time of the aem-helper command-line entry point. Reports the
+cumulative import time of the main modules, as measured by `python -X importtime`, and
+the wall time of `aem-helper --help` and of `aem-helper inspect` on a cached snapshot,
+against a bare interpreter.
+
+    python benchmarks/bench_startup.py [n_runs]
+
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from aem_helper.aem_snapshot import write_snapshot
+from aem_helper.modaem.model import Model
+
+MODULES = ["aem_helper.cli", "aem_helper.aem_io", "aem_helper.aem_model", "aem_helper.modaem.model"]
+
+
+def import_time(module: str) -> float:
+    """
+    Returns the cumulative import time of a module in ms, from `python -X importtime`
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True, check=True)
+    for line in result.stderr.splitlines():
+        fields = line.split("|")
+        if len(fields) == 3 and fields[2].strip() == module:
+            return int(fields[1]) / 1000.0
+    return float("nan")
+
+
+def wall_time(args: list[str], n_runs: int) -> float:
+    """
+    Returns the best wall time of a command in ms
+    """
+    best = float("inf")
+    for _ in range(n_runs):
+        t0 = time.perf_counter()
+        subprocess.run(args, capture_output=True, check=True)
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000.0
+
+
+def main(n_runs: int) -> None:
+    print(f"{'module':>28} {'import (ms)':>12}")
+    for module in MODULES:
+        print(f"{module:>28} {min(import_time(module) for _ in range(n_runs)):>12.1f}")
+
+    model = Model(0.0, 10.0, 1.0, 0.2)
+    model.read_element_shapefile("wl0", [([(float(i), 0.0)], {"QW": "1.0", "RW": "0.5"}) for i in range(10000)])
+    with tempfile.TemporaryDirectory() as tmpdirname:
+        snapshot = os.path.join(tmpdirname, "model.snap")
+        write_snapshot(model, snapshot)
+        print(f"\n{'command':>28} {'wall (ms)':>12}")
+        for label, args in (("python -c pass", [sys.executable, "-c", "pass"]),
+                            ("aem-helper --help", [sys.executable, "-m", "aem_helper", "--help"]),
+                            ("aem-helper inspect", [sys.executable, "-m", "aem_helper", "inspect", snapshot])):
+            print(f"{label:>28} {wall_time(args, n_runs):>12.1f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
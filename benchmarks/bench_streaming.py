@@ -0,0 +1,62 @@
+"""
+aem_helper/$/$
+
+Copyright (c) .year Vic Kelson, Kelson Engineering LLC
+All Rights Reserved
+
+Benchmark: peak memory of the in-memory build vs. the two-pass streaming build.
+
+    python benchmarks/bench_streaming.py [n_wells ...]
+
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+
+from aem_helper.modaem.model import Model
+
+
+class SyntheticWells:
+    """ A re-iterable layer of n wells that is never held in memory """
+
+    def __init__(self, n: int):
+        self.n = n
+
+    def __iter__(self):
+        for i in range(self.n):
+            yield [(float(i), float(i % 1000))], {"NAME": "", "QW": "100.0", "RW": "0.5"}
+
+    def __len__(self):
+        return self.n
+
+
+def measure(n: int, streaming: bool) -> tuple[float, float]:
+    model = Model(0.0, 10.0, 1.0, 0.2)
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    with open(os.devnull, "w") as f:
+        if streaming:
+            model.add_layer("wl0", SyntheticWells(n))
+            f.writelines(model.build_streaming())
+        else:
+            model.read_element_shapefile("wl0", iter(SyntheticWells(n)))
+            f.writelines(model.build())
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 2**20
+
+
+def main(sizes: list[int]) -> None:
+    print(f"{'n_wells':>10} {'mode':>10} {'time (s)':>10} {'peak (MiB)':>12}")
+    for n in sizes:
+        for streaming in (False, True):
+            elapsed, peak = measure(n, streaming)
+            mode = "streaming" if streaming else "in-memory"
+            print(f"{n:>10} {mode:>10} {elapsed:>10.3f} {peak:>12.2f}")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [10_000, 100_000])
@@ -0,0 +1,54 @@
+"""
+aem_helper/$/$
+
+Copyright (c) .year Vic Kelson, Kelson Engineering LLC
+All Rights Reserved
+
+Benchmark: repeated interpolation of head grids to head targets, as in a calibration loop.
+The first evaluation computes the lookup weights; later ones reuse them.
+
+    python benchmarks/bench_targets.py [n_targets] [n_iterations]
+
+"""
+
+import random
+import sys
+import time
+from array import array
+
+from aem_helper.aem_post import HeadGrid, HeadTargets
+from aem_helper.modaem.target import HeadTargetElement
+
+
+def main(n_targets: int, n_iterations: int) -> None:
+    rng = random.Random(1)
+    targets = HeadTargets([HeadTargetElement([(rng.uniform(0.0, 5000.0), rng.uniform(0.0, 5000.0))],
+                                             {"NAME": f"T{i}", "HEAD": "100.0", "GROUP": f"G{i % 10}"}, {})
+                           for i in range(n_targets)])
+    nx = ny = 501
+    grids = [HeadGrid(nx, ny, 0.0, 0.0, 10.0, 10.0, array("d", [100.0 + k * 1.0e-6 + it for k in range(nx * ny)]))
+             for it in range(2)]
+
+    t0 = time.perf_counter()
+    targets.lookup(grids[0])
+    t_lookup = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for it in range(n_iterations):
+        targets.interpolate(grids[it % 2])
+    t_interpolate = (time.perf_counter() - t0) / n_iterations
+
+    t0 = time.perf_counter()
+    for it in range(n_iterations):
+        targets.statistics(grids[it % 2])
+    t_statistics = (time.perf_counter() - t0) / n_iterations
+
+    print(f"{n_targets} targets, {nx} x {ny} grid, {n_iterations} iterations")
+    print(f"{'step':>14} {'time (ms)':>10} {'us/target':>10}")
+    for label, t in (("lookup", t_lookup), ("interpolate", t_interpolate), ("statistics", t_statistics)):
+        print(f"{label:>14} {t * 1000.0:>10.2f} {t * 1.0e6 / n_targets:>10.3f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 200)
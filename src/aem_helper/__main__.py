@@ -0,0 +1,15 @@
+"""
+aem_helper/$/$
+
+Copyright (c) .year Vic Kelson, Kelson Engineering LLC
+All Rights Reserved
+
+Runs the aem-helper command-line entry point, as `python -m aem_helper`
+
+"""
+
+import sys
+
+from .cli import main
+
+sys.exit(main())
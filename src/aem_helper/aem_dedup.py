@@ -0,0 +1,233 @@
+"""
+aem_helper/$/$
+
+Copyright (c) .year Vic Kelson, Kelson Engineering LLC
+All Rights Reserved
+
+Module aem_helper/dedup
+
+Detection and merging of duplicate elements. Merged data sources routinely contain
+duplicate wells at the same location and line strings that were digitized twice; both
+make the ModAEM solution singular or ill-conditioned. Points, and the endpoints of
+strings, are quantized to a tolerance and hashed, and only the neighboring cells are
+searched, so that all the searches run in expected O(N).
+
+"""
+
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass, field
+from math import floor, hypot
+from typing import Any, Callable, Iterable
+
+from .aem_io import ShapeXy, ValidationError
+from .aem_element import BaseElement
+
+MergeRule = str | Callable[[list[Any]], Any]    # "first", "last", "sum", "fail" or a function
+
+
+class DuplicateElementError(ValidationError):
+    ...
+
+
+@dataclass
+class DedupReport:
+    """
+    Describes the outcome of deduplicate()
+    """
+    coincident_points: list[list[BaseElement]] = field(default_factory=list)  # Groups of coincident points
+    duplicate_strings: list[list[BaseElement]] = field(default_factory=list)  # Groups of identical strings
+    removed_vertices: int = 0                   # Near-duplicate vertices dropped from strings
+    removed: list[BaseElement] = field(default_factory=list)                  # Elements merged away
+
+    def summary(self) -> str:
+        return (f"{len(self.coincident_points)} groups of coincident points, "
+                f"{len(self.duplicate_strings)} groups of duplicate strings, "
+                f"{len(self.removed)} elements merged, "
+                f"{self.removed_vertices} near-duplicate vertices removed")
+
+
+def quantize(x: float, y: float, tolerance: float) -> tuple[int, int]:
+    """
+    Returns the grid cell of size `tolerance` that contains (x, y)
+    """
+    return floor(x / tolerance), floor(y / tolerance)
+
+
+def _group_pairs(n: int, pairs: Iterable[tuple[int, int]]) -> list[list[int]]:
+    """
+    Returns the connected groups (of size two or more) of the index pairs, ordered by their
+    first member, using a union-find.
+    """
+    parent = list(range(n))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, j in pairs:
+        ri, rj = find(i), find(j)
+        if ri != rj:
+            parent[max(ri, rj)] = min(ri, rj)
+    groups = {}
+    for i in range(n):
+        groups.setdefault(find(i), []).append(i)
+    return [g for g in groups.values() if len(g) > 1]
+
+
+def find_coincident_points(elements: list[BaseElement], tolerance: float) -> list[list[BaseElement]]:
+    """
+    Finds groups of single-vertex elements of the same type that lie within `tolerance` of
+    each other. Each point is hashed to a grid cell of size `tolerance`, and only the
+    neighboring cells are searched.
+    :param elements: The elements to search; multi-vertex elements are ignored
+    :param tolerance: The coincidence distance
+    :return: The groups of coincident elements, in their original order
+    """
+    points = [el for el in elements if len(el.xy) == 1]
+    xy = [el.xy[0] for el in points]
+    grid = {}
+    for i, (x, y) in enumerate(xy):
+        grid.setdefault((type(points[i]),) + quantize(x, y, tolerance), []).append(i)
+
+    def pairs():
+        for (element_type, cx, cy), members in grid.items():
+            for dx in (-1, 0, 1):
+                for dy in (-1, 0, 1):
+                    for j in grid.get((element_type, cx + dx, cy + dy), ()):
+                        xj, yj = xy[j]
+                        for i in members:
+                            if i < j and hypot(xy[i][0] - xj, xy[i][1] - yj) <= tolerance:
+                                yield i, j
+
+    return [[points[i] for i in group] for group in _group_pairs(len(points), pairs())]
+
+
+def remove_duplicate_vertices(xy: ShapeXy, tolerance: float) -> ShapeXy:
+    """
+    Drops consecutive vertices that lie within `tolerance` of the previous retained vertex.
+    """
+    result = xy[:1]
+    for x, y in xy[1:]:
+        x0, y0 = result[-1]
+        if hypot(x - x0, y - y0) > tolerance:
+            result.append((x, y))
+    return result
+
+
+def _same_vertices(a: ShapeXy, b: ShapeXy, tolerance: float) -> bool:
+    """
+    Returns True if the strings have the same number of vertices, each within `tolerance`
+    of its counterpart
+    """
+    return len(a) == len(b) and all(hypot(xa - xb, ya - yb) <= tolerance for (xa, ya), (xb, yb) in zip(a, b))
+
+
+def find_duplicate_strings(elements: list[BaseElement], tolerance: float) -> list[list[BaseElement]]:
+    """
+    Finds groups of multi-vertex elements of the same type whose vertices coincide within
+    `tolerance`, in the same or in reversed order. Each string is hashed by the grid cells
+    of its two endpoints, and only the strings with an endpoint in the neighboring cells are
+    compared, vertex by vertex.
+    :param elements: The elements to search; single-vertex elements are ignored
+    :param tolerance: The coincidence distance
+    :return: The groups of duplicate elements, in their original order
+    """
+    strings = [el for el in elements if len(el.xy) > 1]
+    xy = [el.xy for el in strings]
+    grid = {}                                   # {(type, cell): [(string, True if the cell is its start)]}
+    for i, vertices in enumerate(xy):
+        grid.setdefault((type(strings[i]),) + quantize(*vertices[0], tolerance), []).append((i, True))
+        grid.setdefault((type(strings[i]),) + quantize(*vertices[-1], tolerance), []).append((i, False))
+
+    def pairs():
+        for i, vertices in enumerate(xy):
+            cx, cy = quantize(*vertices[0], tolerance)
+            for dx in (-1, 0, 1):
+                for dy in (-1, 0, 1):
+                    for j, start in grid.get((type(strings[i]), cx + dx, cy + dy), ()):
+                        if i < j and _same_vertices(vertices, xy[j] if start else xy[j][::-1], tolerance):
+                            yield i, j
+
+    return [[strings[i] for i in group] for group in _group_pairs(len(strings), pairs())]
+
+
+def _merge_values(name: str, values: list[Any], rule: MergeRule) -> Any:
+    if callable(rule):
+        return rule(values)
+    if rule == "first":
+        return values[0]
+    if rule == "last":
+        return values[-1]
+    if rule == "sum":
+        return sum(values)
+    if rule == "fail":
+        raise DuplicateElementError(f"Duplicate elements found with {name} = {values}")
+    raise ValueError(f"Unknown merge rule [{rule}] for attribute {name}")
+
+
+def merge_group(group: list[BaseElement],
+                rules: dict[str, MergeRule] | None = None,
+                default_rule: MergeRule = "first") -> BaseElement:
+    """
+    Merges a group of duplicate elements into the first one, and returns it.
+    :param group: The duplicate elements
+    :param rules: A {attribute_name: rule} dict, e.g. {"qw": "sum"}
+    :param default_rule: The rule for attributes that are not in `rules`
+    :return: The first element of the group, with its attributes merged
+    """
+    rules = rules or {}
+    keep = group[0]
+    for name in type(keep).attribute_names():
+        values = [getattr(el, name, None) for el in group]
+        setattr(keep, name, _merge_values(name, values, rules.get(name, default_rule)))
+    return keep
+
+
+def deduplicate(elements: list[BaseElement],
+                tolerance: float = 1.0e-6,
+                rules: dict[str, MergeRule] | None = None,
+                default_rule: MergeRule = "first") -> tuple[list[BaseElement], DedupReport]:
+    """
+    Removes near-duplicate vertices from strings, then merges coincident points and duplicate
+    strings according to the merge rules. The first element of each group is retained.
+
+    A string's cleaned vertices are appended to its LayerStore, and its old coordinates stay
+    in the store, which is shared by the layer. Deduplicating a few strings costs little;
+    to release the space after cleaning many of them, copy the retained elements into a new
+    store with BaseElement.copy().
+
+    Example: to sum the pumping rates of coincident wells and keep the other attributes of
+    the first well in each group:
+
+        elements, report = deduplicate(model.elements, tolerance=0.01, rules={"qw": "sum"})
+
+    :param elements: The elements to deduplicate
+    :param tolerance: Coordinates closer than this are treated as identical
+    :param rules: A {attribute_name: rule} dict; a rule is "first", "last", "sum", "fail" or
+        a function that receives the list of values and returns the merged value
+    :param default_rule: The rule for attributes that are not in `rules`
+    :return: The retained elements, in their original order, and a DedupReport
+    """
+    report = DedupReport()
+    for el in elements:
+        xy = el.xy
+        if len(xy) > 1:
+            cleaned = remove_duplicate_vertices(xy, tolerance)
+            if len(cleaned) < len(xy):
+                report.removed_vertices += len(xy) - len(cleaned)
+                el.xy = cleaned
+
+    report.coincident_points = find_coincident_points(elements, tolerance)
+    report.duplicate_strings = find_duplicate_strings(elements, tolerance)
+    removed = set()
+    for group in report.coincident_points + report.duplicate_strings:
+        merge_group(group, rules, default_rule)
+        report.removed.extend(group[1:])
+        removed.update(id(el) for el in group[1:])
+
+    logging.info(f"Deduplication: {report.summary()}")
+    return [el for el in elements if id(el) not in removed], report
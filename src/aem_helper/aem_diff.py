@@ -0,0 +1,226 @@
+"""
+aem_helper/$/$
+
+Copyright (c) .year Vic Kelson, Kelson Engineering LLC
+All Rights Reserved
+
+Module aem_helper/diff
+
+Structural comparison of two model input files, or of two Model objects. Each element
+record is reduced to a canonical form (its block type, its geometry quantized to a
+tolerance, and its attribute fields, ignoring the element_id) and hashed, so the
+comparison takes O(N) time, does not depend on the order of the elements, and keeps only
+the hashes of the first input and the counts of the unmatched records of the second (not
+their text, beyond the records reported in detail) in memory.
+
+Records are recognized from the structure of the input: a block starts with a line such
+as "wl0 3" and ends with "end"; a point record is a line that starts with "(x, y)"; and a
+string record is a "str <n> ..." line followed by its n vertex lines. In element blocks,
+the last field of a record's first line is the element_id.
+
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from hashlib import blake2b
+from typing import Callable, Generator, Iterable, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .aem_model import BaseModel
+
+# Blocks whose records carry an element_id
+ELEMENT_BLOCKS = frozenset(["wl0", "as0", "ls0", "ls1", "ls2", "in0", "bdy"])
+# Blocks that contain records and end with an "end" line
+BLOCKS = ELEMENT_BLOCKS | {"aqu"}
+
+
+@dataclass
+class Record:
+    """
+    The canonical form of one element record
+    """
+    block: str                  # The block keyword, e.g. "wl0"
+    key: bytes                  # Hash of the block and the quantized geometry
+    value: bytes                # Hash of the attribute fields
+    text: str                   # The record as written
+
+
+@dataclass
+class DiffReport:
+    """
+    The differences between two models, as counts by block type
+    """
+    added: dict[str, int] = field(default_factory=dict)
+    removed: dict[str, int] = field(default_factory=dict)
+    modified: dict[str, int] = field(default_factory=dict)
+    details: list[tuple[str, str, str]] = field(default_factory=list)   # (change, block, record text)
+
+    @property
+    def identical(self) -> bool:
+        return not (self.added or self.removed or self.modified)
+
+    def summary(self) -> str:
+        lines = []
+        for block in sorted(set(self.added) | set(self.removed) | set(self.modified)):
+            lines.append(f"{block}: {self.added.get(block, 0)} added, {self.removed.get(block, 0)} removed, "
+                         f"{self.modified.get(block, 0)} modified")
+        return "\n".join(lines) if lines else "identical"
+
+
+def _split_point(line: str, tolerance: float) -> tuple[tuple[int, int] | None, list[str]]:
+    """
+    Splits a line into its quantized "(x, y)" pair (if any) and its remaining fields
+    """
+    start = line.find("(")
+    if start < 0:
+        return None, line.split()
+    end = line.index(")", start)
+    x, y = line[start + 1: end].split(",")
+    point = round(float(x) / tolerance), round(float(y) / tolerance)
+    return point, line[:start].split() + line[end + 1:].split()
+
+
+def _hash(*parts) -> bytes:
+    return blake2b(repr(parts).encode(), digest_size=16).digest()
+
+
+def _lines(chunks: Iterable[str]) -> Generator[str, None, None]:
+    for chunk in chunks:
+        yield from chunk.splitlines()
+
+
+def parse_records(chunks: Iterable[str], tolerance: float = 1.0e-6) -> Generator[Record, None, None]:
+    """
+    Yields the canonical records of model input text.
+    :param chunks: The input text, as lines or as larger pieces that end with a newline
+    :param tolerance: Coordinates are quantized to this interval before hashing
+    """
+    blocks = []
+    pending = None                  # [fields, vertices, vertex fields, remaining count, text] of a string
+
+    def record(head_fields: list[str], geometry: list, vertex_fields: list, text: list[str]) -> Record:
+        block = blocks[-1] if blocks else ""
+        if block in ELEMENT_BLOCKS and head_fields:
+            head_fields = head_fields[:-1]
+        return Record(block, _hash(block, geometry), _hash(head_fields, vertex_fields), "\n".join(text))
+
+    for line in _lines(chunks):
+        fields = line.split()
+        if not fields:
+            continue
+        if pending is not None:
+            point, rest = _split_point(line, tolerance)
+            pending[1].append(point)
+            pending[2].append(rest)
+            pending[4].append(line)
+            pending[3] -= 1
+            if pending[3] == 0:
+                yield record(pending[0], pending[1], pending[2], pending[4])
+                pending = None
+            continue
+        keyword = fields[0].lower()
+        if keyword == "end":
+            if blocks:
+                blocks.pop()
+        elif keyword in ("aem", "eod"):
+            continue
+        elif keyword in BLOCKS:
+            blocks.append(keyword)
+        elif keyword == "str":
+            pending = [fields, [], [], int(fields[1]), [line]]
+            if pending[3] == 0:
+                yield record(pending[0], [], [], pending[4])
+                pending = None
+        else:
+            point, rest = _split_point(line, tolerance)
+            yield record(rest, [point], [], [line])
+
+
+def file_records(file_name: str, tolerance: float = 1.0e-6) -> Generator[Record, None, None]:
+    """
+    Yields the canonical records of a model input file, reading it line by line
+    """
+    with open(file_name) as f:
+        yield from parse_records(f, tolerance)
+
+
+def model_records(model: BaseModel, tolerance: float = 1.0e-6) -> Generator[Record, None, None]:
+    """
+    Yields the canonical records of a model's input
+    """
+    yield from parse_records(model.build(), tolerance)
+
+
+def diff_records(old: Callable[[], Iterable[Record]],
+                 new: Iterable[Record],
+                 max_details: int = 100) -> DiffReport:
+    """
+    Compares two streams of records. Records whose geometry matches but whose attributes
+    differ are reported as modified.
+    :param old: A function that returns the records of the old model; it is called a second
+        time to collect the text of removed and modified records, if `max_details` > 0
+    :param new: The records of the new model; they are read once, and only the first
+        `max_details` changed records are kept in memory
+    :param max_details: The maximum number of changed records to report in detail
+    :return: A DiffReport
+    """
+    index = {}
+    for r in old():
+        index.setdefault(r.key, (r.block, []))[1].append(r.value)
+
+    # Only the block and the count of the unmatched new records of each key are kept, with
+    # the text of the first `max_details` of them and their position among those of their key
+    added, new_details = {}, []
+    for r in new:
+        entry = index.get(r.key)
+        if entry is not None and r.value in entry[1]:
+            entry[1].remove(r.value)
+        else:
+            block, i = added.get(r.key, (r.block, 0))
+            added[r.key] = block, i + 1
+            if len(new_details) < max_details:
+                new_details.append((i, r))
+
+    report = DiffReport()
+
+    def count(counts: dict[str, int], block: str, n: int = 1) -> None:
+        if n > 0:
+            counts[block] = counts.get(block, 0) + n
+
+    old_details = {}
+    for key, (block, values) in index.items():
+        n_new = added.get(key, (block, 0))[1]
+        count(report.modified, block, min(len(values), n_new))
+        count(report.removed, block, len(values) - n_new)
+        if values:
+            old_details[key] = len(values)
+    for key, (block, n_new) in added.items():
+        count(report.added, block, n_new - len(index.get(key, (None, ()))[1]))
+    for i, r in new_details:
+        n_old = len(index.get(r.key, (None, ()))[1])
+        report.details.append(("modified" if i < n_old else "added", r.block, r.text))
+
+    if old_details and max_details > 0:
+        for r in old():
+            if len(report.details) >= max_details:
+                break
+            if old_details.get(r.key, 0) > 0 and r.value in index[r.key][1]:
+                old_details[r.key] -= 1
+                change = "was" if r.key in added else "removed"
+                report.details.append((change, r.block, r.text))
+    return report
+
+
+def diff_files(old_name: str, new_name: str, tolerance: float = 1.0e-6, max_details: int = 100) -> DiffReport:
+    """
+    Compares two model input files, streaming over both of them.
+    """
+    return diff_records(lambda: file_records(old_name, tolerance), file_records(new_name, tolerance), max_details)
+
+
+def diff_models(old: BaseModel, new: BaseModel, tolerance: float = 1.0e-6, max_details: int = 100) -> DiffReport:
+    """
+    Compares two models.
+    """
+    return diff_records(lambda: model_records(old, tolerance), model_records(new, tolerance), max_details)
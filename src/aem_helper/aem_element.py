@@ -9,9 +9,11 @@ $
 """
 
 from __future__ import annotations
+import copy
 from abc import abstractmethod
-from typing import Generator, Any, List
-from itertools import chain, filter
+from array import array
+from typing import Generator, Any, Iterable, List
+from itertools import chain
 
 from .aem_io import ShapeXy, ShapeAttrs, INDENT
 
@@ -27,6 +29,7 @@ class Builder:
     default, the base-class behavior will yield up nothing; simply override header(), body(), and
     trailer() in derived classes.
     """
+    __slots__ = ()
 
     def header(self) -> Generator[str, None, None]:
         """
@@ -53,23 +56,276 @@ class Builder:
         for TimML or TTim, it would yield text that contains Python code.
         """
         yield from filter(lambda z: z is not None,
-                          chain([self.header(), self.body(), self.trailer()]))
+                          chain(self.header(), self.body(), self.trailer()))
+
+
+_MISSING = object()                     # Marks an attribute that a row of a LayerStore lacks
+
+
+class LayerStore:
+    """
+    Shared storage for the elements read from one layer. The (x, y) pairs of all the elements
+    are packed into a single array of doubles, and each element keeps only an offset and a
+    vertex count into it. Attribute values that repeat across the layer (e.g. the same well
+    radius or a blank name) are interned, so that the elements share a single object. The
+    intern table holds at most `max_interned` values; once it is full, new values are no
+    longer added, so a high-cardinality attribute (e.g. unique pumping rates) cannot make the
+    table cost more memory than it saves.
+
+    In a lazy store, the elements' raw attributes are also kept, as one column per attribute,
+    and each element evaluates them with process_attrs() only when one of its attributes is
+    first accessed (at the latest, when it is rendered). Elements that are filtered out,
+    deduplicated or never written skip the evaluation cost entirely; on the other hand,
+    attribute errors are reported on first access rather than when the layer is read.
+    """
+    __slots__ = ("coords", "values", "max_interned", "lazy", "columns", "n_rows", "config")
+
+    def __init__(self, lazy: bool = False, max_interned: int = 1024) -> None:
+        """
+        :param lazy: If True, the elements defer process_attrs() until first access
+        :param max_interned: The maximum number of distinct values in the intern table
+        """
+        self.coords = array("d")
+        self.values = {}
+        self.max_interned = max_interned
+        self.lazy = lazy
+        self.columns = {}
+        self.n_rows = 0
+        self.config = None
+
+    def add_xy(self, xy: ShapeXy) -> tuple[int, int]:
+        """
+        Appends the (x, y) pairs to the store.
+        :param xy: A list of (x, y) tuples
+        :return: The (offset, length) of the pairs in the store, in vertices
+        """
+        offset = len(self.coords) // 2
+        for x, y in xy:
+            self.coords.append(x)
+            self.coords.append(y)
+        return offset, len(self.coords) // 2 - offset
+
+    def get_xy(self, offset: int, length: int) -> ShapeXy:
+        """
+        Returns the (x, y) pairs stored at the given offset.
+        :param offset: The offset of the first vertex
+        :param length: The number of vertices
+        :return: A list of (x, y) tuples
+        """
+        c = self.coords[2 * offset: 2 * (offset + length)]
+        return list(zip(c[0::2], c[1::2]))
+
+    def intern(self, value: Any) -> Any:
+        """
+        Returns the shared instance of `value` for this layer.
+        :param value: A hashable attribute value
+        :return: An object that is equal to `value`
+        """
+        # Keyed by type as well, so that e.g. 1 and 1.0 are not merged
+        key = type(value), value
+        shared = self.values.get(key, _MISSING)
+        if shared is not _MISSING:
+            return shared
+        if len(self.values) < self.max_interned:
+            self.values[key] = value
+        return value
+
+    def add_attrs(self, attrs: ShapeAttrs, config: dict[str, Any]) -> int:
+        """
+        Appends the raw attributes of an element to the store's columns.
+        :param attrs: A {name: value} dict for attributes read from model input
+        :param config: The configuration for evaluating the attributes; it is shared by the layer
+        :return: The row number of the attributes
+        """
+        row = self.n_rows
+        self.n_rows += 1
+        self.config = config
+        for key, value in attrs.items():
+            column = self.columns.get(key)
+            if column is None:
+                column = self.columns[key] = [_MISSING] * row
+            column.append(self.intern(value))
+        if len(attrs) < len(self.columns):
+            for column in self.columns.values():
+                if len(column) < self.n_rows:
+                    column.append(_MISSING)
+        return row
+
+    def get_attrs(self, row: int) -> ShapeAttrs:
+        """
+        Returns the raw attributes stored at the given row.
+        """
+        return {key: column[row] for key, column in self.columns.items() if column[row] is not _MISSING}
+
+    def get_attr(self, row: int, key: str, default: Any = None) -> Any:
+        """
+        Returns one raw attribute stored at the given row, or the default if the row lacks it.
+        """
+        column = self.columns.get(key)
+        value = _MISSING if column is None else column[row]
+        return default if value is _MISSING else value
+
+
+class _PrivateCoords(array):
+    """
+    The geometry of an element that was built without a LayerStore, e.g. a streamed element:
+    its own packed array of doubles, with the LayerStore methods that elements use, so that
+    such an element costs no more than one small array.
+    """
+    __slots__ = ()
+    lazy = False
+
+    def __new__(cls) -> _PrivateCoords:
+        return super().__new__(cls, "d")
+
+    @property
+    def coords(self) -> array:
+        return self
+
+    def add_xy(self, xy: ShapeXy) -> tuple[int, int]:
+        # The element's only geometry is replaced
+        del self[:]
+        for x, y in xy:
+            self.append(x)
+            self.append(y)
+        return 0, len(self) // 2
+
+    def get_xy(self, offset: int, length: int) -> ShapeXy:
+        return list(zip(self[0::2], self[1::2]))
+
+    @staticmethod
+    def intern(value: Any) -> Any:
+        return value
+
+    def __reduce__(self):
+        return _private_coords, (self.tobytes(),)
+
+
+def _private_coords(data: bytes) -> _PrivateCoords:
+    coords = _PrivateCoords()
+    coords.frombytes(data)
+    return coords
 
 
 class BaseElement(Builder):
     """
     Base class for aem_helper elements.
+
+    Elements are slotted; derived classes must declare the attributes that they set in
+    process_attrs() in their own __slots__. The geometry is held in a LayerStore that is
+    usually shared by all the elements of a layer; `xy` materializes it as a list of
+    (x, y) tuples, and `coords` is a zero-copy view of the packed x0, y0, x1, y1, ... values.
     """
-    def __init__(self, xy: ShapeXy, attrs: ShapeAttrs, config: dict[str, Any]):
+    __slots__ = ("element_id", "_store", "_offset", "_length", "_row")
+
+    def __init__(self, xy: ShapeXy, attrs: ShapeAttrs, config: dict[str, Any],
+                 store: LayerStore | None = None):
         """
         Initialize the element. The Model object containing the Element will set the element_id.
         :param xy: Geometry of the Element
         :param attrs: Attributes of the Element from model input
         :param config: Configuration dict for the model
+        :param store: The LayerStore shared by the elements of the layer; if omitted, the
+            element keeps its geometry in a private array
         """
         self.element_id = None
+        self._row = None
+        self._store = _PrivateCoords() if store is None else store
         self.xy = self.validate_xy(xy)
-        self.process_attrs(attrs, config)
+        if self._store.lazy:
+            self._row = self._store.add_attrs(attrs, config)
+        else:
+            self.process_attrs(attrs, config)
+
+    def __getattr__(self, name: str) -> Any:
+        # Called only for attributes that are not set, i.e. before a lazy element is evaluated
+        if not name.startswith("_") and self._row is not None:
+            self.evaluate()
+            return getattr(self, name)
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+    @property
+    def evaluated(self) -> bool:
+        """
+        False for a lazy element whose attributes have not been evaluated yet
+        """
+        return self._row is None
+
+    def evaluate(self) -> None:
+        """
+        Evaluates the attributes of a lazy element, if they have not been evaluated yet
+        """
+        row, self._row = self._row, None
+        if row is not None:
+            try:
+                self.process_attrs(self._store.get_attrs(row), self._store.config)
+            except BaseException:
+                # Keep the element lazy, so that the next access raises the same error
+                self._row = row
+                raise
+
+    def raw_attr(self, key: str, default: Any = None) -> Any:
+        """
+        Returns an attribute of a lazy element as it was read from model input, without
+        evaluating the element; an evaluated element returns the default.
+        """
+        row = self._row
+        return default if row is None else self._store.get_attr(row, key, default)
+
+    @property
+    def xy(self) -> ShapeXy:
+        """
+        The (x, y) pairs of the element
+        """
+        return self._store.get_xy(self._offset, self._length)
+
+    @xy.setter
+    def xy(self, xy: ShapeXy) -> None:
+        self._offset, self._length = self._store.add_xy(xy or [])
+
+    @property
+    def coords(self) -> memoryview:
+        """
+        A read-only view of the element's packed x0, y0, x1, y1, ... values in the layer store.
+        The store cannot grow while a view is held, so release it before adding more elements.
+        """
+        return memoryview(self._store.coords)[2 * self._offset: 2 * (self._offset + self._length)].toreadonly()
+
+    def intern(self, value: Any) -> Any:
+        """
+        Returns the layer's shared instance of an attribute value; use it in process_attrs()
+        for attributes that are likely to repeat across a layer.
+        """
+        return self._store.intern(value)
+
+    def copy(self, store: LayerStore | None = None) -> BaseElement:
+        """
+        Returns a copy of the element, without an element_id, for use in another model. The
+        attribute values are shared, and the geometry is copied into `store`.
+        :param store: The LayerStore for the copy; if omitted, the copy keeps its geometry in a
+            private array
+        """
+        self.evaluate()
+        xy = self.xy
+        el = copy.copy(self)
+        el.element_id = None
+        el._store = _PrivateCoords() if store is None else store
+        el.xy = xy
+        return el
+
+    @classmethod
+    def attribute_names(cls) -> list[str]:
+        """
+        Returns the names of the public attributes that the element class sets in
+        process_attrs(), i.e. the public __slots__ declared by the derived classes.
+        """
+        names = []
+        for klass in reversed(cls.__mro__):
+            if issubclass(klass, BaseElement) and klass is not BaseElement:
+                slots = klass.__dict__.get("__slots__", ())
+                names.extend(name for name in ((slots,) if isinstance(slots, str) else slots)
+                             if not name.startswith("_"))
+        return names
 
     def set_element_id(self, element_id: int) -> None:
         """
@@ -105,12 +361,31 @@ class BaseElementCollection(Builder):
     Contains a list of elements, all the same type, for generating model input.
     """
     element_type: type[BaseElement]
-    elements: List[BaseElement]
+    elements: List[BaseElement] | Iterable[BaseElement]
+    _count: int | None = None                   # Element count for a streamed collection
 
     def __init__(self, source_elements: list[BaseElement]):
         self.elements = [element for element in source_elements if type(element) is self.element_type]
 
+    @classmethod
+    def from_stream(cls, count: int, elements: Iterable[BaseElement]) -> BaseElementCollection:
+        """
+        Creates a collection that renders its elements straight from an iterable, rather than
+        from a list held in memory. Because collection headers (e.g. "wl0 N") need the element
+        count before any element is written, the count must be determined up front, typically
+        by a cheap counting pass over the source layers.
+        :param count: The number of elements that `elements` will yield
+        :param elements: An iterable of elements, consumed exactly once by body()
+        :return: The streamed collection
+        """
+        collection = cls.__new__(cls)
+        collection.elements = elements
+        collection._count = count
+        return collection
+
     def __len__(self) -> int:
+        if self._count is not None:
+            return self._count
         return len(self.elements)
 
 
@@ -0,0 +1,151 @@
+"""
+aem_helper/$/$
+
+Copyright (c) .year Vic Kelson, Kelson Engineering LLC
+All Rights Reserved
+
+Module aem_helper/events
+
+Structured progress events for long-running builds. A model with a Progress object (see
+BaseModel.progress) reports each layer that it reads, each collection that it renders and
+each file that it writes, as "start", "progress" and "end" events, to any number of
+callbacks, e.g. a job monitor or the CLI's progress display.
+
+Progress events inside a loop are throttled: the clock is read only every `check_every`
+items, and an event is emitted at most every `interval` seconds, so tracking costs little
+more than a counter per element.
+
+"""
+
+from __future__ import annotations
+
+import sys
+import time
+from dataclasses import dataclass
+from typing import Callable, Generator, Iterable, TextIO, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass
+class ProgressEvent:
+    """
+    One progress report
+    """
+    kind: str                       # "start", "progress" or "end"
+    phase: str                      # "read", "render" or "write"
+    layer: str                      # The element name, or the file name for "write"
+    count: int                      # Elements so far (bytes, for "write")
+    total: int | None               # The expected count, if it is known
+    elapsed: float                  # Seconds since the start of the phase
+    bytes_written: int = 0          # Bytes written so far, for "write" events
+
+    @property
+    def rate(self) -> float:
+        """
+        Elements (or bytes) per second
+        """
+        return self.count / self.elapsed if self.elapsed > 0.0 else 0.0
+
+    @property
+    def eta(self) -> float | None:
+        """
+        The estimated seconds remaining in the phase, if the total is known
+        """
+        if self.total is None or self.count == 0:
+            return None
+        return (self.total - self.count) / self.rate if self.rate > 0.0 else None
+
+    def __str__(self) -> str:
+        done = f"{self.count}/{self.total}" if self.total is not None else f"{self.count}"
+        text = f"{self.phase} {self.layer} {self.kind}: {done} in {self.elapsed:.1f} s ({self.rate:,.0f}/s)"
+        if self.kind == "progress" and self.eta is not None:
+            text += f", {self.eta:.0f} s remaining"
+        return text
+
+
+ProgressCallback = Callable[[ProgressEvent], None]
+
+
+class Progress:
+    """
+    Dispatches progress events to callbacks. Callbacks are called from the thread that does
+    the work, e.g. a thread that reads a layer through an ElementProducer.
+    """
+
+    def __init__(self, callbacks: Iterable[ProgressCallback] = (),
+                 interval: float = 0.5, check_every: int = 1024):
+        """
+        :param callbacks: Functions that receive each ProgressEvent
+        :param interval: The minimum number of seconds between "progress" events of a phase
+        :param check_every: The number of items between readings of the clock
+        """
+        self.callbacks = list(callbacks)
+        self.interval = interval
+        self.check_every = check_every
+
+    def subscribe(self, callback: ProgressCallback) -> None:
+        self.callbacks.append(callback)
+
+    def emit(self, kind: str, phase: str, layer: str, count: int, total: int | None, start: float,
+             bytes_written: int = 0) -> None:
+        event = ProgressEvent(kind, phase, layer, count, total, time.monotonic() - start, bytes_written)
+        for callback in self.callbacks:
+            callback(event)
+
+    def track(self, items: Iterable[T], phase: str, layer: str,
+              total: int | None = None) -> Generator[T, None, None]:
+        """
+        Yields the items, emitting a "start" event before the first one, throttled "progress"
+        events, and an "end" event once they are exhausted
+        :param items: The items being processed, e.g. elements
+        :param phase: "read", "render" or "write"
+        :param layer: The element name
+        :param total: The number of items, if it is known
+        """
+        start = time.monotonic()
+        self.emit("start", phase, layer, 0, total, start)
+        next_check, next_time = self.check_every, start + self.interval
+        count = 0
+        for item in items:
+            yield item
+            count += 1
+            if count == next_check:
+                next_check += self.check_every
+                now = time.monotonic()
+                if now >= next_time:
+                    next_time = now + self.interval
+                    self.emit("progress", phase, layer, count, total, start)
+        self.emit("end", phase, layer, count, total, start)
+
+    def write(self, f: TextIO, chunks: Iterable[str], file_name: str) -> None:
+        """
+        Writes text chunks to a file, counting the bytes written (the input files are ASCII,
+        so one character is one byte) and emitting throttled "write" events. The count is
+        local to the call, so models may write concurrently through one Progress.
+        """
+        start = time.monotonic()
+        self.emit("start", "write", file_name, 0, None, start)
+        next_check, next_time = self.check_every, start + self.interval
+        n, bytes_written = 0, 0
+        for chunk in chunks:
+            f.write(chunk)
+            bytes_written += len(chunk)
+            n += 1
+            if n == next_check:
+                next_check += self.check_every
+                now = time.monotonic()
+                if now >= next_time:
+                    next_time = now + self.interval
+                    self.emit("progress", "write", file_name, bytes_written, None, start, bytes_written)
+        self.emit("end", "write", file_name, bytes_written, None, start, bytes_written)
+
+
+def print_progress(stream: TextIO = sys.stderr) -> ProgressCallback:
+    """
+    Returns a callback that prints the events, one per line, e.g. for the CLI
+    """
+    def callback(event: ProgressEvent) -> None:
+        if event.kind != "start":
+            print(event, file=stream, flush=True)
+    return callback
@@ -0,0 +1,388 @@
+"""
+aem_helper/$/$
+
+Copyright (c) .year Vic Kelson, Kelson Engineering LLC
+All Rights Reserved
+
+Module aem_helper/geometry
+
+Geometry validity checks for element strings and polygons. Self-intersecting or
+overlapping polygons otherwise reach the solver, which fails only after the model has
+been set up. Intersections are found with a sweep line over x that tests each segment
+exactly against the active segments whose bounding boxes overlap it. Unlike the Shamos-Hoey
+sweep, it does not rely on the vertical ordering of the active segments, which breaks down
+where segments are allowed to touch (shared vertices, or shared edges of adjacent domains).
+The active segments are kept in a tree of their y intervals, so the sweep takes
+O((n + k) log n) time for n segments of which k pairs have overlapping bounding boxes; in
+a valid string or polygon, a segment's bounding box overlaps only a few others, whatever
+the string's orientation.
+
+"""
+
+from __future__ import annotations
+
+import heapq
+import logging
+from typing import Callable
+
+from .aem_io import ShapeXy, ValidationError
+
+Segment = tuple[float, float, float, float]                # (x0, y0, x1, y1)
+SegmentFilter = Callable[[int, int], bool]                 # Returns True for pairs to be checked
+
+
+def signed_area(xy: ShapeXy) -> float:
+    """
+    Returns the signed area of a ring; positive if the ring is counterclockwise
+    """
+    n = len(xy)
+    return 0.5 * sum(xy[i][0] * xy[(i + 1) % n][1] - xy[(i + 1) % n][0] * xy[i][1] for i in range(n))
+
+
+def _orient(ax: float, ay: float, bx: float, by: float, cx: float, cy: float) -> float:
+    """
+    Returns a positive value if a-b-c turns left, negative if right, zero if collinear
+    """
+    return (bx - ax) * (cy - ay) - (by - ay) * (cx - ax)
+
+
+def _on_segment(s: Segment, px: float, py: float) -> bool:
+    """
+    Returns True if the point p, known to be collinear with s, lies within s's bounding box
+    """
+    return (min(s[0], s[2]) <= px <= max(s[0], s[2])) and (min(s[1], s[3]) <= py <= max(s[1], s[3]))
+
+
+def segments_intersect(a: Segment, b: Segment) -> bool:
+    """
+    Returns True if the closed segments a and b share at least one point
+    """
+    d1 = _orient(b[0], b[1], b[2], b[3], a[0], a[1])
+    d2 = _orient(b[0], b[1], b[2], b[3], a[2], a[3])
+    d3 = _orient(a[0], a[1], a[2], a[3], b[0], b[1])
+    d4 = _orient(a[0], a[1], a[2], a[3], b[2], b[3])
+    if ((d1 > 0 > d2) or (d1 < 0 < d2)) and ((d3 > 0 > d4) or (d3 < 0 < d4)):
+        return True
+    return ((d1 == 0 and _on_segment(b, a[0], a[1])) or
+            (d2 == 0 and _on_segment(b, a[2], a[3])) or
+            (d3 == 0 and _on_segment(a, b[0], b[1])) or
+            (d4 == 0 and _on_segment(a, b[2], b[3])))
+
+
+def segments_cross(a: Segment, b: Segment) -> bool:
+    """
+    Returns True if the segments a and b cross at a single point interior to both
+    """
+    d1 = _orient(b[0], b[1], b[2], b[3], a[0], a[1])
+    d2 = _orient(b[0], b[1], b[2], b[3], a[2], a[3])
+    d3 = _orient(a[0], a[1], a[2], a[3], b[0], b[1])
+    d4 = _orient(a[0], a[1], a[2], a[3], b[2], b[3])
+    return ((d1 > 0 > d2) or (d1 < 0 < d2)) and ((d3 > 0 > d4) or (d3 < 0 < d4))
+
+
+def _segment(x0: float, y0: float, x1: float, y1: float) -> Segment:
+    return (x0, y0, x1, y1) if (x0, y0) <= (x1, y1) else (x1, y1, x0, y0)
+
+
+class _ActiveIntervals:
+    """
+    The y intervals of the active segments of a sweep, for overlap queries. The intervals
+    are kept in a segment tree over the distinct y coordinates (for the intervals that
+    contain a point) and in a counted tree of their lower ends (for the intervals that start
+    within a range), so that adding or removing an interval takes O(log n) time and a query
+    takes O(log n + k) time for k overlapping intervals.
+    """
+    __slots__ = ("size", "cover", "starts", "count")
+
+    def __init__(self, n: int):
+        """
+        :param n: The number of distinct y coordinates
+        """
+        self.size = 1
+        while self.size < n:
+            self.size *= 2
+        self.cover = [None] * (2 * self.size)           # Node: the intervals that span it
+        self.starts = [None] * self.size                # Leaf: the intervals that start at it
+        self.count = [0] * (2 * self.size)              # Node: the intervals that start under it
+
+    def _nodes(self, lo: int, hi: int) -> list[int]:
+        """
+        Returns the nodes that exactly cover the leaves lo to hi (inclusive)
+        """
+        nodes = []
+        lo, hi = lo + self.size, hi + 1 + self.size
+        while lo < hi:
+            if lo & 1:
+                nodes.append(lo)
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                nodes.append(hi)
+            lo >>= 1
+            hi >>= 1
+        return nodes
+
+    def add(self, i: int, lo: int, hi: int) -> None:
+        for node in self._nodes(lo, hi):
+            if self.cover[node] is None:
+                self.cover[node] = set()
+            self.cover[node].add(i)
+        if self.starts[lo] is None:
+            self.starts[lo] = set()
+        self.starts[lo].add(i)
+        node = lo + self.size
+        while node:
+            self.count[node] += 1
+            node >>= 1
+
+    def remove(self, i: int, lo: int, hi: int) -> None:
+        for node in self._nodes(lo, hi):
+            self.cover[node].discard(i)
+        self.starts[lo].discard(i)
+        node = lo + self.size
+        while node:
+            self.count[node] -= 1
+            node >>= 1
+
+    def overlapping(self, lo: int, hi: int) -> list[int]:
+        """
+        Returns the intervals that overlap [lo, hi]: those that contain lo, and those that
+        start in (lo, hi]
+        """
+        found = []
+        node = lo + self.size
+        while node:
+            if self.cover[node]:
+                found.extend(self.cover[node])
+            node >>= 1
+        if lo < hi:
+            stack = [node for node in self._nodes(lo + 1, hi) if self.count[node]]
+            while stack:
+                node = stack.pop()
+                if node >= self.size:
+                    found.extend(self.starts[node - self.size])
+                else:
+                    stack.extend(child for child in (2 * node, 2 * node + 1) if self.count[child])
+        return found
+
+
+def find_intersection(segments: list[Segment],
+                      check: SegmentFilter | None = None,
+                      test: Callable[[Segment, Segment], bool] = segments_intersect
+                      ) -> tuple[int, int] | None:
+    """
+    Finds a pair of intersecting segments with a sweep line over x. The segments are
+    processed in order of their left ends; each one is tested against the active segments
+    (those whose x range reaches its left end) whose y ranges overlap its own, which are
+    found in an ordered structure of the active y intervals.
+    :param segments: A list of (x0, y0, x1, y1) segments
+    :param check: A function of two segment indices that returns False for pairs that are
+        allowed to touch, e.g. consecutive segments of a string; by default all pairs are checked
+    :param test: The intersection test for a pair of segments
+    :return: The indices of an intersecting pair, or None
+    """
+    segs = [_segment(*s) for s in segments]
+    ys = sorted({y for s in segs for y in (s[1], s[3])})
+    rank = {y: k for k, y in enumerate(ys)}
+    ylo = [rank[min(s[1], s[3])] for s in segs]
+    yhi = [rank[max(s[1], s[3])] for s in segs]
+    active = _ActiveIntervals(len(ys))
+    ending = []                                         # (right end x, segment) of the active segments
+    for i in sorted(range(len(segs)), key=segs.__getitem__):
+        x0 = segs[i][0]
+        while ending and ending[0][0] < x0:
+            _, j = heapq.heappop(ending)
+            active.remove(j, ylo[j], yhi[j])
+        for j in active.overlapping(ylo[i], yhi[i]):
+            a, b = (i, j) if i < j else (j, i)
+            if (check is None or check(a, b)) and test(segs[a], segs[b]):
+                return a, b
+        active.add(i, ylo[i], yhi[i])
+        heapq.heappush(ending, (segs[i][2], i))
+    return None
+
+
+def _string_segments(xy: ShapeXy, closed: bool) -> list[Segment]:
+    n = len(xy)
+    count = n if closed else n - 1
+    return [(xy[i][0], xy[i][1], xy[(i + 1) % n][0], xy[(i + 1) % n][1]) for i in range(count)]
+
+
+def _adjacent_filter(n: int, closed: bool, segs: list[Segment]) -> SegmentFilter:
+    """
+    Returns a filter that skips consecutive segments of a string, unless they fold back on
+    each other
+    """
+    def check(i: int, j: int) -> bool:
+        if j == i + 1:
+            (ax, ay, sx, sy), (_, _, bx, by) = segs[i], segs[j]
+        elif closed and i == 0 and j == n - 1:
+            (sx, sy, ax, ay), (bx, by, _, _) = segs[i], segs[j]
+        else:
+            return True
+        # The segments share the vertex s; they overlap only if they are collinear and fold back
+        return (_orient(ax, ay, sx, sy, bx, by) == 0 and
+                (ax - sx) * (bx - sx) + (ay - sy) * (by - sy) > 0.0)
+    return check
+
+
+def _drop_repeated_vertices(xy: ShapeXy) -> ShapeXy:
+    result = xy[:1]
+    for p in xy[1:]:
+        if p != result[-1]:
+            result.append(p)
+    return result
+
+
+def validate_string(xy: ShapeXy) -> ShapeXy:
+    """
+    Validates an open string of (x, y) pairs: at least two distinct vertices and no
+    self-intersections. Repeated consecutive vertices are dropped.
+    :param xy: The vertices of the string
+    :return: The validated vertices
+    """
+    xy = _drop_repeated_vertices(list(xy))
+    if len(xy) < 2:
+        raise ValidationError(f"A string requires at least two distinct vertices, got {xy}")
+    segs = _string_segments(xy, closed=False)
+    pair = find_intersection(segs, _adjacent_filter(len(segs), False, segs))
+    if pair is not None:
+        i, j = pair
+        raise ValidationError(f"String self-intersects between segments {i} {segs[i]} and {j} {segs[j]}")
+    return xy
+
+
+def validate_ring(xy: ShapeXy, counterclockwise: bool = True) -> ShapeXy:
+    """
+    Validates a closed ring of (x, y) pairs: at least three distinct vertices, a nonzero
+    area, and no self-intersections. A repeated closing vertex is dropped, and the ring is
+    reversed if necessary to give it the requested orientation.
+    :param xy: The vertices of the ring
+    :param counterclockwise: The required orientation
+    :return: The validated vertices
+    """
+    xy = _drop_repeated_vertices(list(xy))
+    if len(xy) > 1 and xy[0] == xy[-1]:
+        xy = xy[:-1]
+    if len(xy) < 3:
+        raise ValidationError(f"A polygon requires at least three distinct vertices, got {xy}")
+    area = signed_area(xy)
+    if area == 0.0:
+        raise ValidationError(f"Polygon with vertices starting at {xy[0]} has zero area")
+    segs = _string_segments(xy, closed=True)
+    pair = find_intersection(segs, _adjacent_filter(len(segs), True, segs))
+    if pair is not None:
+        i, j = pair
+        raise ValidationError(f"Polygon self-intersects between segments {i} {segs[i]} and {j} {segs[j]}")
+    if (area > 0.0) != counterclockwise:
+        logging.info(f"Reversing the orientation of the polygon starting at {xy[0]}")
+        xy = xy[::-1]
+    return xy
+
+
+class _RingLocator:
+    """
+    Locates points relative to a ring. The ring's segments are bucketed by y, so that a
+    point is tested only against the segments whose y ranges may contain it.
+    """
+    __slots__ = ("y0", "y1", "dy", "buckets")
+
+    def __init__(self, xy: ShapeXy):
+        segs = _string_segments(xy, closed=True)
+        ys = [y for _, y in xy]
+        self.y0, self.y1 = min(ys), max(ys)
+        self.dy = (self.y1 - self.y0) / len(segs) or 1.0
+        self.buckets = [[] for _ in segs]
+        for seg in segs:
+            for k in range(self._bucket(min(seg[1], seg[3])), self._bucket(max(seg[1], seg[3])) + 1):
+                self.buckets[k].append(seg)
+
+    def _bucket(self, y: float) -> int:
+        return min(int((y - self.y0) / self.dy), len(self.buckets) - 1)
+
+    def locate(self, px: float, py: float) -> int:
+        """
+        Returns 1 if the point is inside the ring, 0 if it is on the boundary, -1 if outside
+        """
+        if not self.y0 <= py <= self.y1:
+            return -1
+        inside = False
+        for seg in self.buckets[self._bucket(py)]:
+            x0, y0, x1, y1 = seg
+            if _orient(x0, y0, x1, y1, px, py) == 0 and _on_segment(seg, px, py):
+                return 0
+            if (y0 > py) != (y1 > py) and px < x0 + (py - y0) * (x1 - x0) / (y1 - y0):
+                inside = not inside
+        return 1 if inside else -1
+
+
+def _piece_midpoints(seg: Segment, points: list[tuple[float, float]]) -> list[tuple[float, float]]:
+    """
+    Splits a segment at points that lie on it, and returns the midpoints of the pieces
+    """
+    x0, y0, x1, y1 = seg
+    along = sorted(set(points), key=lambda p: (p[0] - x0) * (x1 - x0) + (p[1] - y0) * (y1 - y0))
+    ends = [(x0, y0)] + [p for p in along if p != (x0, y0) and p != (x1, y1)] + [(x1, y1)]
+    return [(0.5 * (a[0] + b[0]), 0.5 * (a[1] + b[1])) for a, b in zip(ends, ends[1:])]
+
+
+def find_overlaps(rings: list[ShapeXy]) -> tuple[int, int] | None:
+    """
+    Finds a pair of rings whose interiors overlap, unless one ring is nested inside the
+    other. Rings may share vertices and edges (e.g. adjacent domains), and may be nested,
+    but may not overlap partially or coincide.
+
+    Rings whose boundaries cross overlap. Where boundaries only touch, the touching segments
+    are split at the other ring's vertices, and the midpoints of the pieces are located
+    relative to the other ring: the rings overlap if each has a piece strictly inside the
+    other, or if every piece lies on the other's boundary (i.e. the rings coincide).
+    :param rings: A list of valid rings
+    :return: The indices of a pair of overlapping rings, or None
+    """
+    segs, owner = [], []
+    for k, xy in enumerate(rings):
+        ring_segs = _string_segments(xy, closed=True)
+        segs.extend(ring_segs)
+        owner.extend([k] * len(ring_segs))
+
+    touching = {}                                       # {(ring, ring): [(segment, segment)]}
+
+    def check(i: int, j: int) -> bool:
+        if owner[i] == owner[j]:
+            return False
+        if segments_cross(segs[i], segs[j]):
+            return True
+        if segments_intersect(segs[i], segs[j]):
+            touching.setdefault((owner[i], owner[j]) if owner[i] < owner[j] else (owner[j], owner[i]),
+                                []).append((i, j))
+        return False
+
+    pair = find_intersection(segs, check, lambda a, b: True)
+    if pair is not None:
+        return owner[pair[0]], owner[pair[1]]
+
+    locators = {}
+    for (p, q), pairs in touching.items():
+        splits = {}                                     # {segment: the other ring's vertices on it}
+        for i, j in pairs:
+            for s, t in ((i, j), (j, i)):
+                points = splits.setdefault(s, [])
+                for px, py in (segs[t][0:2], segs[t][2:4]):
+                    if _orient(*segs[s], px, py) == 0 and _on_segment(segs[s], px, py):
+                        points.append((px, py))
+        inside, on_boundary = set(), True
+        for s, points in splits.items():
+            other = q if owner[s] == p else p
+            if other not in locators:
+                locators[other] = _RingLocator(rings[other])
+            for mx, my in _piece_midpoints(segs[s], points):
+                where = locators[other].locate(mx, my)
+                if where > 0:
+                    inside.add(owner[s])
+                if where != 0:
+                    on_boundary = False
+            if len(inside) == 2:
+                return p, q
+        if on_boundary:
+            return p, q
+    return None
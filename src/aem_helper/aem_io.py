@@ -6,22 +6,32 @@ All Rights Reserved
 
 Module aem_helper/io
 
-This module implements a simple mechanism for reading geospatial data. For now,
-aem_helper is limited to the ESRI Shapefile format for geospatial data sets.
-This results from the fact that v0.1 of aem_helper is derived from the
-timml_helper scripts that I've developed for my Groundwater Flow Modeling class,
-and I'm in a hurry to get a ModAEM toolchain in place.
+This module implements a simple mechanism for reading geospatial data. The ESRI
+Shapefile format is read with pyshp; this results from the fact that v0.1 of
+aem_helper is derived from the timml_helper scripts that I've developed for my
+Groundwater Flow Modeling class, and I'm in a hurry to get a ModAEM toolchain in
+place. GeoParquet and Arrow IPC files with WKB geometry are read with pyarrow (an
+optional dependency, installed with the "parquet" extra), in batches, with typed
+attribute columns.
 
 TODO: Move geospatial I/O to geopandas.
 
 """
 
-from typing import Any, Callable, Generator, Iterable
+from __future__ import annotations
 
-from shapefile import Reader
+import struct
+import sys
+from array import array
+from typing import Any, Callable, Generator, Iterable, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from shapefile import Reader
 
 Evaluator = Callable[[Any, dict[str, Any], Any], Any]
 
+_NUMERIC_START = frozenset("0123456789.")
+
 
 def eval_object(s: Any,
                 config: dict[str, Any] = None,
@@ -40,6 +50,8 @@ def eval_object(s: Any,
     :param default: The default value to be returned if no input is provided
     :return: A Python object.
     """
+    if not isinstance(s, str):
+        return default if s is None else s
     if not s:
         return default
     return eval(s, config)
@@ -56,6 +68,12 @@ def eval_float(s: Any,
     :param default: The default value to be returned if no input is provided
     :return: A floating point value.
     """
+    # Most attributes are plain numeric literals; converting those directly skips eval()
+    if isinstance(s, str) and s[:1] in _NUMERIC_START:
+        try:
+            return float(s)
+        except ValueError:
+            pass
     ob = eval_object(s, config, default)
     if ob is None:
         return ob
@@ -158,6 +176,8 @@ def _read_attrs(rdr: Reader, i: int, field_names) -> ShapeAttrs:
 def shapefile_reader(file_name: str,
                      scale: float = SCALE_NONE
                      ) -> Generator[Shape, None, None]:
+    # pyshp is imported on first use, so that importing aem_helper stays fast
+    from shapefile import Reader
     with Reader(file_name) as rdr:
         # Find the explanation for the next line in the `pyshp` documentation ;-)
         field_names = [f[0] for f in rdr.fields[1:]]
@@ -165,6 +185,462 @@ def shapefile_reader(file_name: str,
             yield _read_points(rdr, i, scale), _read_attrs(rdr, i, field_names)
 
 
+class ShapefileSource:
+    """
+    A re-iterable shapefile layer. Each iteration opens the shapefile afresh and yields the
+    same (xy, attrs) shapes as shapefile_reader(), and len() reads the shape count from the
+    shapefile header without touching any geometry. This is what the streaming build in
+    BaseModel needs: one cheap counting pass, then a second pass that renders the records.
+    """
+
+    def __init__(self, file_name: str, scale: float = SCALE_NONE):
+        """
+        :param file_name: The shapefile to be read
+        :param scale: The scaling factor for x and y data
+        """
+        self.file_name = file_name
+        self.scale = scale
+
+    def __iter__(self) -> Generator[Shape, None, None]:
+        yield from shapefile_reader(self.file_name, self.scale)
+
+    def __len__(self) -> int:
+        from shapefile import Reader
+        with Reader(self.file_name) as rdr:
+            return len(rdr)
+
+
+############
+# GeoParquet and Arrow IPC support via pyarrow
+############
+
+Predicate = tuple[str, str, Any]            # (column, operator, value), e.g. ("LAYER", "==", 2)
+
+_WKB_NATIVE = 1 if sys.byteorder == "little" else 0
+_DEFAULT_BATCH_SIZE = 65536
+
+
+class ShapeBatch:
+    """
+    A columnar batch of shapes: the (x, y) pairs of all the shapes packed into one array of
+    doubles, the vertex offset of each shape into it (with a final entry for the end of the
+    last shape), and one list of typed values per attribute column. shapes() yields the
+    same (xy, attrs) shapes as shapefile_reader().
+    """
+    __slots__ = ("coords", "offsets", "columns")
+
+    def __init__(self, coords: array, offsets: array, columns: dict[str, list]):
+        self.coords = coords
+        self.offsets = offsets
+        self.columns = columns
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def xy(self, i: int) -> ShapeXy:
+        c = self.coords[2 * self.offsets[i]: 2 * self.offsets[i + 1]]
+        return list(zip(c[0::2], c[1::2]))
+
+    def attrs(self, i: int) -> ShapeAttrs:
+        return {name: column[i] for name, column in self.columns.items()}
+
+    def shapes(self) -> Generator[Shape, None, None]:
+        for i in range(len(self)):
+            yield self.xy(i), self.attrs(i)
+
+
+class _StringColumn:
+    """
+    A column of strings packed as UTF-8 into one buffer, with the end offset of each string
+    """
+    __slots__ = ("data", "ends")
+
+    def __init__(self):
+        self.data = bytearray()
+        self.ends = array("q")
+
+    def append(self, value: str) -> None:
+        self.data += value.encode()
+        self.ends.append(len(self.data))
+
+    def __len__(self) -> int:
+        return len(self.ends)
+
+    def __getitem__(self, i: int) -> str:
+        return self.data[self.ends[i - 1] if i > 0 else 0: self.ends[i]].decode()
+
+    def __iter__(self) -> Generator[str, None, None]:
+        return (self[i] for i in range(len(self)))
+
+
+def _new_column(value: Any) -> array | _StringColumn | list:
+    """
+    Returns an empty column suited to the type of the value: packed strings, an array of
+    doubles or of 64-bit ints, or else a list
+    """
+    if type(value) is str:
+        return _StringColumn()
+    if type(value) is float:
+        return array("d")
+    if type(value) is int:
+        return array("q")
+    return []
+
+
+def _column_accepts(column: array | _StringColumn | list, value: Any) -> bool:
+    if type(column) is list:
+        return True
+    if type(column) is _StringColumn:
+        return type(value) is str
+    return type(value) is (float if column.typecode == "d" else int)
+
+
+class ColumnarLayer(ShapeBatch):
+    """
+    A layer of shapes held compactly in memory: the geometry packed into one array of doubles,
+    and each attribute column packed by type (strings into one UTF-8 buffer, floats and ints
+    into arrays), with no Python object per shape. Iterating it yields the same (xy, attrs)
+    shapes as the source, so it is a re-iterable layer for the streaming build, whose elements
+    are created one at a time when they are rendered. Attributes that a shape lacks read as
+    None.
+
+    Example: to read a well inventory once, and build the model input from memory:
+
+        model.add_layer("wl0", ColumnarLayer(shapefile_reader("wells")))
+        model.write("model.aem", streaming=True)
+
+    """
+    __slots__ = ()
+
+    def __init__(self, shapes: Iterable[Shape] = ()):
+        """
+        :param shapes: The (xy, attrs) shapes of the layer, e.g. from shapefile_reader()
+        """
+        super().__init__(array("d"), array("q", [0]), {})
+        for xy, attrs in shapes:
+            self.append(xy, attrs)
+
+    def append(self, xy: ShapeXy, attrs: ShapeAttrs) -> None:
+        """
+        Appends a shape to the layer
+        """
+        n = len(self)
+        for key, value in attrs.items():
+            column = self.columns.get(key)
+            if column is None:
+                column = self.columns[key] = [None] * n if n > 0 else _new_column(value)
+            elif not _column_accepts(column, value):
+                column = self.columns[key] = list(column)
+            try:
+                column.append(value)
+            except OverflowError:
+                column = self.columns[key] = list(column)
+                column.append(value)
+        if len(attrs) < len(self.columns):
+            for key, column in self.columns.items():
+                if len(column) == n:
+                    if type(column) is not list:
+                        column = self.columns[key] = list(column)
+                    column.append(None)
+        for x, y in xy:
+            self.coords.append(x)
+            self.coords.append(y)
+        self.offsets.append(len(self.coords) // 2)
+
+    def __iter__(self) -> Generator[Shape, None, None]:
+        return self.shapes()
+
+
+def _read_wkb_points(data: bytes, pos: int, n: int, ndim: int, native: bool,
+                     out: array, scale: float) -> int:
+    end = pos + 8 * n * ndim
+    values = array("d")
+    values.frombytes(data[pos:end])
+    if not native:
+        values.byteswap()
+    if ndim != 2:
+        xy = array("d", bytes(16 * n))
+        xy[0::2], xy[1::2] = values[0::ndim], values[1::ndim]
+        values = xy
+    if scale != SCALE_NONE:
+        values = array("d", [v * scale for v in values])
+    out.extend(values)
+    return end
+
+
+def read_wkb(data: bytes, out: array, scale: float = SCALE_NONE, pos: int = 0) -> int:
+    """
+    Decodes a WKB (or EWKB, or ISO WKB with Z/M values) geometry, appending its (x, y)
+    pairs to a packed array of doubles. As with pyshp, the vertices of all the rings or
+    parts of a geometry are concatenated, and Z and M values are dropped.
+    :param data: The WKB bytes
+    :param out: The array that receives x0, y0, x1, y1, ...
+    :param scale: The scaling factor for x and y data
+    :param pos: The position of the geometry in `data`
+    :return: The position just past the geometry
+    """
+    native = data[pos] == _WKB_NATIVE
+    order = "<" if data[pos] == 1 else ">"
+    geometry_type, = struct.unpack_from(order + "I", data, pos + 1)
+    pos += 5
+    has_z, has_m = bool(geometry_type & 0x80000000), bool(geometry_type & 0x40000000)
+    if geometry_type & 0x20000000:
+        pos += 4                                    # EWKB SRID
+    dimensions, base = divmod(geometry_type & 0x0FFFFFFF, 1000)
+    has_z = has_z or dimensions in (1, 3)
+    has_m = has_m or dimensions in (2, 3)
+    ndim = 2 + has_z + has_m
+    if base not in range(1, 8):
+        raise ValidationError(f"Unsupported WKB geometry type {geometry_type}")
+
+    if base == 1:
+        return _read_wkb_points(data, pos, 1, ndim, native, out, scale)
+    n, = struct.unpack_from(order + "I", data, pos)
+    pos += 4
+    if base == 2:
+        return _read_wkb_points(data, pos, n, ndim, native, out, scale)
+    if base == 3:
+        for _ in range(n):
+            n_points, = struct.unpack_from(order + "I", data, pos)
+            pos = _read_wkb_points(data, pos + 4, n_points, ndim, native, out, scale)
+        return pos
+    for _ in range(n):
+        pos = read_wkb(data, out, scale, pos)       # Multi-part geometries and collections
+    return pos
+
+
+def _geometry_column(schema, geometry_column: str | None) -> str:
+    """
+    Finds the WKB geometry column: the one named, else the primary column from the
+    GeoParquet "geo" metadata, else a column named "geometry"
+    """
+    if geometry_column is not None:
+        return geometry_column
+    metadata = schema.metadata or {}
+    if b"geo" in metadata:
+        import json
+        geo = json.loads(metadata[b"geo"])
+        column = geo.get("primary_column", "geometry")
+        encoding = geo.get("columns", {}).get(column, {}).get("encoding", "WKB")
+        if encoding.upper() != "WKB":
+            raise ValidationError(f"Geometry column {column} has encoding {encoding}; only WKB is supported")
+        return column
+    return "geometry"
+
+
+def _compare(value: Any, op: str, target: Any) -> bool:
+    if value is None:
+        return False
+    if op == "==":
+        return value == target
+    if op == "!=":
+        return value != target
+    if op == "<":
+        return value < target
+    if op == "<=":
+        return value <= target
+    if op == ">":
+        return value > target
+    if op == ">=":
+        return value >= target
+    if op == "in":
+        return value in target
+    raise ValidationError(f"Unknown predicate operator {op}")
+
+
+def _range_may_match(low: Any, high: Any, op: str, target: Any) -> bool:
+    """
+    Returns False only if no value in [low, high] can satisfy the predicate
+    """
+    try:
+        if op == "==":
+            return low <= target <= high
+        if op == "!=":
+            return not (low == high == target)
+        if op == "<":
+            return low < target
+        if op == "<=":
+            return low <= target
+        if op == ">":
+            return high > target
+        if op == ">=":
+            return high >= target
+        if op == "in":
+            return any(low <= t <= high for t in target)
+    except TypeError:
+        pass                                        # Not comparable; read the row group
+    return True
+
+
+def _row_group_may_match(row_group, filters: list[Predicate]) -> bool:
+    """
+    Checks the predicates against the min/max statistics of a Parquet row group
+    """
+    statistics = {}
+    for j in range(row_group.num_columns):
+        column = row_group.column(j)
+        statistics[column.path_in_schema] = column.statistics
+    for name, op, target in filters:
+        stats = statistics.get(name)
+        if stats is None:
+            continue
+        if stats.null_count == row_group.num_rows:
+            return False                            # Nulls never satisfy a predicate
+        if stats.has_min_max and not _range_may_match(stats.min, stats.max, op, target):
+            return False
+    return True
+
+
+def _make_batch(record_batch, geometry_column: str, columns: list[str] | None,
+                filters: list[Predicate], scale: float) -> ShapeBatch:
+    data = record_batch.to_pydict()
+    geometry = data.pop(geometry_column)
+    keep = range(len(geometry))
+    for name, op, target in filters:
+        values = data[name]
+        keep = [i for i in keep if _compare(values[i], op, target)]
+    if columns is not None:
+        data = {name: data[name] for name in columns}
+    coords, offsets = array("d"), array("q", [0])
+    for i in keep:
+        if geometry[i] is not None:
+            read_wkb(geometry[i], coords, scale)
+        offsets.append(len(coords) // 2)
+    if len(keep) < len(geometry):
+        data = {name: [values[i] for i in keep] for name, values in data.items()}
+    return ShapeBatch(coords, offsets, data)
+
+
+def _read_columns(geometry_column: str, columns: list[str] | None,
+                  filters: list[Predicate]) -> list[str] | None:
+    if columns is None:
+        return None
+    names = [geometry_column] + list(columns)
+    return names + [name for name, _, _ in filters if name not in names]
+
+
+def parquet_batches(file_name: str,
+                    scale: float = SCALE_NONE,
+                    columns: list[str] | None = None,
+                    filters: list[Predicate] | None = None,
+                    geometry_column: str | None = None,
+                    batch_size: int = _DEFAULT_BATCH_SIZE) -> Generator[ShapeBatch, None, None]:
+    """
+    Reads a GeoParquet file as a sequence of ShapeBatch objects. At most `batch_size` rows
+    are held in memory at a time. The predicates in `filters` are ANDed; row groups whose
+    column statistics show that no row can satisfy them are skipped without being read,
+    and the remaining rows are filtered exactly. Null values never satisfy a predicate.
+
+    Example: to read only the wells of layer 2 that pump more than 100:
+
+        parquet_batches("wells.parquet", filters=[("LAYER", "==", 2), ("QW", ">", 100.0)])
+
+    :param file_name: The GeoParquet file to be read
+    :param scale: The scaling factor for x and y data
+    :param columns: The attribute columns to be read; by default, all of them
+    :param filters: A list of (column, operator, value) predicates; the operators are
+        "==", "!=", "<", "<=", ">", ">=" and "in"
+    :param geometry_column: The WKB geometry column; by default, the primary column from
+        the GeoParquet metadata
+    :param batch_size: The maximum number of rows per batch
+    """
+    # pyarrow is an optional dependency, imported on first use
+    import pyarrow.parquet as pq
+    filters = list(filters or [])
+    pf = pq.ParquetFile(file_name)
+    geometry_column = _geometry_column(pf.schema_arrow, geometry_column)
+    metadata = pf.metadata
+    row_groups = [i for i in range(metadata.num_row_groups)
+                  if _row_group_may_match(metadata.row_group(i), filters)]
+    if not row_groups:
+        return
+    read_columns = _read_columns(geometry_column, columns, filters)
+    for record_batch in pf.iter_batches(batch_size=batch_size, row_groups=row_groups, columns=read_columns):
+        yield _make_batch(record_batch, geometry_column, columns, filters, scale)
+
+
+def arrow_batches(file_name: str,
+                  scale: float = SCALE_NONE,
+                  columns: list[str] | None = None,
+                  filters: list[Predicate] | None = None,
+                  geometry_column: str | None = None) -> Generator[ShapeBatch, None, None]:
+    """
+    Reads an Arrow IPC (Feather v2) file as a sequence of ShapeBatch objects, one per record
+    batch of the file. The file is memory-mapped, so only the batch being converted is held
+    in memory. See parquet_batches() for the arguments; Arrow IPC files carry no column
+    statistics, so the predicates are applied to the rows only.
+    """
+    # pyarrow is an optional dependency, imported on first use
+    import pyarrow as pa
+    import pyarrow.ipc
+    filters = list(filters or [])
+    with pa.memory_map(file_name) as source:
+        reader = pa.ipc.open_file(source)
+        geometry_column = _geometry_column(reader.schema, geometry_column)
+        read_columns = _read_columns(geometry_column, columns, filters)
+        for i in range(reader.num_record_batches):
+            record_batch = reader.get_batch(i)
+            if read_columns is not None:
+                record_batch = record_batch.select(read_columns)
+            yield _make_batch(record_batch, geometry_column, columns, filters, scale)
+
+
+def parquet_reader(file_name: str,
+                   scale: float = SCALE_NONE,
+                   columns: list[str] | None = None,
+                   filters: list[Predicate] | None = None,
+                   geometry_column: str | None = None) -> Generator[Shape, None, None]:
+    """
+    Reads a GeoParquet file, yielding the same (xy, attrs) shapes as shapefile_reader();
+    the attribute values keep their column types. See parquet_batches() for the arguments.
+    """
+    for batch in parquet_batches(file_name, scale, columns, filters, geometry_column):
+        yield from batch.shapes()
+
+
+def arrow_reader(file_name: str,
+                 scale: float = SCALE_NONE,
+                 columns: list[str] | None = None,
+                 filters: list[Predicate] | None = None,
+                 geometry_column: str | None = None) -> Generator[Shape, None, None]:
+    """
+    Reads an Arrow IPC file, yielding the same (xy, attrs) shapes as shapefile_reader().
+    See parquet_batches() for the arguments.
+    """
+    for batch in arrow_batches(file_name, scale, columns, filters, geometry_column):
+        yield from batch.shapes()
+
+
+class ParquetSource:
+    """
+    A re-iterable GeoParquet layer, the counterpart of ShapefileSource for the streaming
+    build. Without filters, len() reads the row count from the file metadata; with filters,
+    the count is unknown until the rows are read, so len() raises TypeError and
+    BaseModel.count_layers() counts the shapes instead.
+    """
+
+    def __init__(self, file_name: str, scale: float = SCALE_NONE,
+                 columns: list[str] | None = None, filters: list[Predicate] | None = None,
+                 geometry_column: str | None = None):
+        """
+        See parquet_batches() for the arguments
+        """
+        self.file_name = file_name
+        self.scale = scale
+        self.columns = columns
+        self.filters = filters
+        self.geometry_column = geometry_column
+
+    def __iter__(self) -> Generator[Shape, None, None]:
+        yield from parquet_reader(self.file_name, self.scale, self.columns, self.filters, self.geometry_column)
+
+    def __len__(self) -> int:
+        if self.filters:
+            raise TypeError("The length of a filtered ParquetSource is not known until it is read")
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(self.file_name).metadata.num_rows
+
+
 def set_missing_values(shapes: Generator[Shape], overwrite: bool = False,
                        **missing_values: ShapeAttrs) -> Shape:
     """
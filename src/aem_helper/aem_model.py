@@ -10,13 +10,49 @@ $
 
 from __future__ import annotations
 
+import copy
 import logging
-from dataclasses import dataclass
-from typing import Generator, Any
-from math import pi
+import threading
+from itertools import chain
+from typing import Generator, Any, Iterable, TYPE_CHECKING
 
-from .aem_io import Shape
-from .aem_element import Builder, BaseElement, BaseElementCollection
+from .aem_io import Shape, ShapeXy, ValidationError
+from .aem_element import Builder, BaseElement, BaseElementCollection, LayerStore
+
+if TYPE_CHECKING:
+    from .aem_dedup import DedupReport, MergeRule
+    from .aem_events import Progress
+
+ShapeSource = Iterable[Shape]           # A re-iterable source of shapes, e.g. aem_io.ShapefileSource
+
+
+class ElementProducer:
+    """
+    Collects the elements produced by one thread (e.g. one layer read) for a BaseModel. A
+    producer is used by a single thread, so adding elements to it takes no locks; the model
+    registers the elements of all its producers with commit_producers(), in the order that
+    the producers were created, so the final ordering and element_ids are deterministic no
+    matter how the threads were scheduled.
+    """
+
+    def __init__(self, model: BaseModel):
+        self.model = model
+        self.elements = []
+
+    def add_element(self, el: BaseElement) -> BaseElement:
+        self.elements.append(el)
+        return el
+
+    def add_elements(self, elements: Iterable[BaseElement]) -> None:
+        self.elements.extend(elements)
+
+    def read_element_shapefile(self, element_name: str, rdr: Generator[Shape]) -> list[BaseElement]:
+        """
+        Reads elements like BaseModel.read_element_shapefile(), but holds them in the producer
+        """
+        result = self.model.make_elements(element_name, rdr)
+        self.elements.extend(result)
+        return result
 
 
 class BaseModel(Builder):
@@ -25,37 +61,110 @@ class BaseModel(Builder):
 
     """
     elements: list[BaseElement]                                 # All the elements in the model
-    element_dict: dict[str, BaseElement]                        # A {name: element,...} look-up dict
+    element_dict: dict[str, BaseElement]                        # A {name: element,...} look-up dict (see get_element)
     last_element_id: int                                        # The most-recently assigned element_id
+    layers: list[tuple[str, ShapeSource]]                       # Source layers for the streaming build
+    config: dict[str, Any]                                      # Configuration for attribute evaluation
+    lazy: bool                                                  # Defer attribute evaluation of read elements
     supported_elements: dict[str, type[BaseElementCollection]] | None = None
+    progress: Progress | None = None                            # Receives progress events, if set
 
     def __init__(self) -> None:
         self.elements = []
         self.element_dict = {}
-        self.supported_elements = supported_elements
+        self.layers = []
+        self.config = {}
+        self.lazy = False
         self.last_element_id: int = 0
+        self._lock = threading.Lock()
+        self._producers = []
+        self._unindexed = []                # Lazy elements that are not yet in element_dict
+
+    def __getstate__(self) -> dict[str, Any]:
+        state = self.__dict__.copy()
+        del state["_lock"]
+        # Progress callbacks are often closures or bound to a monitor, so they are not pickled
+        state.pop("progress", None)
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
 
     def add_element(self, el: BaseElement) -> BaseElement:
         """
-        Adds an element to the model, and returns it.
+        Adds an element to the model, and returns it. This method is thread-safe.
 
         :param el: The BaseElement to be added. If the element has a not-empty `name`` field, it
             will be added to the model's look-up dictionary
         :return: The added element.
         """
-        self.set_element_id(el)
-        self.elements.append(el)
-        if hasattr(el, "name") and el.name:
-            self.element_dict[el.name] = el
+        self.add_elements([el])
         return el
 
+    def add_elements(self, elements: Iterable[BaseElement]) -> list[BaseElement]:
+        """
+        Adds a batch of elements to the model, giving them a contiguous block of element_ids.
+        This method is thread-safe, and takes the model's lock only once per batch.
+        :param elements: The elements to be added
+        :return: The added elements
+        """
+        elements = list(elements)
+        with self._lock:
+            first = self.last_element_id + 1
+            self.last_element_id += len(elements)
+            self.elements.extend(elements)
+            for element_id, el in enumerate(elements, first):
+                el.set_element_id(element_id)
+                if not el.evaluated:
+                    # Indexing the name would evaluate a lazy element; defer it to get_element()
+                    self._unindexed.append(el)
+                elif hasattr(el, "name") and el.name:
+                    self.element_dict[el.name] = el
+        return elements
+
     def set_element_id(self, element: BaseElement):
         """
         Generates a new, unique id for the given element
         :param element: The element that will receive a new element_id
         """
-        self.last_element_id += 1
-        element.set_element_id(self.last_element_id)
+        with self._lock:
+            self.last_element_id += 1
+            element.set_element_id(self.last_element_id)
+
+    def producer(self) -> ElementProducer:
+        """
+        Creates an ElementProducer for populating the model from another thread. Create the
+        producers in a fixed order (e.g. one per layer, before starting the threads), and call
+        commit_producers() once the threads are done.
+
+        Example:
+
+            producers = [model.producer() for _ in layers]
+            with ThreadPoolExecutor() as pool:
+                for p, (name, file_name) in zip(producers, layers):
+                    pool.submit(p.read_element_shapefile, name, shapefile_reader(file_name))
+            model.commit_producers()
+
+        """
+        p = ElementProducer(self)
+        with self._lock:
+            self._producers.append(p)
+        return p
+
+    def commit_producers(self) -> int:
+        """
+        Adds the elements of all the producers to the model, in the order that the producers
+        were created, each producer receiving a contiguous block of element_ids.
+        :return: The number of elements that were added
+        """
+        with self._lock:
+            producers, self._producers = self._producers, []
+        n = 0
+        for p in producers:
+            n += len(self.add_elements(p.elements))
+            p.elements = []
+        return n
 
     def get_element(self, name: str) -> BaseElement | None:
         """
@@ -63,8 +172,62 @@ class BaseModel(Builder):
         :param name: The name of the element to be retrieved
         :return: The BaseElement, or None if the name is missing
         """
+        if self._unindexed:
+            with self._lock:
+                # Lazy elements are indexed by their raw NAME attribute, which every named
+                # element evaluates as str(NAME), so that no element is evaluated (or can
+                # fail) here
+                for el in self._unindexed:
+                    if not hasattr(type(el), "name"):
+                        continue
+                    el_name = el.raw_attr("NAME")
+                    if el_name is None and el.evaluated:
+                        el_name = getattr(el, "name", "")
+                    if el_name:
+                        self.element_dict[str(el_name)] = el
+                self._unindexed = []
         return self.element_dict.get(name, None)
 
+    def deduplicate(self,
+                    tolerance: float = 1.0e-6,
+                    rules: dict[str, MergeRule] | None = None,
+                    default_rule: MergeRule = "first") -> DedupReport:
+        """
+        Merges coincident points and duplicate strings among the model's elements. See
+        aem_dedup.deduplicate() for the meaning of the arguments. Retained elements keep
+        their element_ids.
+        :return: A DedupReport describing the merged elements
+        """
+        from .aem_dedup import deduplicate
+        self.elements, report = deduplicate(self.elements, tolerance, rules, default_rule)
+        # Index the names on demand, without evaluating lazy elements that were not merged
+        self.element_dict = {}
+        self._unindexed = list(self.elements)
+        return report
+
+    def tile(self, tiles: list[ShapeXy], buffer: float = 0.0) -> list[BaseModel]:
+        """
+        Partitions the model into one model per tile, e.g. for nested local models around
+        well fields. Each tile model is a copy of this model (with the same configuration and
+        aquifer properties) that contains copies of the elements inside the tile or within
+        `buffer` of it. Tile models can be written concurrently with aem_tiling.build_tiles().
+        :param tiles: The tile polygons, e.g. from aem_tiling.grid_tiles()
+        :param buffer: The far-field buffer distance around each tile
+        :return: A list of models, one per tile
+        """
+        from .aem_tiling import assign_elements
+        models = []
+        for tile_elements in assign_elements(self.elements, tiles, buffer):
+            model = copy.copy(self)
+            model.elements, model.element_dict, model.layers, model._producers = [], {}, [], []
+            model._unindexed = []
+            model.last_element_id = 0
+            store = LayerStore()
+            for el in tile_elements:
+                model.add_element(el.copy(store))
+            models.append(model)
+        return models
+
     def read_element_shapefile(self, element_name: str, rdr: Generator[Shape]) -> list[BaseElement]:
         """
         Reads a shapefile of well (WL0) elements and places them in the Model instance.
@@ -72,22 +235,136 @@ class BaseModel(Builder):
         :param element_name: the element name that keys into self.supported_elements
         :return: A list of all BaseElement objects that were read
         """
-        result = []
+        return self.add_elements(self.make_elements(element_name, rdr))
+
+    def make_elements(self, element_name: str, rdr: Generator[Shape]) -> list[BaseElement]:
+        """
+        Creates elements from a shape generator without adding them to the model. The elements
+        share one LayerStore, which defers their attribute evaluation if `self.lazy` is set.
+        :param element_name: the element name that keys into self.supported_elements
+        :param rdr: A shape generator, e.g.  aem_io.shapefile_reader
+        :return: A list of all BaseElement objects that were read
+        """
         element_collection = self.supported_elements.get(element_name, None)
         if element_collection is None:
             logging.fatal(f"No such element [{element_name}] in ModAEM models")
-        for xy, attrs in rdr:
-            element = element_collection.element_type(xy, attrs)
-            self.add_element(element)
-            result.append(element)
-        return result
+        store = LayerStore(lazy=self.lazy)
+        if self.progress is not None:
+            try:
+                total = len(rdr)
+            except TypeError:
+                total = None
+            rdr = self.progress.track(rdr, "read", element_name, total)
+        return [element_collection.element_type(xy, attrs, self.config, store) for xy, attrs in rdr]
 
     def body(self) -> Generator[Any, None, None]:
         """
         Yields up all of the entries in the model's body output.
         :return: A generator of the header elements
         """
-        for element_name, collection_type in self.supported_elements.values():
+        for element_name, collection_type in self.supported_elements.items():
             logging.info(f"Processing {element_name}")
             collection = collection_type(self.elements)
+            if self.progress is not None and len(collection) > 0:
+                tracked = self.progress.track(collection.elements, "render", element_name, len(collection))
+                collection = collection_type.from_stream(len(collection), tracked)
             yield from collection.build()
+
+    def add_layer(self, element_name: str, source: ShapeSource) -> None:
+        """
+        Registers a source layer for the streaming build. Unlike read_element_shapefile(), no
+        elements are created here; the layer is read twice by build_streaming(), once to count
+        the shapes and once to render them, so `source` must be re-iterable (e.g. a
+        aem_io.ShapefileSource or a list) rather than a one-shot generator.
+        :param element_name: the element name that keys into self.supported_elements
+        :param source: A re-iterable source of (xy, attrs) shapes
+        """
+        if element_name not in self.supported_elements:
+            logging.fatal(f"No such element [{element_name}] in ModAEM models")
+            raise ValidationError(f"No such element [{element_name}]")
+        if iter(source) is source:
+            raise ValidationError(f"Layer for [{element_name}] is a one-shot iterator; "
+                                  f"the streaming build must read it twice")
+        self.layers.append((element_name, source))
+
+    def count_layers(self) -> dict[str, int]:
+        """
+        Performs the counting pass of the streaming build: the number of shapes in the layers
+        registered for each element name. Sources that implement len() (e.g. ShapefileSource)
+        are counted without reading any geometry.
+        :return: A {element_name: count} dict
+        """
+        counts = {}
+        for element_name, source in self.layers:
+            try:
+                n = len(source)
+            except TypeError:
+                n = sum(1 for _ in source)
+            counts[element_name] = counts.get(element_name, 0) + n
+        return counts
+
+    def _stream_elements(self, element_name: str) -> Generator[BaseElement, None, None]:
+        """
+        Yields the elements of the layers registered for `element_name`, one at a time. Each
+        element receives an element_id, but is not retained by the model.
+        :param element_name: the element name that keys into self.supported_elements
+        """
+        element_type = self.supported_elements[element_name].element_type
+        for name, source in self.layers:
+            if name != element_name:
+                continue
+            for xy, attrs in source:
+                element = element_type(xy, attrs, self.config)
+                self.set_element_id(element)
+                yield element
+
+    def stream_body(self) -> Generator[Any, None, None]:
+        """
+        Yields up the model's body output, rendering the elements of the registered layers
+        straight from their sources. Elements that were added to the model directly are
+        rendered ahead of the streamed ones. Peak memory is independent of the layer sizes.
+        """
+        counts = self.count_layers()
+        last_element_id = self.last_element_id
+        for element_name, collection_type in self.supported_elements.items():
+            logging.info(f"Processing {element_name}")
+            in_memory = [el for el in self.elements if type(el) is collection_type.element_type]
+            expected = len(in_memory) + counts.get(element_name, 0)
+            streamed = 0
+
+            def elements():
+                nonlocal streamed
+                for el in chain(in_memory, self._stream_elements(element_name)):
+                    streamed += 1
+                    yield el
+
+            tracked = elements()
+            if self.progress is not None and expected > 0:
+                tracked = self.progress.track(tracked, "render", element_name, expected)
+            yield from collection_type.from_stream(expected, tracked).build()
+            if streamed != expected:
+                raise ValidationError(f"Layers for [{element_name}] yielded {streamed} elements, "
+                                      f"but {expected} were counted")
+        # Streamed elements are not retained, so a repeated build reuses the same element_ids
+        self.last_element_id = last_element_id
+
+    def build_streaming(self) -> Generator[str, None, None]:
+        """
+        The streaming counterpart of build(): yields the model input, with the elements of the
+        registered layers rendered by stream_body() instead of body().
+        """
+        yield from filter(lambda z: z is not None,
+                          chain(self.header(), self.stream_body(), self.trailer()))
+
+    def write(self, file_name: str, streaming: bool = False) -> None:
+        """
+        Writes the model input file.
+        :param file_name: The output file name
+        :param streaming: If True, use build_streaming() rather than build()
+        """
+        records = self.build_streaming() if streaming else self.build()
+        with open(file_name, "w") as f:
+            if self.progress is None:
+                f.writelines(records)
+            else:
+                self.progress.write(f, records, file_name)
@@ -0,0 +1,255 @@
+"""
+aem_helper/$/$
+
+Copyright (c) .year Vic Kelson, Kelson Engineering LLC
+All Rights Reserved
+
+Module aem_helper/post
+
+Postprocessing of model output for calibration. Head grids (Surfer ASCII grids, as written
+by ModAEM, or ESRI ASCII grids) are interpolated bilinearly to the locations of head
+targets, and the residuals (observed minus simulated heads) are summarized overall and by
+target group.
+
+The interpolation weights depend only on the target locations and the grid geometry, so
+HeadTargets computes them once per geometry and caches them. Each interpolation is then a
+gather, a multiply and a sum over packed arrays, all performed by C-level map() calls,
+with no Python code executed per target.
+
+"""
+
+from __future__ import annotations
+
+from array import array
+from dataclasses import dataclass
+from math import floor, isnan, nan, sqrt
+from operator import add, mul, sub
+from typing import Iterable, Sequence, TYPE_CHECKING
+
+from .aem_io import ValidationError
+from .aem_element import BaseElement
+
+if TYPE_CHECKING:
+    from .aem_model import BaseModel
+
+_SURFER_BLANK = 1.70141e38                  # Surfer marks blanked nodes with this value (or more)
+
+
+class HeadGrid:
+    """
+    Heads at the nodes of a regular grid, stored row by row from the southernmost row, with
+    missing nodes set to NaN
+    """
+    __slots__ = ("nx", "ny", "x0", "y0", "dx", "dy", "values")
+
+    def __init__(self, nx: int, ny: int, x0: float, y0: float, dx: float, dy: float, values: array):
+        """
+        :param nx: The number of nodes in a row
+        :param ny: The number of rows
+        :param x0: The x coordinate of the south-west node
+        :param y0: The y coordinate of the south-west node
+        :param dx: The node spacing along x
+        :param dy: The node spacing along y
+        :param values: The nx * ny heads, an array of doubles
+        """
+        if nx < 2 or ny < 2 or len(values) != nx * ny:
+            raise ValidationError(f"A head grid needs at least 2 x 2 nodes and nx * ny values, "
+                                  f"not {nx} x {ny} nodes and {len(values)} values")
+        self.nx, self.ny = nx, ny
+        self.x0, self.y0 = x0, y0
+        self.dx, self.dy = dx, dy
+        self.values = values
+
+    @property
+    def geometry(self) -> tuple[int, int, float, float, float, float]:
+        return self.nx, self.ny, self.x0, self.y0, self.dx, self.dy
+
+
+def read_surfer_grid(file_name: str) -> HeadGrid:
+    """
+    Reads a Surfer ASCII (DSAA) grid
+    """
+    with open(file_name) as f:
+        tokens = f.read().split()
+    if tokens[0] != "DSAA":
+        raise ValidationError(f"{file_name} is not a Surfer ASCII grid")
+    nx, ny = int(tokens[1]), int(tokens[2])
+    xlo, xhi, ylo, yhi = map(float, tokens[3:7])
+    values = array("d", map(float, tokens[9: 9 + nx * ny]))
+    for k, v in enumerate(values):
+        if v >= _SURFER_BLANK:
+            values[k] = nan
+    return HeadGrid(nx, ny, xlo, ylo, (xhi - xlo) / (nx - 1), (yhi - ylo) / (ny - 1), values)
+
+
+def read_ascii_grid(file_name: str) -> HeadGrid:
+    """
+    Reads an ESRI ASCII grid. The cell values become the nodes of the HeadGrid, at the cell
+    centers.
+    """
+    with open(file_name) as f:
+        tokens = f.read().split()
+    header = {}
+    k = 0
+    while tokens[k][0].isalpha():
+        header[tokens[k].lower()] = float(tokens[k + 1])
+        k += 2
+    nx, ny, cellsize = int(header["ncols"]), int(header["nrows"]), header["cellsize"]
+    x0 = header["xllcenter"] if "xllcenter" in header else header["xllcorner"] + cellsize / 2.0
+    y0 = header["yllcenter"] if "yllcenter" in header else header["yllcorner"] + cellsize / 2.0
+    nodata = header.get("nodata_value")
+    # The first row of an ESRI grid is the northernmost
+    values = array("d")
+    for row in reversed(range(ny)):
+        values.extend(map(float, tokens[k + row * nx: k + (row + 1) * nx]))
+    if nodata is not None:
+        for i, v in enumerate(values):
+            if v == nodata:
+                values[i] = nan
+    return HeadGrid(nx, ny, x0, y0, cellsize, cellsize, values)
+
+
+def read_head_grid(file_name: str) -> HeadGrid:
+    """
+    Reads a Surfer or ESRI ASCII grid, recognizing the format from its first token
+    """
+    with open(file_name) as f:
+        surfer = f.read(4) == "DSAA"
+    return read_surfer_grid(file_name) if surfer else read_ascii_grid(file_name)
+
+
+@dataclass
+class ResidualStats:
+    """
+    Summary statistics of the residuals (observed minus simulated heads) of a set of targets
+    """
+    n: int = 0                      # Targets with a simulated head
+    n_missing: int = 0              # Targets outside the grid or at blanked nodes
+    mean_error: float = nan
+    mae: float = nan                # Mean absolute error
+    rmse: float = nan
+    min: float = nan
+    max: float = nan
+    phi: float = 0.0                # Sum of squared weighted residuals
+
+    def summary(self) -> str:
+        return (f"n={self.n} missing={self.n_missing} ME={self.mean_error:.4g} MAE={self.mae:.4g} "
+                f"RMSE={self.rmse:.4g} min={self.min:.4g} max={self.max:.4g} phi={self.phi:.4g}")
+
+
+def residual_stats(residuals: Sequence[float], weights: Iterable[float]) -> ResidualStats:
+    """
+    Computes the statistics of residuals, skipping NaN (missing) values
+    """
+    stats = ResidualStats()
+    found = [(r, w) for r, w in zip(residuals, weights) if not isnan(r)]
+    stats.n_missing = len(residuals) - len(found)
+    if not found:
+        return stats
+    r = [r for r, _ in found]
+    stats.n = len(r)
+    stats.mean_error = sum(r) / stats.n
+    stats.mae = sum(map(abs, r)) / stats.n
+    stats.rmse = sqrt(sum(map(mul, r, r)) / stats.n)
+    stats.min, stats.max = min(r), max(r)
+    stats.phi = sum((w * v) ** 2 for v, w in found)
+    return stats
+
+
+class HeadTargets:
+    """
+    A set of head targets, held as columns, that can be compared with head grids.
+
+    Example, in a calibration loop:
+
+        targets = HeadTargets.from_model(model)
+        for run in runs:
+            stats = targets.statistics(read_head_grid(run.head_grid))
+            print(stats["all"].rmse, stats["upland"].rmse)
+
+    """
+
+    def __init__(self, targets: Sequence[BaseElement]):
+        """
+        :param targets: The target elements, with `name`, `head`, `group` and `weight`
+            attributes, e.g. modaem.target.HeadTargetElement
+        """
+        self.names = [el.name for el in targets]
+        self.groups = [el.group for el in targets]
+        self.x = array("d", (el.xy[0][0] for el in targets))
+        self.y = array("d", (el.xy[0][1] for el in targets))
+        self.observed = array("d", (el.head for el in targets))
+        self.weights = array("d", (el.weight for el in targets))
+        self._lookup = {}               # {grid geometry: (indices, weights, outside)}
+
+    @classmethod
+    def from_model(cls, model: BaseModel, element_name: str = "tgt") -> HeadTargets:
+        """
+        Collects the head targets of a model
+        :param model: The model
+        :param element_name: The element name of the targets in model.supported_elements
+        """
+        element_type = model.supported_elements[element_name].element_type
+        return cls([el for el in model.elements if type(el) is element_type])
+
+    def __len__(self) -> int:
+        return len(self.observed)
+
+    def lookup(self, grid: HeadGrid) -> tuple[array, array, list[int]]:
+        """
+        Returns the bilinear interpolation of the targets on the grid's geometry, cached: the
+        indices of the four surrounding nodes of each target and their weights, as arrays of
+        4 * n values, and the positions of the targets outside the grid.
+        """
+        cached = self._lookup.get(grid.geometry)
+        if cached is not None:
+            return cached
+        nx, ny, x0, y0, dx, dy = grid.geometry
+        indices, weights, outside = array("q"), array("d"), []
+        for k, (x, y) in enumerate(zip(self.x, self.y)):
+            fx, fy = (x - x0) / dx, (y - y0) / dy
+            if not (0.0 <= fx <= nx - 1 and 0.0 <= fy <= ny - 1):
+                outside.append(k)
+                indices.extend((0, 0, 0, 0))
+                weights.extend((0.0, 0.0, 0.0, 0.0))
+                continue
+            i, j = min(floor(fx), nx - 2), min(floor(fy), ny - 2)
+            tx, ty = fx - i, fy - j
+            node = j * nx + i
+            indices.extend((node, node + 1, node + nx, node + nx + 1))
+            weights.extend(((1.0 - tx) * (1.0 - ty), tx * (1.0 - ty), (1.0 - tx) * ty, tx * ty))
+        self._lookup[grid.geometry] = cached = indices, weights, outside
+        return cached
+
+    def interpolate(self, grid: HeadGrid) -> array:
+        """
+        Returns the simulated heads at the targets, NaN where a target is outside the grid or
+        next to a blanked node
+        """
+        indices, weights, outside = self.lookup(grid)
+        p = array("d", map(mul, map(grid.values.__getitem__, indices), weights))
+        heads = array("d", map(add, map(add, p[0::4], p[1::4]), map(add, p[2::4], p[3::4])))
+        for k in outside:
+            heads[k] = nan
+        return heads
+
+    def residuals(self, grid: HeadGrid) -> array:
+        """
+        Returns the residuals, observed minus simulated heads, at the targets
+        """
+        return array("d", map(sub, self.observed, self.interpolate(grid)))
+
+    def statistics(self, grid: HeadGrid) -> dict[str, ResidualStats]:
+        """
+        Returns the residual statistics of all the targets (under the key "all") and of each
+        target group
+        """
+        residuals = self.residuals(grid)
+        result = {"all": residual_stats(residuals, self.weights)}
+        members = {}
+        for k, group in enumerate(self.groups):
+            members.setdefault(group, []).append(k)
+        for group, ks in members.items():
+            result[group or "(none)"] = residual_stats(array("d", (residuals[k] for k in ks)),
+                                                      [self.weights[k] for k in ks])
+        return result
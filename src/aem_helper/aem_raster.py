@@ -0,0 +1,234 @@
+"""
+aem_helper/$/$
+
+Copyright (c) .year Vic Kelson, Kelson Engineering LLC
+All Rights Reserved
+
+Module aem_helper/raster
+
+This module reads gridded data (e.g. recharge rates) through memory-mapped files, and
+aggregates the grid cells into a bounded number of rectangular polygons by quadtree
+refinement. The polygons are produced as (xy, attrs) shapes, so they can be read into a
+model just like the shapes from aem_io.shapefile_reader.
+
+The memory-mapped format is the ESRI binary float grid: a .flt file of 32-bit floats in
+row-major order (the first row is the northernmost), with a .hdr text file that provides
+ncols, nrows, xllcorner, yllcorner, cellsize, NODATA_value and byteorder. ESRI ASCII grids
+can be converted to that format, one row at a time, with ascii_grid_to_float().
+
+"""
+
+from __future__ import annotations
+
+import heapq
+import mmap
+import pathlib
+import sys
+from array import array
+
+from .aem_io import SCALE_NONE, Shape, ShapeXy, ValidationError
+
+_NATIVE_BYTEORDER = "LSBFIRST" if sys.byteorder == "little" else "MSBFIRST"
+
+
+def _read_header(lines) -> dict[str, str]:
+    """
+    Reads "key value" header lines into a dict with lower-case keys
+    """
+    header = {}
+    for line in lines:
+        fields = line.split()
+        if len(fields) != 2:
+            break
+        header[fields[0].lower()] = fields[1]
+    return header
+
+
+class RasterGrid:
+    """
+    A memory-mapped ESRI binary float grid. Cell values are read from the mapped file on
+    demand, so the grid size is limited only by the address space.
+    """
+
+    def __init__(self, file_name: str):
+        """
+        :param file_name: The .flt file name (or the name without its extension)
+        """
+        path = pathlib.Path(file_name).with_suffix(".flt")
+        with open(path.with_suffix(".hdr")) as f:
+            header = _read_header(f)
+        self.ncols = int(header["ncols"])
+        self.nrows = int(header["nrows"])
+        self.cellsize = float(header["cellsize"])
+        self.xll = float(header.get("xllcorner", 0.0))
+        self.yll = float(header.get("yllcorner", 0.0))
+        if "xllcenter" in header:
+            self.xll = float(header["xllcenter"]) - 0.5 * self.cellsize
+            self.yll = float(header["yllcenter"]) - 0.5 * self.cellsize
+        self.nodata = float(header.get("nodata_value", -9999.0))
+        if header.get("byteorder", _NATIVE_BYTEORDER).upper() != _NATIVE_BYTEORDER:
+            raise ValidationError(f"Grid {path} has byte order {header['byteorder']}; "
+                                  f"only {_NATIVE_BYTEORDER} grids can be memory-mapped here")
+        # Round-trip the missing value through a 32-bit float so it compares equal to the cells
+        self.nodata = array("f", [self.nodata])[0]
+
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mmap) < 4 * self.ncols * self.nrows:
+            self.close()
+            raise ValidationError(f"Grid {path} is smaller than {self.nrows} x {self.ncols} cells")
+        self._buffer = memoryview(self._mmap)
+        self.values = self._buffer.cast("f")
+
+    def close(self) -> None:
+        if getattr(self, "values", None) is not None:
+            self.values.release()
+            self._buffer.release()
+            self.values = None
+        self._mmap.close()
+        self._file.close()
+
+    def __enter__(self) -> RasterGrid:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def row(self, i: int, col0: int = 0, col1: int | None = None) -> memoryview:
+        """
+        Returns a view of the cells of row `i` from column `col0` up to `col1`
+        """
+        col1 = self.ncols if col1 is None else col1
+        return self.values[i * self.ncols + col0: i * self.ncols + col1]
+
+    def block_stats(self, row0: int, col0: int, row1: int, col1: int) -> tuple[int, int, float, float, float]:
+        """
+        Summarizes the cells of the block [row0, row1) x [col0, col1).
+        :return: (cell count, valid cell count, minimum, maximum, sum) of the valid cells
+        """
+        nodata = self.nodata
+        count, lo, hi, total = 0, float("inf"), float("-inf"), 0.0
+        for i in range(row0, row1):
+            valid = [v for v in self.row(i, col0, col1) if v != nodata]
+            if valid:
+                count += len(valid)
+                lo = min(lo, min(valid))
+                hi = max(hi, max(valid))
+                total += sum(valid)
+        return (row1 - row0) * (col1 - col0), count, lo, hi, total
+
+    def block_xy(self, row0: int, col0: int, row1: int, col1: int, scale: float = SCALE_NONE) -> ShapeXy:
+        """
+        Returns the counterclockwise ring that outlines the block [row0, row1) x [col0, col1)
+        """
+        x0 = (self.xll + col0 * self.cellsize) * scale
+        x1 = (self.xll + col1 * self.cellsize) * scale
+        y0 = (self.yll + (self.nrows - row1) * self.cellsize) * scale
+        y1 = (self.yll + (self.nrows - row0) * self.cellsize) * scale
+        return [(x0, y0), (x1, y0), (x1, y1), (x0, y1)]
+
+
+def ascii_grid_to_float(asc_name: str, flt_name: str) -> None:
+    """
+    Converts an ESRI ASCII grid to an ESRI binary float grid (.flt and .hdr files) that can
+    be memory-mapped by RasterGrid. The conversion streams one row at a time.
+    :param asc_name: The ASCII grid file name
+    :param flt_name: The output .flt file name
+    """
+    flt_path = pathlib.Path(flt_name).with_suffix(".flt")
+    with open(asc_name) as f:
+        header_lines = [f.readline() for _ in range(5)]
+        line = f.readline()
+        if line.split()[0].lower() == "nodata_value":
+            header_lines.append(line)
+            line = ""
+        header = _read_header(header_lines)
+        ncols = int(header["ncols"])
+        with open(flt_path, "wb") as out:
+            pending = line.split()
+            for line in f:
+                pending.extend(line.split())
+                while len(pending) >= ncols:
+                    array("f", map(float, pending[:ncols])).tofile(out)
+                    del pending[:ncols]
+    with open(flt_path.with_suffix(".hdr"), "w") as hdr:
+        for key, value in header.items():
+            hdr.write(f"{key} {value}\n")
+        hdr.write(f"byteorder {_NATIVE_BYTEORDER}\n")
+
+
+def quadtree_blocks(grid: RasterGrid,
+                    max_blocks: int = 1000,
+                    tolerance: float = 0.0) -> list[tuple[int, int, int, int, float]]:
+    """
+    Aggregates the valid cells of a grid into rectangular blocks of similar value. Starting
+    with the whole grid, blocks that contain missing cells are split into quadrants until
+    the blocks cover exactly the valid cells; then the block with the largest range of
+    values is split until every block's range is within `tolerance`, or until there are
+    `max_blocks` blocks. Blocks that contain only missing cells are dropped. Memory use is
+    proportional to `max_blocks`, not to the grid size.
+    :param grid: The grid
+    :param max_blocks: The maximum number of blocks; this trades element count for accuracy
+    :param tolerance: The acceptable range of cell values within a block
+    :return: A list of (row0, col0, row1, col1, mean value) blocks
+    :raises ValidationError: if `max_blocks` blocks cannot cover the valid cells
+    """
+    def entry(r0: int, c0: int, r1: int, c1: int):
+        n, valid, lo, hi, total = grid.block_stats(r0, c0, r1, c1)
+        if valid == 0:
+            return None
+        # Blocks with missing cells are split first, so that the polygons follow the data
+        error = hi - lo if valid == n else float("inf")
+        return -error, r0, c0, r1, c1, total / valid
+
+    root = entry(0, 0, grid.nrows, grid.ncols)
+    heap = [root] if root is not None else []
+    done = []
+    while heap:
+        neg_error, r0, c0, r1, c1, mean = heap[0]
+        if -neg_error <= tolerance:
+            break
+        if r1 - r0 == 1 and c1 - c0 == 1:
+            done.append((r0, c0, r1, c1, mean))
+            heapq.heappop(heap)
+            continue
+        rm, cm = (r0 + r1 + 1) // 2, (c0 + c1 + 1) // 2
+        children = [entry(a, b, c, d) for a, b, c, d in ((r0, c0, rm, cm), (r0, cm, rm, c1),
+                                                         (rm, c0, r1, cm), (rm, cm, r1, c1))
+                    if a < c and b < d]
+        children = [child for child in children if child is not None]
+        # A split replaces one block with its valid quadrants
+        if len(heap) + len(done) - 1 + len(children) > max_blocks:
+            if neg_error == float("-inf"):
+                raise ValidationError(f"{max_blocks} blocks cannot cover the valid cells of the grid; "
+                                      f"the block of rows {r0}-{r1 - 1} and columns {c0}-{c1 - 1} "
+                                      f"still contains missing cells")
+            break
+        heapq.heappop(heap)
+        for child in children:
+            heapq.heappush(heap, child)
+    return done + [(r0, c0, r1, c1, mean) for _, r0, c0, r1, c1, mean in heap]
+
+
+def raster_area_sinks(grid: RasterGrid,
+                      max_elements: int = 1000,
+                      tolerance: float = 0.0,
+                      attribute: str = "RATE",
+                      scale: float = SCALE_NONE) -> list[Shape]:
+    """
+    Aggregates a grid into at most `max_elements` rectangular area-sink polygons, each with
+    the mean value of its cells. The result can be read into a model like a shapefile, e.g.
+
+        with RasterGrid("recharge.flt") as grid:
+            model.read_element_shapefile("as0", raster_area_sinks(grid, max_elements=5000))
+
+    :param grid: The grid of, e.g., recharge rates
+    :param max_elements: The maximum number of polygons
+    :param tolerance: The acceptable range of cell values within a polygon
+    :param attribute: The attribute name for the polygon value
+    :param scale: The scaling factor for x and y data
+    :return: A list of (xy, attrs) shapes
+    :raises ValidationError: if `max_elements` polygons cannot cover the valid cells
+    """
+    return [(grid.block_xy(r0, c0, r1, c1, scale), {attribute: mean})
+            for r0, c0, r1, c1, mean in quadtree_blocks(grid, max_elements, tolerance)]
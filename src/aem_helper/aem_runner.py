@@ -0,0 +1,159 @@
+"""
+aem_helper/$/$
+
+Copyright (c) .year Vic Kelson, Kelson Engineering LLC
+All Rights Reserved
+
+Module aem_helper/runner
+
+Runs a solver (ModAEM, by default) on a batch of model input files, with a bounded number
+of concurrent solves. Each solve is a subprocess, driven from a thread pool; a solve that
+fails or exceeds its timeout is retried, and the outputs of a successful solve are read
+with the aem_post readers. The wall time and the queue wait of every job are recorded.
+
+The solver command is a list of arguments in which "{input}" is replaced by the path of the
+input file and "{name}" by its name without the extension; the solver runs in the input
+file's directory. For example, the default ["modaem", "{name}"] solves "run1.aem" as
+`modaem run1`.
+
+"""
+
+from __future__ import annotations
+
+import pathlib
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable
+
+from .aem_post import read_head_grid
+
+DEFAULT_COMMAND = ["modaem", "{name}"]
+
+
+@dataclass
+class JobResult:
+    """
+    The outcome of one solve
+    """
+    input_file: str
+    status: str = "pending"         # "ok", "failed" or "timeout"
+    returncode: int | None = None
+    attempts: int = 0
+    queue_wait: float = 0.0         # Seconds from submission to the start of the first attempt
+    wall_time: float = 0.0          # Seconds spent running, over all the attempts
+    outputs: dict[str, Any] = field(default_factory=dict)       # {key: output read by its reader}
+    error: str = ""
+
+    @property
+    def ok(self) -> bool:
+        return self.status == "ok"
+
+
+def _command(command: list[str], input_path: pathlib.Path) -> list[str]:
+    return [arg.replace("{input}", str(input_path)).replace("{name}", input_path.stem) for arg in command]
+
+
+def run_job(input_file: str,
+            command: list[str] = DEFAULT_COMMAND,
+            timeout: float | None = None,
+            retries: int = 0,
+            outputs: dict[str, str] | None = None,
+            reader: Callable[[str], Any] = read_head_grid,
+            submitted: float | None = None) -> JobResult:
+    """
+    Runs the solver on one input file. The solver's stdout and stderr are written to a
+    "<name>.log" file next to the input.
+    :param input_file: The model input file
+    :param command: The solver command, with "{input}" and "{name}" placeholders
+    :param timeout: The time limit of each attempt, in seconds
+    :param retries: The number of times a failed or timed-out attempt is repeated
+    :param outputs: A {key: file name} dict of outputs to be read after a successful solve;
+        the file names may contain "{name}" and are relative to the input's directory
+    :param reader: The function that reads each output, by default aem_post.read_head_grid
+    :param submitted: The time.monotonic() at which the job was queued
+    :return: The JobResult
+    """
+    start = time.monotonic()
+    path = pathlib.Path(input_file).resolve()
+    result = JobResult(input_file, queue_wait=0.0 if submitted is None else start - submitted)
+    args = _command(command, path)
+    with open(path.with_suffix(".log"), "w") as log:
+        while result.attempts <= retries:
+            result.attempts += 1
+            t0 = time.monotonic()
+            try:
+                completed = subprocess.run(args, cwd=path.parent, stdout=log, stderr=subprocess.STDOUT,
+                                           timeout=timeout)
+                result.returncode = completed.returncode
+                result.status = "ok" if completed.returncode == 0 else "failed"
+                result.error = "" if result.ok else f"exit status {completed.returncode}"
+            except subprocess.TimeoutExpired:
+                result.status, result.returncode = "timeout", None
+                result.error = f"timed out after {timeout} s"
+            except OSError as e:
+                # The solver could not be started; retrying will not help
+                result.status, result.error = "failed", str(e)
+                result.wall_time += time.monotonic() - t0
+                break
+            result.wall_time += time.monotonic() - t0
+            if result.ok:
+                break
+            log.write(f"\naem_helper: attempt {result.attempts} {result.error}\n")
+            log.flush()
+
+    if result.ok:
+        for key, file_name in (outputs or {}).items():
+            output_path = path.parent / file_name.replace("{name}", path.stem)
+            try:
+                result.outputs[key] = reader(str(output_path))
+            except Exception as e:
+                # Any reader failure, e.g. an empty or truncated grid, fails only this job
+                result.status, result.error = "failed", f"cannot read output {output_path}: {e}"
+    return result
+
+
+def run_jobs(input_files: Iterable[str],
+             command: list[str] = DEFAULT_COMMAND,
+             max_workers: int = 4,
+             timeout: float | None = None,
+             retries: int = 0,
+             outputs: dict[str, str] | None = None,
+             reader: Callable[[str], Any] = read_head_grid) -> list[JobResult]:
+    """
+    Runs the solver on a batch of input files, at most `max_workers` at a time. See run_job()
+    for the other arguments.
+
+    Example: solve a scenario set with 8 concurrent solves, and read each head grid:
+
+        results = run_jobs(glob.glob("scenarios/*.aem"), max_workers=8, timeout=600.0,
+                           retries=1, outputs={"heads": "{name}.grd"})
+        for r in results:
+            if r.ok:
+                print(r.input_file, targets.statistics(r.outputs["heads"])["all"].rmse)
+
+    :return: The JobResults, in the order of `input_files`
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(run_job, input_file, command, timeout, retries, outputs, reader, time.monotonic())
+                   for input_file in input_files]
+        return [f.result() for f in futures]
+
+
+def summary(results: list[JobResult]) -> str:
+    """
+    Summarizes the outcome and timing of a batch, for capacity planning
+    """
+    if not results:
+        return "no jobs"
+    counts = {}
+    for r in results:
+        counts[r.status] = counts.get(r.status, 0) + 1
+    status = ", ".join(f"{n} {s}" for s, n in sorted(counts.items()))
+    wall = [r.wall_time for r in results]
+    wait = [r.queue_wait for r in results]
+    return (f"{len(results)} jobs: {status}; "
+            f"wall time mean {sum(wall) / len(wall):.2f} s, max {max(wall):.2f} s; "
+            f"queue wait mean {sum(wait) / len(wait):.2f} s, max {max(wait):.2f} s; "
+            f"{sum(r.attempts for r in results) - len(results)} retries")
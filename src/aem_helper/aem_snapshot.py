@@ -0,0 +1,79 @@
+"""
+aem_helper/$/$
+
+Copyright (c) .year Vic Kelson, Kelson Engineering LLC
+All Rights Reserved
+
+Module aem_helper/snapshot
+
+A snapshot caches a built model on disk, so that later runs (e.g. validate or diff) can
+load it instead of re-reading the source layers. The file is a pickle stream holding a
+small summary dict followed by the model itself; read_summary() loads only the summary,
+so inspecting a snapshot does not import the model classes or unpickle any elements.
+
+"""
+
+from __future__ import annotations
+
+import pickle
+from typing import Any, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .aem_model import BaseModel
+
+SNAPSHOT_FORMAT = 1
+
+
+def model_summary(model: BaseModel) -> dict[str, Any]:
+    """
+    Returns a summary of a model: its class, its element counts by element name, and the
+    number of registered streaming layers
+    """
+    counts = {}
+    for element_name, collection_type in model.supported_elements.items():
+        n = sum(1 for el in model.elements if type(el) is collection_type.element_type)
+        if n:
+            counts[element_name] = n
+    return {
+        "format": SNAPSHOT_FORMAT,
+        "model": f"{type(model).__module__}.{type(model).__qualname__}",
+        "elements": counts,
+        "layers": len(model.layers),
+        "last_element_id": model.last_element_id,
+    }
+
+
+def write_snapshot(model: BaseModel, file_name: str) -> dict[str, Any]:
+    """
+    Writes a model snapshot.
+    :param model: The model to be cached
+    :param file_name: The snapshot file name
+    :return: The summary that was written ahead of the model
+    """
+    summary = model_summary(model)
+    with open(file_name, "wb") as f:
+        pickle.dump(summary, f, protocol=pickle.HIGHEST_PROTOCOL)
+        pickle.dump(model, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return summary
+
+
+def read_summary(file_name: str) -> dict[str, Any]:
+    """
+    Reads the summary of a snapshot, without loading the model
+    """
+    with open(file_name, "rb") as f:
+        summary = pickle.load(f)
+    if not isinstance(summary, dict) or summary.get("format") != SNAPSHOT_FORMAT:
+        raise ValueError(f"{file_name} is not an aem_helper snapshot")
+    return summary
+
+
+def read_snapshot(file_name: str) -> BaseModel:
+    """
+    Loads the model from a snapshot
+    """
+    with open(file_name, "rb") as f:
+        summary = pickle.load(f)
+        if not isinstance(summary, dict) or summary.get("format") != SNAPSHOT_FORMAT:
+            raise ValueError(f"{file_name} is not an aem_helper snapshot")
+        return pickle.load(f)
@@ -0,0 +1,182 @@
+"""
+aem_helper/$/$
+
+Copyright (c) .year Vic Kelson, Kelson Engineering LLC
+All Rights Reserved
+
+Module aem_helper/tiling
+
+Spatial tiling of a regional model into local models, e.g. nested models around well
+fields. Elements are assigned to tiles through a uniform-grid spatial index, with a
+far-field buffer around each tile, and the input files of all the tiles are written
+concurrently in a process pool.
+
+"""
+
+from __future__ import annotations
+
+from math import floor, hypot, sqrt
+from typing import TYPE_CHECKING
+
+from .aem_io import ShapeXy
+from .aem_element import BaseElement
+
+if TYPE_CHECKING:
+    from .aem_model import BaseModel
+
+BBox = tuple[float, float, float, float]            # (xmin, ymin, xmax, ymax)
+
+
+def grid_tiles(xmin: float, ymin: float, xmax: float, ymax: float, nx: int, ny: int) -> list[ShapeXy]:
+    """
+    Returns the rectangular tiles of a regular nx x ny grid, row by row from the south-west
+    corner, as counterclockwise rings
+    """
+    dx, dy = (xmax - xmin) / nx, (ymax - ymin) / ny
+    tiles = []
+    for j in range(ny):
+        for i in range(nx):
+            x0, y0 = xmin + i * dx, ymin + j * dy
+            tiles.append([(x0, y0), (x0 + dx, y0), (x0 + dx, y0 + dy), (x0, y0 + dy)])
+    return tiles
+
+
+def bbox(xy: ShapeXy, buffer: float = 0.0) -> BBox:
+    xs = [x for x, _ in xy]
+    ys = [y for _, y in xy]
+    return min(xs) - buffer, min(ys) - buffer, max(xs) + buffer, max(ys) + buffer
+
+
+def coords_bbox(element: BaseElement) -> BBox:
+    """
+    Returns the bounding box of an element from its packed coordinates, without building
+    its list of (x, y) tuples
+    """
+    with element.coords as c:
+        xs, ys = c[0::2], c[1::2]
+        return min(xs), min(ys), max(xs), max(ys)
+
+
+class SpatialIndex:
+    """
+    A uniform grid of cells, each listing the items whose bounding boxes overlap it
+    """
+
+    def __init__(self, boxes: list[BBox], cell_size: float | None = None):
+        """
+        :param boxes: The bounding boxes of the items to be indexed
+        :param cell_size: The cell size; by default, the extent is divided into about as many
+            cells as there are items
+        """
+        self.boxes = boxes
+        if cell_size is None:
+            extent = bbox([(b[0], b[1]) for b in boxes] + [(b[2], b[3]) for b in boxes]) if boxes else (0, 0, 1, 1)
+            cell_size = max(extent[2] - extent[0], extent[3] - extent[1]) / max(sqrt(len(boxes)), 1.0)
+        self.cell_size = cell_size if cell_size > 0.0 else 1.0
+        self.cells = {}
+        for k, box in enumerate(boxes):
+            for cell in self._cells(box):
+                self.cells.setdefault(cell, []).append(k)
+
+    def _cells(self, box: BBox):
+        c = self.cell_size
+        for i in range(floor(box[0] / c), floor(box[2] / c) + 1):
+            for j in range(floor(box[1] / c), floor(box[3] / c) + 1):
+                yield i, j
+
+    def query(self, box: BBox) -> list[int]:
+        """
+        Returns the indices of the items whose bounding boxes overlap `box`, in index order
+        """
+        found = set()
+        for cell in self._cells(box):
+            for k in self.cells.get(cell, ()):
+                b = self.boxes[k]
+                if b[0] <= box[2] and box[0] <= b[2] and b[1] <= box[3] and box[1] <= b[3]:
+                    found.add(k)
+        return sorted(found)
+
+
+def point_in_ring(x: float, y: float, ring: ShapeXy) -> bool:
+    inside = False
+    n = len(ring)
+    for i in range(n):
+        (x0, y0), (x1, y1) = ring[i], ring[(i + 1) % n]
+        if (y0 > y) != (y1 > y) and x < x0 + (y - y0) * (x1 - x0) / (y1 - y0):
+            inside = not inside
+    return inside
+
+
+def _point_segment_distance(px: float, py: float, x0: float, y0: float, x1: float, y1: float) -> float:
+    dx, dy = x1 - x0, y1 - y0
+    length2 = dx * dx + dy * dy
+    t = 0.0 if length2 == 0.0 else max(0.0, min(1.0, ((px - x0) * dx + (py - y0) * dy) / length2))
+    return hypot(px - (x0 + t * dx), py - (y0 + t * dy))
+
+
+def _cross(ax, ay, bx, by, cx, cy, dx, dy) -> bool:
+    """
+    Returns True if the segments a-b and c-d cross at a point interior to both
+    """
+    def orient(px, py, qx, qy, rx, ry):
+        return (qx - px) * (ry - py) - (qy - py) * (rx - px)
+    return (orient(ax, ay, bx, by, cx, cy) * orient(ax, ay, bx, by, dx, dy) < 0.0 and
+            orient(cx, cy, dx, dy, ax, ay) * orient(cx, cy, dx, dy, bx, by) < 0.0)
+
+
+def within_distance(xy: ShapeXy, ring: ShapeXy, buffer: float) -> bool:
+    """
+    Returns True if any part of the point or string `xy` lies inside `ring` or within
+    `buffer` of it
+    """
+    if any(point_in_ring(x, y, ring) for x, y in xy):
+        return True
+    n = len(ring)
+    edges = [(ring[i], ring[(i + 1) % n]) for i in range(n)]
+    segments = list(zip(xy, xy[1:])) or [(xy[0], xy[0])]
+    for (ax, ay), (bx, by) in segments:
+        for (cx, cy), (dx, dy) in edges:
+            # Segments that do not cross are closest at an endpoint of one of them
+            d = min(_point_segment_distance(ax, ay, cx, cy, dx, dy),
+                    _point_segment_distance(bx, by, cx, cy, dx, dy),
+                    _point_segment_distance(cx, cy, ax, ay, bx, by),
+                    _point_segment_distance(dx, dy, ax, ay, bx, by))
+            if d <= buffer or _cross(ax, ay, bx, by, cx, cy, dx, dy):
+                return True
+    return False
+
+
+def assign_elements(elements: list[BaseElement], tiles: list[ShapeXy],
+                    buffer: float = 0.0) -> list[list[BaseElement]]:
+    """
+    Assigns elements to tiles. An element belongs to every tile that it lies in or within
+    `buffer` of, so elements in the far-field buffer are shared by neighboring tiles.
+    :param elements: The elements to be assigned
+    :param tiles: The tile polygons
+    :param buffer: The far-field buffer distance around each tile
+    :return: For each tile, the list of its elements in their original order
+    """
+    # The boxes are read from the packed coordinates; only the candidates of each tile are
+    # materialized as lists of (x, y) tuples
+    index = SpatialIndex([coords_bbox(el) for el in elements])
+    return [[elements[k] for k in index.query(bbox(tile, buffer))
+             if within_distance(elements[k].xy, tile, buffer)]
+            for tile in tiles]
+
+
+def _write_model(model: BaseModel, file_name: str) -> str:
+    model.write(file_name)
+    return file_name
+
+
+def build_tiles(models: list[BaseModel], file_names: list[str], max_workers: int | None = None) -> list[str]:
+    """
+    Writes the input files of the tile models concurrently in a process pool.
+    :param models: The tile models, e.g. from BaseModel.tile()
+    :param file_names: The output file name for each model
+    :param max_workers: The number of processes; by default, the number of CPUs
+    :return: The names of the files that were written
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(_write_model, models, file_names))
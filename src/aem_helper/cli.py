@@ -0,0 +1,216 @@
+"""
+aem_helper/$/$
+
+Copyright (c) .year Vic Kelson, Kelson Engineering LLC
+All Rights Reserved
+
+Module aem_helper/cli
+
+The aem-helper command-line entry point:
+
+    aem-helper build SCRIPT [-o OUT] [--streaming] [--snapshot FILE] [--progress]
+    aem-helper validate SCRIPT|SNAPSHOT [--tolerance T]
+    aem-helper inspect SNAPSHOT|AEM_FILE
+    aem-helper diff OLD NEW [--tolerance T] [--details N]
+    aem-helper run INPUT... [--command CMD] [-j N] [--timeout T] [--retries N]
+
+A SCRIPT is a Python file that defines a `model` (a BaseModel) at module level; a SNAPSHOT
+is a file written by `build --snapshot` (see aem_snapshot); an AEM_FILE is model input
+text. This module imports only the standard library at start-up, and each subcommand
+imports what it needs, so `--help` and `inspect` of a snapshot do not pay for pyshp or
+the model classes.
+
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import sys
+from typing import Generator, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .aem_model import BaseModel
+
+
+def _is_snapshot(file_name: str) -> bool:
+    with open(file_name, "rb") as f:
+        return f.read(1) == b"\x80"             # The pickle protocol marker
+
+
+def _run_script(file_name: str) -> BaseModel:
+    import runpy
+    namespace = runpy.run_path(file_name, run_name="__aem_helper__")
+    model = namespace.get("model")
+    if model is None:
+        raise SystemExit(f"aem-helper: {file_name} does not define a `model`")
+    return model
+
+
+def _load_model(file_name: str) -> BaseModel:
+    if _is_snapshot(file_name):
+        from .aem_snapshot import read_snapshot
+        return read_snapshot(file_name)
+    return _run_script(file_name)
+
+
+@contextlib.contextmanager
+def _progress(enabled: bool) -> Generator[None, None, None]:
+    """
+    Reports the progress of every model created in the block to stderr, if enabled, and
+    restores the previous BaseModel.progress afterwards
+    """
+    if not enabled:
+        yield
+        return
+    from .aem_events import Progress, print_progress
+    from .aem_model import BaseModel
+    previous = BaseModel.progress
+    BaseModel.progress = Progress([print_progress(sys.stderr)], interval=1.0)
+    try:
+        yield
+    finally:
+        BaseModel.progress = previous
+
+
+def cmd_build(args: argparse.Namespace) -> int:
+    with _progress(args.progress):
+        model = _run_script(args.script)
+        if args.snapshot:
+            from .aem_snapshot import write_snapshot
+            write_snapshot(model, args.snapshot)
+        if args.output:
+            model.write(args.output, streaming=args.streaming)
+        elif not args.snapshot:
+            sys.stdout.writelines(model.build_streaming() if args.streaming else model.build())
+    return 0
+
+
+def cmd_validate(args: argparse.Namespace) -> int:
+    from .aem_io import ValidationError
+    from .aem_dedup import find_coincident_points, find_duplicate_strings
+    try:
+        model = _load_model(args.model)
+    except ValidationError as e:
+        print(f"invalid element: {e}")
+        return 1
+    problems = 0
+    # Lazy elements evaluate their attributes only now; report each one that fails
+    for el in model.elements:
+        try:
+            el.evaluate()
+        except (ValidationError, NameError, SyntaxError, TypeError, ValueError, ArithmeticError) as e:
+            print(f"element {el.element_id}: {type(e).__name__}: {e}")
+            problems += 1
+    for element_name, collection_type in model.supported_elements.items():
+        collection = collection_type(model.elements)
+        validate = getattr(collection, "validate", None)
+        if validate is None:
+            continue
+        try:
+            validate()
+        except ValidationError as e:
+            print(f"{element_name}: {e}")
+            problems += 1
+    for kind, groups in (("coincident points", find_coincident_points(model.elements, args.tolerance)),
+                         ("duplicate strings", find_duplicate_strings(model.elements, args.tolerance))):
+        for group in groups:
+            print(f"{kind}: element_ids {', '.join(str(el.element_id) for el in group)}")
+            problems += 1
+    print(f"{len(model.elements)} elements, {problems} problems")
+    return 1 if problems else 0
+
+
+def cmd_inspect(args: argparse.Namespace) -> int:
+    if _is_snapshot(args.file):
+        from .aem_snapshot import read_summary
+        summary = read_summary(args.file)
+        print(f"model: {summary['model']}")
+        counts = summary["elements"]
+        if summary["layers"]:
+            print(f"streaming layers: {summary['layers']}")
+    else:
+        from .aem_diff import file_records
+        counts = {}
+        for r in file_records(args.file):
+            counts[r.block] = counts.get(r.block, 0) + 1
+    for block, n in counts.items():
+        print(f"{block}: {n}")
+    print(f"total: {sum(counts.values())}")
+    return 0
+
+
+def cmd_diff(args: argparse.Namespace) -> int:
+    from .aem_diff import diff_records, file_records, model_records
+
+    def records(file_name: str):
+        if file_name.endswith(".py") or _is_snapshot(file_name):
+            model = _load_model(file_name)
+            return lambda: model_records(model, args.tolerance)
+        return lambda: file_records(file_name, args.tolerance)
+
+    old, new = records(args.old), records(args.new)
+    report = diff_records(old, new(), args.details)
+    print(report.summary())
+    for change, block, text in report.details:
+        print(f"{change} {block}:")
+        print(text)
+    return 0 if report.identical else 1
+
+
+def cmd_run(args: argparse.Namespace) -> int:
+    import shlex
+    from .aem_runner import run_jobs, summary
+    results = run_jobs(args.inputs, shlex.split(args.command), args.jobs, args.timeout, args.retries)
+    for r in results:
+        print(f"{r.input_file}: {r.status} ({r.attempts} attempts, {r.wall_time:.2f} s){' ' + r.error if r.error else ''}")
+    print(summary(results))
+    return 0 if all(r.ok for r in results) else 1
+
+
+def make_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="aem-helper", description="Preprocessing tools for ModAEM models")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("build", help="run a model script and write the model input")
+    p.add_argument("script", help="a Python script that defines `model`")
+    p.add_argument("-o", "--output", help="the model input file; by default, it is written to stdout")
+    p.add_argument("--streaming", action="store_true", help="render the registered layers with build_streaming()")
+    p.add_argument("--snapshot", help="also cache the model in this snapshot file")
+    p.add_argument("--progress", action="store_true", help="report progress to stderr")
+    p.set_defaults(func=cmd_build)
+
+    p = commands.add_parser("validate", help="check the elements of a model script or snapshot")
+    p.add_argument("model", help="a model script or snapshot")
+    p.add_argument("--tolerance", type=float, default=1.0e-6, help="coincidence tolerance")
+    p.set_defaults(func=cmd_validate)
+
+    p = commands.add_parser("inspect", help="count the elements in a snapshot or model input file")
+    p.add_argument("file", help="a snapshot or model input file")
+    p.set_defaults(func=cmd_inspect)
+
+    p = commands.add_parser("diff", help="compare two models")
+    p.add_argument("old", help="a model input file, script or snapshot")
+    p.add_argument("new", help="a model input file, script or snapshot")
+    p.add_argument("--tolerance", type=float, default=1.0e-6, help="coordinate tolerance")
+    p.add_argument("--details", type=int, default=20, help="the number of changed records to print")
+    p.set_defaults(func=cmd_diff)
+
+    p = commands.add_parser("run", help="run the solver on model input files")
+    p.add_argument("inputs", nargs="+", help="model input files")
+    p.add_argument("--command", default="modaem {name}",
+                   help='the solver command; "{input}" is the input path, "{name}" its name without extension')
+    p.add_argument("-j", "--jobs", type=int, default=4, help="the number of concurrent solves")
+    p.add_argument("--timeout", type=float, help="the time limit of each solve, in seconds")
+    p.add_argument("--retries", type=int, default=0, help="the number of retries of a failed solve")
+    p.set_defaults(func=cmd_run)
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = make_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -10,24 +10,21 @@ $
 
 from __future__ import annotations
 import logging
-from dataclasses import dataclass
 from typing import Any, Generator
 
-from ..aem_io import ShapeXy, eval_float
+from ..aem_io import ShapeXy, ValidationError, eval_float
+from ..aem_geometry import find_overlaps, validate_ring, validate_string
 from ..aem_element import BaseElement, BaseElementCollection, BasePackage
 
 
-@dataclass
 class ReferenceField(BaseElement):
     """
     Contains the reference point of the model, if provided
     """
-    _aquifer: Aquifer | None = None # Aquifer object reference
-    xy: tuple[float, float]         # Reference point x
-    y_ref: float = 0.0              # Reference point y
-    h_ref: float = 1.0              # Reference point head
-    dhdx: float = 0.0               # Reference hydraulic gradient
-    orientation: float = 0.0        # Reference gradient orientation (in degrees)
+    __slots__ = ("_aquifer",        # Aquifer object reference
+                 "h_ref",           # Reference point head
+                 "dhdx",            # Reference hydraulic gradient
+                 "orientation")     # Reference gradient orientation (in degrees)
 
     @staticmethod
     def validate_xy(xy: ShapeXy) -> ShapeXy:
@@ -36,9 +33,10 @@ class ReferenceField(BaseElement):
         return xy[0:1]
 
     def process_attrs(self, attrs: dict[str, Any], config: dict[str, Any]) -> None:
-        self.h_ref = eval_float(attrs.get("HEAD", None), config=config)
-        self.dhdx = eval_float(attrs.get("SLOPE", None), config=config)
-        self.orientation = eval_float(attrs.get("ANGLE", None), config=config)
+        self._aquifer = None
+        self.h_ref = eval_float(attrs.get("HEAD", None), config=config, default=1.0)
+        self.dhdx = eval_float(attrs.get("SLOPE", None), config=config, default=0.0)
+        self.orientation = eval_float(attrs.get("ANGLE", None), config=config, default=0.0)
 
     def set_aquifer(self, aqu: Aquifer) -> None:
         """
@@ -58,6 +56,7 @@ class AquBoundaryElement(BaseElement):
     """
     Contains a string that makes up a portion of the outer boundary of the model
     """
+    __slots__ = ()
 
     @staticmethod
     def validate_xy(xy: ShapeXy) -> ShapeXy:
@@ -67,7 +66,7 @@ class AquBoundaryElement(BaseElement):
         :param xy:
         :return:
         """
-        ...
+        return validate_string(xy)
 
     def process_attrs(self, attrs: dict[str, Any], config: dict[str, Any]) -> None:
         """
@@ -101,16 +100,17 @@ class In0DomainElement(BaseElement):
     """
     Contains an inhomogeneity domain
     """
+    __slots__ = ()
 
     @staticmethod
     def validate_xy(xy: ShapeXy) -> ShapeXy:
         """
         Validates the (x, y) pairs for the element, raising an exception on error, and stores
-        the result in the element.
+        the result in the element. The domain is a closed, counterclockwise ring.
         :param xy:
         :return:
         """
-        ...
+        return validate_ring(xy)
 
     def process_attrs(self, attrs: dict[str, Any], config: dict[str, Any]) -> None:
         """
@@ -123,11 +123,37 @@ class In0DomainElement(BaseElement):
 
 
 class In0DomainCollection(BaseElementCollection):
+    """
+    Contains a collection of only the In0DomainElements extracted from a Model object, so
+    that the domains can be validated. The domains belong inside the AQU package, which the
+    model input does not include yet, so the collection writes nothing, and warns that its
+    domains are left out.
+    """
     element_type = In0DomainElement
-    ...
+
+    def body(self) -> Generator[str, None, None]:
+        # Consume the elements of a streamed collection, so the streaming build's count check
+        # matches the in-memory build
+        n = sum(1 for _ in self.elements)
+        if n > 0:
+            logging.warning(f"{n} inhomogeneity domains are not written to the model input: "
+                            f"the AQU package is not supported yet")
+        yield None
+
+    def validate(self) -> None:
+        """
+        Checks that the boundaries of the inhomogeneity domains do not cross one another,
+        raising a ValidationError if they do.
+        """
+        pair = find_overlaps([el.xy for el in self.elements])
+        if pair is not None:
+            i, j = pair
+            raise ValidationError(f"Inhomogeneity domains {self.elements[i].element_id} and "
+                                  f"{self.elements[j].element_id} overlap")
 
 
 class In0StringElement(BaseElement):
+    __slots__ = ()
 
     @staticmethod
     def validate_xy(xy: ShapeXy) -> ShapeXy:
@@ -137,7 +163,7 @@ class In0StringElement(BaseElement):
         :param xy:
         :return:
         """
-        ...
+        return validate_string(xy)
 
     def process_attrs(self, attrs: dict[str, Any], config: dict[str, Any]) -> None:
         """
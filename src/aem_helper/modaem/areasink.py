@@ -8,11 +8,49 @@ $
 
 """
 
-from dataclasses import dataclass
+from typing import Any, Generator
+
+from aem_helper.aem_element import BaseElement, BaseElementCollection
+from aem_helper.aem_geometry import validate_ring
+from aem_helper.aem_io import ShapeXy, eval_float, INDENT
 
-from aem_helper.aem_element import BaseElement
 
-@dataclass
 class As0Element(BaseElement):
-    ...
+    """
+    Contains an area sink: a polygon with a uniform infiltration rate (e.g. recharge). Area
+    sinks are usually generated from a recharge grid by aem_raster.raster_area_sinks().
+    """
+    __slots__ = ("rate",)
+
+    @staticmethod
+    def validate_xy(xy: ShapeXy) -> ShapeXy:
+        return validate_ring(xy)
+
+    def process_attrs(self, attrs: dict[str, Any], config: dict[str, Any]) -> None:
+        self.rate = self.intern(eval_float(attrs.get("RATE"), config=config, default=0.0))
+
+    def body(self) -> Generator[str, None, None]:
+        xy = self.xy
+        yield f"{INDENT}str {len(xy)} {self.rate} {self.element_id}\n"
+        for x, y in xy:
+            yield f"{INDENT}{INDENT}({x}, {y})\n"
+
+
+class As0Collection(BaseElementCollection):
+    """
+    Contains a collection of only the As0Elements extracted from a Model object
+    """
+    element_type = As0Element
+
+    def header(self) -> Generator[str, None, None]:
+        if len(self) > 0:
+            yield f"as0 {len(self)}\n"
+
+    def body(self) -> Generator[str, None, None]:
+        if len(self) > 0:
+            for element in self.elements:
+                yield from element.build()
 
+    def trailer(self) -> Generator[str, None, None]:
+        if len(self) > 0:
+            yield "end\n"
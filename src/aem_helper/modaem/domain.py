@@ -8,17 +8,13 @@ $
 
 """
 
-from dataclasses import dataclass
-
 from aem_helper.aem_element import BaseElement
 
 
-@dataclass
 class In0Domain(BaseElement):
-    ...
+    __slots__ = ()
 
 
-@dataclass
 class In0String(BaseElement):
-    ...
+    __slots__ = ()
 
@@ -4,25 +4,182 @@ aem_helper/$/$
 Copyright (c) .year Vic Kelson, Kelson Engineering LLC
 All Rights Reserved
 
-$
+Linesink elements, e.g. for stream networks. A linesink string is written as a "str" record
+followed by one line per vertex:
+
+    ls0 <number-of-strings>
+      str <n> <element_id>
+        (x, y) <head>
+        ...
+    end
+
+Ls0 strings are specified-head linesinks; Ls1 strings add a conductance and a width, and
+Ls2 strings add a depth as well, before the element_id. Stream networks have hundreds of
+thousands of vertices, so the collections do not render their strings element by element:
+they copy the strings of a batch into a RaggedStore and render it in a single pass.
 
 """
 
+from array import array
+from typing import Any, Generator, Iterable
+
+from aem_helper.aem_element import BaseElement, BaseElementCollection
+from aem_helper.aem_geometry import validate_string
+from aem_helper.aem_io import ShapeXy, eval_float, validate, INDENT
+
+
+class RaggedStore:
+    """
+    A ragged array of linesink strings: the x0, y0, x1, y1, ... values of all the strings
+    packed into one array of doubles, the vertex offset of each string into it (with a final
+    entry for the end of the last string), and one column of doubles per string attribute.
+    """
+    __slots__ = ("coords", "offsets", "element_ids", "columns")
+
+    def __init__(self, fields: Iterable[str]):
+        """
+        :param fields: The names of the string attributes to be stored, e.g. ("head", "width")
+        """
+        self.coords = array("d")
+        self.offsets = array("q", [0])
+        self.element_ids = []
+        self.columns = {name: array("d") for name in fields}
 
-from dataclasses import dataclass
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def append(self, el: BaseElement) -> None:
+        """
+        Appends the geometry, element_id and attributes of a linesink element
+        """
+        self.coords.frombytes(el.coords.cast("B"))
+        self.offsets.append(len(self.coords) // 2)
+        self.element_ids.append(el.element_id)
+        for name, column in self.columns.items():
+            column.append(getattr(el, name))
+
+    def render(self, string_fields: tuple[str, ...], vertex_field: str = "head") -> str:
+        """
+        Renders the strings as "str" records followed by their vertex lines.
+        :param string_fields: The attributes written on each "str" line, before the element_id
+        :param vertex_field: The attribute written on each vertex line
+        :return: The text of all the strings
+        """
+        coords, offsets = self.coords, self.offsets
+        string_columns = [self.columns[name] for name in string_fields]
+        vertex_column = self.columns[vertex_field]
+        parts = []
+        for k, element_id in enumerate(self.element_ids):
+            start, end = 2 * offsets[k], 2 * offsets[k + 1]
+            fields = "".join(f" {column[k]}" for column in string_columns)
+            parts.append(f"{INDENT}str {(end - start) // 2}{fields} {element_id}\n")
+            # One format call per vertex over the packed values, with no intermediate tuples;
+            # {!r} renders a float exactly as an f-string does
+            vertex = f"{INDENT}{INDENT}({{!r}}, {{!r}}) {vertex_column[k]}\n".format
+            parts.append("".join(map(vertex, coords[start:end:2], coords[start + 1:end:2])))
+        return "".join(parts)
 
-from aem_helper.aem_element import BaseElement
 
-@dataclass
 class Ls0Element(BaseElement):
-    ...
+    """
+    Contains a linesink string with a specified head
+    """
+    __slots__ = ("name", "head")
+    string_fields: tuple[str, ...] = ()             # The attributes on the "str" line
+
+    @staticmethod
+    def validate_xy(xy: ShapeXy) -> ShapeXy:
+        return validate_string(xy)
+
+    def process_attrs(self, attrs: dict[str, Any], config: dict[str, Any]) -> None:
+        self.name = self.intern(str(attrs.get("NAME", "")))
+        self.head = self.intern(eval_float(attrs.get("HEAD"), config=config))
+        validate(self.head, lambda z: z is not None, "Attribute HEAD is required")
+
+    def body(self) -> Generator[str, None, None]:
+        store = RaggedStore(("head",) + self.string_fields)
+        store.append(self)
+        yield store.render(self.string_fields)
+
+
+class Ls1Element(Ls0Element):
+    """
+    Contains a linesink string with a specified head, and a conductance and width for its
+    streambed resistance
+    """
+    __slots__ = ("conductance", "width")
+    string_fields = ("conductance", "width")
+
+    def process_attrs(self, attrs: dict[str, Any], config: dict[str, Any]) -> None:
+        super().process_attrs(attrs, config)
+        self.conductance = self.intern(eval_float(attrs.get("COND"), config=config))
+        self.width = self.intern(eval_float(attrs.get("WIDTH"), config=config, default=1.0))
+        validate(self.conductance, lambda z: z is not None and z > 0.0, "Attribute COND must be positive")
+        validate(self.width, lambda z: z > 0.0, "Attribute WIDTH must be positive")
+
+
+class Ls2Element(Ls1Element):
+    """
+    Contains a linesink string like Ls1Element, with the depth of the stream as well
+    """
+    __slots__ = ("depth",)
+    string_fields = ("conductance", "width", "depth")
+
+    def process_attrs(self, attrs: dict[str, Any], config: dict[str, Any]) -> None:
+        super().process_attrs(attrs, config)
+        self.depth = self.intern(eval_float(attrs.get("DEPTH"), config=config, default=0.0))
+        validate(self.depth, lambda z: z >= 0.0, "Attribute DEPTH cannot be negative")
+
+
+class LinesinkCollection(BaseElementCollection):
+    """
+    Contains a collection of linesink strings of one type. The strings are copied into a
+    RaggedStore `batch_size` at a time and rendered batch by batch, so a streamed collection
+    holds only one batch in memory.
+    """
+    keyword: str
+    batch_size: int = 4096
+
+    def header(self) -> Generator[str, None, None]:
+        if len(self) > 0:
+            yield f"{self.keyword} {len(self)}\n"
+
+    def body(self) -> Generator[str, None, None]:
+        string_fields = self.element_type.string_fields
+        fields = ("head",) + string_fields
+        store = RaggedStore(fields)
+        for element in self.elements:
+            store.append(element)
+            if len(store) == self.batch_size:
+                yield store.render(string_fields)
+                store = RaggedStore(fields)
+        if len(store) > 0:
+            yield store.render(string_fields)
+
+    def trailer(self) -> Generator[str, None, None]:
+        if len(self) > 0:
+            yield "end\n"
+
+
+class Ls0Collection(LinesinkCollection):
+    """
+    Contains a collection of only the Ls0Elements extracted from a Model object
+    """
+    element_type = Ls0Element
+    keyword = "ls0"
 
 
-@dataclass
-class Ls1Element(BaseElement):
-    ...
+class Ls1Collection(LinesinkCollection):
+    """
+    Contains a collection of only the Ls1Elements extracted from a Model object
+    """
+    element_type = Ls1Element
+    keyword = "ls1"
 
 
-@dataclass
-class Ls2Element(BaseElement):
-    ...
+class Ls2Collection(LinesinkCollection):
+    """
+    Contains a collection of only the Ls2Elements extracted from a Model object
+    """
+    element_type = Ls2Element
+    keyword = "ls2"
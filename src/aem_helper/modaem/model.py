@@ -9,14 +9,16 @@ $
 """
 
 from __future__ import annotations
-from dataclasses import dataclass
 from typing import Generator
-from math import pi
 
 from ..aem_io import Shape
 from ..aem_element import BaseElement
 from ..aem_model import BaseModel
-from .aquifer import Aquifer
+from .aquifer import Aquifer, In0DomainCollection, ReferenceField
+from .well import Wl0Collection
+from .areasink import As0Collection
+from .linesink import Ls0Collection, Ls1Collection, Ls2Collection
+from .target import HeadTargetCollection
 
 
 class Model(BaseModel):
@@ -24,6 +26,9 @@ class Model(BaseModel):
     Contains a aem_helper groundwater flow model.
     """
     last_id: int | None = None                      # The last element ID assigned in the Model
+    supported_elements = {"wl0": Wl0Collection, "as0": As0Collection,
+                          "ls0": Ls0Collection, "ls1": Ls1Collection, "ls2": Ls2Collection,
+                          "in0": In0DomainCollection, "tgt": HeadTargetCollection}
 
     def __init__(self, z_bottom: float, z_top: float,
                  k: float, n_e: float,
@@ -0,0 +1,53 @@
+"""
+aem_helper/$/$
+
+Copyright (c) .year Vic Kelson, Kelson Engineering LLC
+All Rights Reserved
+
+$
+
+"""
+
+from typing import Any, Generator
+import logging
+
+from aem_helper.aem_element import BaseElement, BaseElementCollection
+from aem_helper.aem_io import eval_float, validate, ShapeXy
+
+
+class HeadTargetElement(BaseElement):
+    """
+    Contains a head target: an observation well with a measured head, for comparison with
+    the model heads during calibration (see aem_post.HeadTargets). Targets are not part of
+    the model input.
+    """
+    __slots__ = ("name", "head", "group", "weight")
+
+    def process_attrs(self, attrs: dict[str, Any], config: dict[str, Any]) -> None:
+        self.name = self.intern(str(attrs.get("NAME", "")))
+        self.head = eval_float(attrs.get("HEAD"), config=config)
+        self.group = self.intern(str(attrs.get("GROUP", "")))
+        self.weight = self.intern(eval_float(attrs.get("WEIGHT"), config=config, default=1.0))
+        validate(self.head, lambda z: z is not None, "Attribute HEAD is required")
+        validate(self.weight, lambda z: z >= 0.0, "Attribute WEIGHT cannot be negative")
+
+    @staticmethod
+    def validate_xy(xy: ShapeXy) -> ShapeXy:
+        if len(xy) > 1:
+            logging.info("HeadTargetElement can only have one vertex - using the first")
+        return xy[0: 1]
+
+
+class HeadTargetCollection(BaseElementCollection):
+    """
+    Contains a collection of only the HeadTargetElements extracted from a Model object. It
+    writes nothing to the model input.
+    """
+    element_type = HeadTargetElement
+
+    def body(self) -> Generator[str, None, None]:
+        # Consume the elements of a streamed collection, so the streaming build's count check
+        # (and the element_ids of any streamed targets) match the in-memory build
+        for _ in self.elements:
+            pass
+        yield None
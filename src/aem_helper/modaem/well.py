@@ -8,12 +8,11 @@ $
 
 """
 
-from dataclasses import dataclass
 from typing import Any, Generator
 import logging
 
-from aem_helper.aem_element import BaseElement, BaseElementCollection
-from aem_helper.aem_io import eval_float, validate, ShapeXy
+from aem_helper.aem_element import BaseElement, BaseElementCollection, LayerStore
+from aem_helper.aem_io import eval_float, validate, ShapeXy, INDENT
 
 
 class Wl0Element(BaseElement):
@@ -23,16 +22,19 @@ class Wl0Element(BaseElement):
 
     FUTURE: Add support for partially-penetrating wells and other well options from modaem1.8
     """
+    __slots__ = ("name", "qw", "rw")
 
     def __init__(self,
                  xy: ShapeXy,
                  attrs: dict[str, Any],
-                 config=None):
-        super().__init__()
-        self.xy = self.validate_xy(xy)
-        self.name = str(attrs.get("NAME", ""))
-        self.qw = eval_float(attrs.get("QW"), config=config)
-        self.rw = attrs.get("RW")
+                 config=None,
+                 store: LayerStore | None = None):
+        super().__init__(xy, attrs, config, store)
+
+    def process_attrs(self, attrs: dict[str, Any], config: dict[str, Any]) -> None:
+        self.name = self.intern(str(attrs.get("NAME", "")))
+        self.qw = self.intern(eval_float(attrs.get("QW"), config=config))
+        self.rw = self.intern(eval_float(attrs.get("RW"), config=config))
         validate(self.rw, lambda z: z > 0.0, "Attribute RW cannot be negative")
 
     @staticmethod
@@ -44,9 +46,9 @@ class Wl0Element(BaseElement):
     def header(self):
         yield ""
 
-    def body(self, element_id) -> Generator[str, None, None]:
+    def body(self) -> Generator[str, None, None]:
         x, y = self.xy[0]
-        yield f"{INDENT}({x}, {y}) {self.qw} {self.rw} {element_id}"
+        yield f"{INDENT}({x}, {y}) {self.qw} {self.rw} {self.element_id}\n"
 
     def trailer(self):
         yield ""
@@ -58,22 +60,22 @@ class Wl0Collection(BaseElementCollection):
     """
     element_type = Wl0Element
 
-    def __init__(self, model: Model) -> None:
-        super().__init__(model)
+    def __init__(self, source_elements: list[BaseElement]) -> None:
+        super().__init__(source_elements)
 
     def header(self) -> Generator[str, None, None]:
         """
         Yields a text string for the head of the collection
         :yield: The text "wl0 <number-of-wells>?
         """
-        if len(self.elements) > 0:
-            yield f"wl0 {len(self.elements)}"
+        if len(self) > 0:
+            yield f"wl0 {len(self)}\n"
 
     def body(self) -> Generator[str, None, None]:
-        if len(self.elements) > 0:
-            for i, element in enumerate(self.elements):
+        if len(self) > 0:
+            for element in self.elements:
                 yield from element.build()
 
     def trailer(self) -> Generator[str, None, None]:
-        if len(self.elements) > 0:
-            yield f"end"
+        if len(self) > 0:
+            yield f"end\n"
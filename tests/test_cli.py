@@ -0,0 +1,95 @@
+"""
+aem_helper/$/$
+
+Copyright (c) .year Vic Kelson, Kelson Engineering LLC
+All Rights Reserved
+
+Tests for aem_helper/cli.py
+
+"""
+
+import pathlib
+import subprocess
+import sys
+
+import pytest
+
+from aem_helper import cli
+from aem_helper.modaem.model import Model
+
+SCRIPT = '''
+from aem_helper.modaem.model import Model
+model = Model(0.0, 10.0, 1.0, 0.2)
+model.read_element_shapefile("wl0", [([(0.0, 0.0)], {"NAME": "A", "QW": "1.0", "RW": "0.5"}),
+                                     ([(0.0, 0.0)], {"NAME": "B", "QW": "2.0", "RW": "0.5"}),
+                                     ([(5.0, 0.0)], {"NAME": "C", "QW": "3.0", "RW": "0.5"})])
+'''
+
+
+@pytest.fixture()
+def model_script(tmp_path) -> pathlib.Path:
+    script = tmp_path / "model.py"
+    script.write_text(SCRIPT)
+    return script
+
+
+def test_build_inspect_diff(model_script, tmp_path, capsys) -> None:
+    out, snap = tmp_path / "model.aem", tmp_path / "model.snap"
+    assert cli.main(["build", str(model_script), "-o", str(out), "--snapshot", str(snap)]) == 0
+    assert out.read_text().splitlines()[1] == "wl0 3"
+    capsys.readouterr()
+
+    assert cli.main(["inspect", str(snap)]) == 0
+    assert "wl0: 3" in capsys.readouterr().out
+    assert cli.main(["inspect", str(out)]) == 0
+    assert "wl0: 3" in capsys.readouterr().out
+
+    assert cli.main(["diff", str(out), str(snap)]) == 0
+    assert capsys.readouterr().out.startswith("identical")
+
+
+def test_build_progress_is_scoped(model_script, tmp_path, capsys) -> None:
+    out = tmp_path / "model.aem"
+    assert cli.main(["build", str(model_script), "-o", str(out), "--progress"]) == 0
+    assert f"write {out} end" in capsys.readouterr().err
+    # Models created after the command do not report to the CLI's display
+    assert Model(0.0, 10.0, 1.0, 0.2).progress is None
+
+
+def test_validate_reports_coincident_wells(model_script, capsys) -> None:
+    assert cli.main(["validate", str(model_script)]) == 1
+    assert "coincident points: element_ids 1, 2" in capsys.readouterr().out
+
+
+def test_validate_evaluates_lazy_elements(tmp_path, capsys) -> None:
+    script = tmp_path / "lazy.py"
+    script.write_text('''
+from aem_helper.modaem.model import Model
+model = Model(0.0, 10.0, 1.0, 0.2)
+model.lazy = True
+model.read_element_shapefile("wl0", [([(0.0, 0.0)], {"NAME": "A", "QW": "UNDEFINED", "RW": "0.5"}),
+                                     ([(5.0, 0.0)], {"NAME": "B", "QW": "1.0", "RW": "-1"})])
+''')
+    assert cli.main(["validate", str(script)]) == 1
+    out = capsys.readouterr().out
+    assert "element 1: NameError" in out and "element 2: ValidationError" in out
+    assert "2 elements, 2 problems" in out
+
+
+def test_validate_reports_overlapping_domains(tmp_path, capsys) -> None:
+    script = tmp_path / "domains.py"
+    script.write_text(SCRIPT + '''
+model.read_element_shapefile("in0", [([(10.0, 0.0), (20.0, 0.0), (20.0, 10.0), (10.0, 10.0)], {}),
+                                     ([(15.0, 5.0), (25.0, 5.0), (25.0, 15.0), (15.0, 15.0)], {})])
+''')
+    assert cli.main(["validate", str(script)]) == 1
+    assert "in0: Inhomogeneity domains 4 and 5 overlap" in capsys.readouterr().out
+
+
+def test_inspect_does_not_import_model(model_script, tmp_path) -> None:
+    snap = tmp_path / "model.snap"
+    cli.main(["build", str(model_script), "--snapshot", str(snap)])
+    code = ("import sys; from aem_helper import cli; cli.main(['inspect', sys.argv[1]]); "
+            "print(sorted(m for m in ('shapefile', 'aem_helper.aem_model') if m in sys.modules))")
+    result = subprocess.run([sys.executable, "-c", code, str(snap)], capture_output=True, text=True, check=True)
+    assert result.stdout.splitlines()[-1] == "[]"
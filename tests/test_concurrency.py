@@ -0,0 +1,65 @@
+"""
+aem_helper/$/$
+
+Copyright (c) .year Vic Kelson, Kelson Engineering LLC
+All Rights Reserved
+
+Stress tests for concurrent element registration in aem_helper/aem_model.py
+
+"""
+
+import pickle
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from aem_helper.modaem.model import Model
+
+N_THREADS = 8
+N_WELLS = 2000
+
+
+def layer(k: int):
+    return [([(float(i), float(k))], {"NAME": f"W{k}_{i}", "QW": "1.0", "RW": "0.5"}) for i in range(N_WELLS)]
+
+
+def test_concurrent_add_element() -> None:
+    model = Model(0.0, 10.0, 1.0, 0.2)
+
+    def work(k: int) -> None:
+        for el in model.make_elements("wl0", layer(k)):
+            model.add_element(el)
+
+    with ThreadPoolExecutor(N_THREADS) as pool:
+        list(pool.map(work, range(N_THREADS)))
+    ids = [el.element_id for el in model.elements]
+    assert sorted(ids) == list(range(1, N_THREADS * N_WELLS + 1))
+    assert len(model.element_dict) == N_THREADS * N_WELLS
+    assert model.last_element_id == N_THREADS * N_WELLS
+
+
+def test_producers_are_deterministic() -> None:
+    def build() -> list[tuple[str, int]]:
+        model = Model(0.0, 10.0, 1.0, 0.2)
+        producers = [model.producer() for _ in range(N_THREADS)]
+
+        def work(k: int) -> None:
+            time.sleep(random.random() * 0.01)
+            producers[k].read_element_shapefile("wl0", layer(k))
+
+        with ThreadPoolExecutor(N_THREADS) as pool:
+            list(pool.map(work, random.sample(range(N_THREADS), N_THREADS)))
+        assert model.commit_producers() == N_THREADS * N_WELLS
+        return [(el.name, el.element_id) for el in model.elements]
+
+    expected = [(f"W{k}_{i}", k * N_WELLS + i + 1) for k in range(N_THREADS) for i in range(N_WELLS)]
+    assert build() == expected
+    assert build() == expected
+
+
+def test_model_pickles() -> None:
+    model = Model(0.0, 10.0, 1.0, 0.2)
+    model.read_element_shapefile("wl0", layer(0)[:3])
+    clone = pickle.loads(pickle.dumps(model))
+    clone.add_element(clone.make_elements("wl0", layer(1)[:1])[0])
+    assert clone.last_element_id == 4
@@ -0,0 +1,88 @@
+"""
+aem_helper/$/$
+
+Copyright (c) .year Vic Kelson, Kelson Engineering LLC
+All Rights Reserved
+
+Tests for aem_helper/aem_dedup.py
+
+"""
+
+import random
+
+import pytest
+
+from aem_helper import aem_dedup
+from aem_helper.aem_element import BaseElement
+from aem_helper.modaem.model import Model
+
+
+class StringElement(BaseElement):
+    __slots__ = ("head",)
+
+    @staticmethod
+    def validate_xy(xy):
+        return xy
+
+    def process_attrs(self, attrs, config):
+        self.head = attrs.get("HEAD")
+
+
+def wells(*rows):
+    return [([(x, y)], {"NAME": name, "QW": qw, "RW": "0.5"}) for name, x, y, qw in rows]
+
+
+def test_coincident_wells_are_summed() -> None:
+    model = Model(0.0, 10.0, 1.0, 0.2)
+    model.read_element_shapefile("wl0", wells(("A", 0.0, 0.0, "10.0"),
+                                              ("B", 100.0, 0.0, "5.0"),
+                                              ("C", 0.0, 0.004, "20.0"),
+                                              ("D", 0.0, -0.004, "1.0")))
+    report = model.deduplicate(tolerance=0.01, rules={"qw": "sum"})
+    assert [el.name for el in model.elements] == ["A", "B"]
+    assert model.elements[0].qw == 31.0
+    assert len(report.coincident_points) == 1
+    assert len(report.removed) == 2
+    assert model.get_element("C") is None
+
+
+def test_deduplicate_keeps_lazy_elements_lazy() -> None:
+    model = Model(0.0, 10.0, 1.0, 0.2)
+    model.lazy = True
+    model.read_element_shapefile("wl0", wells(("A", 0.0, 0.0, "10.0"),
+                                              ("B", 100.0, 0.0, "UNDEFINED"),
+                                              ("C", 0.0, 0.004, "20.0")))
+    model.deduplicate(tolerance=0.01, rules={"qw": "sum"})
+    a, b = model.elements
+    assert a.evaluated and not b.evaluated
+    assert model.get_element("B") is b and model.get_element("A") is a
+    assert not b.evaluated
+
+
+def test_fail_rule() -> None:
+    model = Model(0.0, 10.0, 1.0, 0.2)
+    model.read_element_shapefile("wl0", wells(("A", 0.0, 0.0, "10.0"), ("B", 0.0, 0.0, "5.0")))
+    with pytest.raises(aem_dedup.DuplicateElementError):
+        model.deduplicate(rules={"qw": "fail"})
+
+
+def test_reversed_strings_and_vertices() -> None:
+    a = StringElement([(0.0, 0.0), (1.0, 0.0), (1.0, 1.0)], {"HEAD": 1.0}, {})
+    b = StringElement([(1.0, 1.0), (1.0, 1.0000001), (1.0, 0.0), (0.0, 0.0)], {"HEAD": 2.0}, {})
+    c = StringElement([(0.0, 0.0), (2.0, 0.0)], {"HEAD": 3.0}, {})
+    elements, report = aem_dedup.deduplicate([a, b, c], tolerance=1.0e-3, default_rule="last")
+    assert elements == [a, c]
+    assert report.removed_vertices == 1
+    assert report.duplicate_strings == [[a, b]]
+    assert a.head == 2.0
+
+
+def test_redigitized_strings() -> None:
+    rng = random.Random(28)
+    xy = [(10.0 * i + 0.37, 3.0 * (i % 3) + 0.61) for i in range(30)]
+    noisy = [(x + rng.uniform(-0.001, 0.001), y + rng.uniform(-0.001, 0.001)) for x, y in xy]
+    a = StringElement(xy, {"HEAD": 1.0}, {})
+    b = StringElement(noisy[::-1], {"HEAD": 2.0}, {})
+    # The same endpoints, but another path between them
+    c = StringElement([xy[0], (150.0, 50.0), xy[-1]], {"HEAD": 3.0}, {})
+    assert aem_dedup.find_duplicate_strings([a, b, c], tolerance=0.01) == [[a, b]]
@@ -0,0 +1,66 @@
+"""
+aem_helper/$/$
+
+Copyright (c) .year Vic Kelson, Kelson Engineering LLC
+All Rights Reserved
+
+Tests for aem_helper/aem_diff.py
+
+"""
+
+import pathlib
+import tempfile
+
+from aem_helper import aem_diff
+from aem_helper.modaem.model import Model
+
+SQUARE = [(0.0, 0.0), (10.0, 0.0), (10.0, 10.0), (0.0, 10.0)]
+
+
+def make_model(wells, rate: float = 0.001) -> Model:
+    model = Model(0.0, 10.0, 1.0, 0.2)
+    model.read_element_shapefile("wl0", [([(x, y)], {"QW": qw, "RW": "0.5"}) for x, y, qw in wells])
+    model.read_element_shapefile("as0", [(SQUARE, {"RATE": rate})])
+    return model
+
+
+def test_reordering_is_not_a_change() -> None:
+    wells = [(0.0, 0.0, "100.0"), (10.0, 0.0, "200.0"), (20.0, 0.0, "300.0")]
+    report = aem_diff.diff_models(make_model(wells), make_model(wells[::-1]))
+    assert report.identical
+
+
+def test_changes_by_type() -> None:
+    old = make_model([(0.0, 0.0, "100.0"), (10.0, 0.0, "200.0"), (20.0, 0.0, "300.0")])
+    new = make_model([(0.0, 0.0, "100.0"), (10.0, 0.0, "250.0"), (30.0, 0.0, "300.0"), (40.0, 0.0, "1.0")],
+                     rate=0.002)
+    report = aem_diff.diff_models(old, new)
+    assert report.added == {"wl0": 2}
+    assert report.removed == {"wl0": 1}
+    assert report.modified == {"wl0": 1, "as0": 1}
+    # Modified records are reported with their old version
+    assert sorted(change for change, _, _ in report.details) == ["added", "added", "modified", "modified",
+                                                               "removed", "was", "was"]
+
+
+def test_diff_files() -> None:
+    old = make_model([(0.0, 0.0, "100.0"), (10.0, 0.0, "200.0")])
+    new = make_model([(10.0, 0.0000001, "200.0"), (0.0, 0.0, "100.0")])
+    with tempfile.TemporaryDirectory() as tmpdirname:
+        old_name, new_name = pathlib.Path(tmpdirname) / "old.aem", pathlib.Path(tmpdirname) / "new.aem"
+        old.write(old_name)
+        new.write(new_name)
+        assert aem_diff.diff_files(old_name, new_name, tolerance=0.001).identical
+        assert aem_diff.diff_files(old_name, new_name, tolerance=1.0e-9).modified == {}
+        assert aem_diff.diff_files(old_name, new_name, tolerance=1.0e-9).added == {"wl0": 1}
+
+
+def test_details_are_bounded() -> None:
+    old = make_model([(0.0, 0.0, "100.0"), (10.0, 0.0, "200.0")])
+    new = make_model([(0.0, 0.0, "150.0")] + [(float(x), 5.0, "1.0") for x in range(50)])
+    report = aem_diff.diff_models(old, new, max_details=3)
+    assert report.added == {"wl0": 50}
+    assert report.removed == {"wl0": 1}
+    assert report.modified == {"wl0": 1}
+    assert [change for change, _, _ in report.details] == ["modified", "added", "added"]
+    assert aem_diff.diff_models(old, new, max_details=0).added == {"wl0": 50}
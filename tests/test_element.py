@@ -0,0 +1,62 @@
+"""
+aem_helper/$/$
+
+Copyright (c) .year Vic Kelson, Kelson Engineering LLC
+All Rights Reserved
+
+Tests for aem_helper/aem_element.py
+
+"""
+
+import pytest
+
+from aem_helper.aem_element import LayerStore
+from aem_helper.modaem.well import Wl0Element
+
+
+def test_elements_share_layer_store() -> None:
+    store = LayerStore()
+    a = Wl0Element([(1.0, 2.0)], {"NAME": "A", "QW": "100.0", "RW": "0.5"}, {}, store)
+    b = Wl0Element([(3.0, 4.0), (5.0, 6.0)], {"NAME": "", "QW": "100.0", "RW": "0.5"}, {}, store)
+    assert a.xy == [(1.0, 2.0)]
+    assert b.xy == [(3.0, 4.0)]
+    assert list(b.coords) == [3.0, 4.0]
+    assert len(store.coords) == 4
+    # Repeated attribute values are the same object
+    assert a.rw is b.rw
+    assert a.qw is b.qw
+
+
+def test_elements_are_slotted() -> None:
+    el = Wl0Element([(1.0, 2.0)], {"QW": "1.0", "RW": "0.5"})
+    assert not hasattr(el, "__dict__")
+    with pytest.raises(AttributeError):
+        el.unknown = 1.0
+
+
+def test_lazy_attributes() -> None:
+    store = LayerStore(lazy=True)
+    good = Wl0Element([(1.0, 2.0)], {"NAME": "A", "QW": "2 * Q", "RW": "0.5"}, {"Q": 50.0}, store)
+    bad = Wl0Element([(3.0, 4.0)], {"NAME": "B", "QW": "UNDEFINED", "RW": "0.5"}, {"Q": 50.0}, store)
+    assert good._row == 0 and bad._row == 1
+    assert good.qw == 100.0
+    assert good._row is None
+    assert good.name == "A"
+    # Errors in attribute expressions are raised on first access
+    with pytest.raises(NameError):
+        bad.qw
+    # A failed element stays lazy, and raises the same error again
+    assert not bad.evaluated and bad.raw_attr("NAME") == "B"
+    with pytest.raises(NameError):
+        bad.rw
+    assert "".join(good.build()) == "  (1.0, 2.0) 100.0 0.5 None\n"
+
+
+def test_intern_table_is_bounded() -> None:
+    store = LayerStore(max_interned=4)
+    assert store.intern(float("0.5")) is store.intern(float("0.5"))
+    for i in range(10):
+        store.intern(float(i) + 0.25)
+    assert len(store.values) == 4
+    # 1 and 1.0 are equal, but keep their own types
+    assert type(store.intern(1)) is int
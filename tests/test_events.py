@@ -0,0 +1,61 @@
+"""
+aem_helper/$/$
+
+Copyright (c) .year Vic Kelson, Kelson Engineering LLC
+All Rights Reserved
+
+Tests for aem_helper/aem_events.py
+
+"""
+
+import io
+import pickle
+
+from aem_helper.aem_events import Progress
+from aem_helper.modaem.model import Model
+
+WELLS = [([(float(i), 0.0)], {"NAME": f"W{i}", "QW": "1.0", "RW": "0.5"}) for i in range(10)]
+
+
+def test_track_throttles_progress_events() -> None:
+    events = []
+    progress = Progress([events.append], interval=0.0, check_every=4)
+    assert list(progress.track(range(10), "read", "wl0", 10)) == list(range(10))
+    assert [(e.kind, e.count) for e in events] == [("start", 0), ("progress", 4), ("progress", 8), ("end", 10)]
+    assert events[1].eta is not None and events[-1].total == 10
+
+    events.clear()
+    progress.interval = 3600.0
+    list(progress.track(range(10), "read", "wl0"))
+    assert [e.kind for e in events] == ["start", "end"]
+    assert events[-1].eta is None
+
+
+def test_model_events(tmp_path) -> None:
+    events = []
+    model = Model(0.0, 10.0, 1.0, 0.2)
+    model.progress = Progress([events.append])
+    model.read_element_shapefile("wl0", WELLS)
+    file_name = str(tmp_path / "model.aem")
+    model.write(file_name)
+    ends = [(e.phase, e.layer, e.count) for e in events if e.kind == "end"]
+    size = len(open(file_name).read())
+    assert ends == [("read", "wl0", 10), ("render", "wl0", 10), ("write", file_name, size)]
+    assert events[-1].bytes_written == size
+    # The progress callbacks are not part of a snapshot
+    assert pickle.loads(pickle.dumps(model)).progress is None
+
+
+def test_writes_count_their_own_bytes() -> None:
+    events = []
+    progress = Progress([events.append])
+
+    def chunks():
+        yield "abc"
+        # Another write through the same Progress, before this one ends
+        progress.write(io.StringIO(), ["0123456789"], "inner.aem")
+        yield "de"
+
+    progress.write(io.StringIO(), chunks(), "outer.aem")
+    ends = {e.layer: e.bytes_written for e in events if e.kind == "end"}
+    assert ends == {"inner.aem": 10, "outer.aem": 5}
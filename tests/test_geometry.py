@@ -0,0 +1,184 @@
+"""
+aem_helper/$/$
+
+Copyright (c) .year Vic Kelson, Kelson Engineering LLC
+All Rights Reserved
+
+Tests for aem_helper/aem_geometry.py
+
+"""
+
+import random
+from math import cos, sin, pi
+
+import pytest
+
+from aem_helper import aem_geometry
+from aem_helper.aem_io import ValidationError
+from aem_helper.modaem.aquifer import In0DomainCollection, In0DomainElement
+from aem_helper.modaem.model import Model
+
+SQUARE = [(0.0, 0.0), (1.0, 0.0), (1.0, 1.0), (0.0, 1.0)]
+
+
+def test_ring_orientation_and_closure() -> None:
+    clockwise = SQUARE[::-1] + [SQUARE[-1]]
+    xy = aem_geometry.validate_ring(clockwise)
+    assert len(xy) == 4
+    assert aem_geometry.signed_area(xy) == 1.0
+
+
+@pytest.mark.parametrize("xy", [
+    [(0.0, 0.0), (1.0, 1.0), (1.0, 0.0), (0.0, 1.0)],               # bow tie
+    [(0.0, 0.0), (2.0, 0.0), (2.0, 2.0), (1.0, 0.0), (0.0, 2.0)],   # vertex touching an edge
+    [(0.0, 0.0), (1.0, 0.0), (2.0, 0.0)],                           # zero area
+])
+def test_invalid_rings(xy) -> None:
+    with pytest.raises(ValidationError):
+        aem_geometry.validate_ring(xy)
+
+
+def test_strings() -> None:
+    assert aem_geometry.validate_string([(0.0, 0.0), (1.0, 0.0), (1.0, 0.0), (1.0, 1.0)]) == \
+        [(0.0, 0.0), (1.0, 0.0), (1.0, 1.0)]
+    with pytest.raises(ValidationError):
+        aem_geometry.validate_string([(0.0, 0.0), (2.0, 0.0), (1.0, 0.0)])      # folds back
+    with pytest.raises(ValidationError):
+        aem_geometry.validate_string([(0.0, 0.0), (2.0, 2.0), (2.0, 0.0), (0.0, 2.0)])
+
+
+def test_large_ring() -> None:
+    n = 100_000
+    ring = [(1000.0 * cos(2.0 * pi * i / n), 1000.0 * sin(2.0 * pi * i / n)) for i in range(n)]
+    assert len(aem_geometry.validate_ring(ring)) == n
+    ring[n // 2], ring[n // 2 + 1] = ring[n // 2 + 1], ring[n // 2]
+    with pytest.raises(ValidationError):
+        aem_geometry.validate_ring(ring)
+
+
+def test_domain_overlaps() -> None:
+    shifted = [(x + 0.5, y + 0.5) for x, y in SQUARE]
+    nested = [(0.25 * x + 0.1, 0.25 * y + 0.1) for x, y in SQUARE]
+    domains = In0DomainCollection([In0DomainElement(xy, {}, {}) for xy in (SQUARE, nested)])
+    domains.validate()
+    domains = In0DomainCollection([In0DomainElement(xy, {}, {}) for xy in (SQUARE, shifted)])
+    with pytest.raises(ValidationError):
+        domains.validate()
+
+
+def test_unwritten_domains_are_reported(caplog) -> None:
+    model = Model(0.0, 10.0, 1.0, 0.2)
+    model.read_element_shapefile("in0", [([(10.0, 0.0), (20.0, 0.0), (20.0, 10.0), (10.0, 10.0)], {})])
+    assert "".join(model.build()) == "aem\neod\n"
+    assert "1 inhomogeneity domains are not written" in caplog.text
+
+
+def _locate(xy, px, py) -> int:
+    """
+    Returns 1 if the point is inside the ring, 0 if it is on the boundary, -1 if outside
+    """
+    inside = False
+    for x0, y0, x1, y1 in aem_geometry._string_segments(xy, closed=True):
+        if ((x1 - x0) * (py - y0) == (y1 - y0) * (px - x0) and
+                min(x0, x1) <= px <= max(x0, x1) and min(y0, y1) <= py <= max(y0, y1)):
+            return 0
+        if (y0 > py) != (y1 > py) and px < x0 + (py - y0) * (x1 - x0) / (y1 - y0):
+            inside = not inside
+    return 1 if inside else -1
+
+
+def _on_segment(s, v) -> bool:
+    return _locate([s[:2], s[2:]], *v) == 0
+
+
+def _brute_force_overlap(rings) -> bool:
+    """
+    Checks every pair of rings: the rings overlap if their boundaries cross, or if, with
+    every segment split at the other ring's vertices, each has a piece inside the other, or
+    all the pieces are on the other's boundary
+    """
+    for m, a in enumerate(rings):
+        for b in rings[m + 1:]:
+            if any(aem_geometry.segments_cross(s, t) for s in aem_geometry._string_segments(a, closed=True)
+                   for t in aem_geometry._string_segments(b, closed=True)):
+                return True
+            where = []
+            for this, other in ((a, b), (b, a)):
+                where.append([_locate(other, *p) for s in aem_geometry._string_segments(this, closed=True)
+                              for p in aem_geometry._piece_midpoints(s, [v for v in other if _on_segment(s, v)])])
+            if (1 in where[0] and 1 in where[1]) or not any(where[0] + where[1]):
+                return True
+    return False
+
+
+def test_partial_overlap_without_crossings() -> None:
+    square = [(0, 0), (10, 0), (10, 10), (0, 10)]
+    assert aem_geometry.find_overlaps([square, [(5, 0), (15, 0), (15, 10), (5, 10)]]) == (0, 1)
+    assert aem_geometry.find_overlaps([square, square[1:] + square[:1]]) == (0, 1)
+    # Adjacent and nested domains that share edges do not overlap
+    assert aem_geometry.find_overlaps([square, [(10, 0), (20, 0), (20, 10), (10, 10)]]) is None
+    assert aem_geometry.find_overlaps([square, [(0, 0), (5, 0), (5, 5), (0, 5)]]) is None
+
+
+@pytest.mark.parametrize("rings", [
+    [[(4, 1), (6, 5), (2, 0)], [(3, 5), (0, 5), (2, 0), (4, 0), (4, 3)]],
+    [[(0, 4), (4, 1), (6, 1)], [(4, 2), (5, 6), (0, 4)], [(6, 1), (6, 3), (3, 0)]],
+])
+def test_touching_domains(rings) -> None:
+    pair = aem_geometry.find_overlaps(rings)
+    assert (pair is not None) == _brute_force_overlap(rings)
+
+
+def test_random_overlaps_match_brute_force() -> None:
+    # Small integer coordinates, so that many rings share vertices or touch one another
+    rng = random.Random(29)
+    for _ in range(500):
+        rings = []
+        while len(rings) < rng.randint(2, 4):
+            xy = [(rng.randint(0, 6), rng.randint(0, 6)) for _ in range(rng.randint(3, 5))]
+            try:
+                rings.append(aem_geometry.validate_ring(xy))
+            except ValidationError:
+                continue
+        pair = aem_geometry.find_overlaps(rings)
+        assert (pair is not None) == _brute_force_overlap(rings), rings
+        if pair is not None:
+            assert _brute_force_overlap([rings[pair[0]], rings[pair[1]]])
+
+
+def test_random_rectangles_match_brute_force() -> None:
+    # Rectangles on a coarse grid often share edges, nest, or overlap without crossing
+    rng = random.Random(31)
+    for _ in range(1000):
+        rings = []
+        for _ in range(rng.randint(2, 3)):
+            x0, x1 = sorted(rng.sample(range(5), 2))
+            y0, y1 = sorted(rng.sample(range(5), 2))
+            rings.append([(x0, y0), (x1, y0), (x1, y1), (x0, y1)])
+        pair = aem_geometry.find_overlaps(rings)
+        assert (pair is not None) == _brute_force_overlap(rings), rings
+        if pair is not None:
+            assert _brute_force_overlap([rings[pair[0]], rings[pair[1]]])
+
+
+def test_random_intersections_match_brute_force() -> None:
+    rng = random.Random(30)
+    for _ in range(500):
+        segs = [tuple(float(rng.randint(0, 8)) for _ in range(4)) for _ in range(rng.randint(2, 8))]
+        brute = [(i, j) for i in range(len(segs)) for j in range(i + 1, len(segs))
+                 if aem_geometry.segments_intersect(segs[i], segs[j])]
+        pair = aem_geometry.find_intersection(segs)
+        assert (pair is None) == (not brute), segs
+        assert pair is None or pair in brute
+
+
+def test_sweep_scales_with_north_south_strings() -> None:
+    # A zigzag string: every segment spans the full width, so each one's x range overlaps
+    # all the others, but its y range only its neighbours'
+    n = 100_000
+    xy = [(10.0 * (i % 2), float(i)) for i in range(n)]
+    assert len(aem_geometry.validate_string(xy)) == n
+    pairs = []
+    segs = aem_geometry._string_segments(xy, closed=False)
+    assert aem_geometry.find_intersection(segs, lambda i, j: pairs.append((i, j)) or False) is None
+    assert len(pairs) < 3 * n
@@ -8,7 +8,10 @@ Tests for aem_helper/aem_io.py
 
 """
 
+import json
 import pathlib
+import struct
+from array import array
 
 import pytest
 import shapefile
@@ -21,32 +24,32 @@ class TestEvalObject:
     config = {"K1": 100.0, "LAYERS": [1, 2, 3]}
 
     def test_empty_string(self):
-        assert io.eval_object("") is None
+        assert aem_io.eval_object("") is None
 
     def test_string_with_config(self):
         s = "LAYERS"
-        assert io.eval_object(s, self.config) == [1, 2, 3]
+        assert aem_io.eval_object(s, self.config) == [1, 2, 3]
 
     def test_string_with_config_and_default(self):
         s = ""
         config = {"K1": 100.0, "LAYERS": [1, 2, 3]}
-        assert io.eval_object(s, self.config, default=0) == 0
+        assert aem_io.eval_object(s, self.config, default=0) == 0
 
 
 class TestEvalFloat:
     config = {"PI": 3.14}
 
     def test_empty_string(self):
-        assert io.eval_float("") is None
+        assert aem_io.eval_float("") is None
 
     def test_empty_string_with_default(self):
-        assert io.eval_float(s="", config=self.config, default=-20.0) == -20.0
+        assert aem_io.eval_float(s="", config=self.config, default=-20.0) == -20.0
 
     def test_float_string(self):
         assert aem_io.eval_float("99.9") == 99.9
 
     def test_float_object(self):
-        assert io.eval_float(-99.9) == -99.9
+        assert aem_io.eval_float(-99.9) == -99.9
 
     def test_float_substitution(self):
         s = "2 * PI"
@@ -57,19 +60,19 @@ class TestEvalInt:
     config = {"N": 500}
 
     def test_empty_string(self):
-        assert io.eval_int(s="") is None
+        assert aem_io.eval_int(s="") is None
 
     def test_empty_string_with_default(self):
-        assert io.eval_int(s="", config=self.config, default=100) == 100
+        assert aem_io.eval_int(s="", config=self.config, default=100) == 100
 
     def test_int_string(self):
-        assert io.eval_int(s="99.9") == 99
+        assert aem_io.eval_int(s="99.9") == 99
 
     def test_int_object(self):
-        assert io.eval_int(s=7) == 7
+        assert aem_io.eval_int(s=7) == 7
 
     def test_int_substitution(self):
-        assert io.eval_int(s="N + 3", config=self.config, default=0) == 503
+        assert aem_io.eval_int(s="N + 3", config=self.config, default=0) == 503
 
 
 class TestEvalBool:
@@ -79,16 +82,16 @@ class TestEvalBool:
         assert aem_io.eval_bool(s="") is None
 
     def test_empty_string_with_default(self):
-        assert io.eval_bool(s="", config=self.config, default=False) is False
+        assert aem_io.eval_bool(s="", config=self.config, default=False) is False
 
     def test_bool_string(self):
-        assert io.eval_bool(s="True") is True
+        assert aem_io.eval_bool(s="True") is True
 
     def test_bool_object(self):
         assert aem_io.eval_bool(True or False) is True
 
     def test_bool_substitution(self):
-        assert io.eval_bool(s="TRUE", config=self.config, default=0) is True
+        assert aem_io.eval_bool(s="TRUE", config=self.config, default=0) is True
 
 
 # Test ths shapefile support
@@ -116,10 +119,153 @@ def test_read_shapefile(shapefile_config) -> None:
     Test input from a shapefile.
     :param shapefile_config: A shapefile path provided by a fixture
     """
-    rdr = io.shapefile_reader(shapefile_config, scale=io.SCALE_NONE)
+    rdr = aem_io.shapefile_reader(shapefile_config, scale=aem_io.SCALE_NONE)
     xy, attrs = next(rdr)
     assert attrs["NAME"] == "TEST"
     assert attrs["QW"] == "10000.0"
     assert attrs["RW"] == "0.5"
     assert len(xy) == 1
     assert xy[0] == (100.0, 100.0)
+
+
+def wkb(geometry_type: int, *parts, order: str = "<") -> bytes:
+    """
+    Encodes a WKB geometry; each part is a list of (x, y[, z]) tuples, or the bytes of a
+    nested geometry
+    """
+    data = struct.pack(order + "BI", 1 if order == "<" else 0, geometry_type)
+    if geometry_type % 1000 == 1:
+        return data + struct.pack(order + f"{len(parts[0])}d", *parts[0])
+    if geometry_type % 1000 == 2:
+        points = parts[0]
+        return data + struct.pack(order + "I", len(points)) + b"".join(
+            struct.pack(order + f"{len(p)}d", *p) for p in points)
+    data += struct.pack(order + "I", len(parts))
+    for part in parts:
+        if isinstance(part, bytes):
+            data += part
+        else:
+            data += struct.pack(order + "I", len(part)) + b"".join(
+                struct.pack(order + f"{len(p)}d", *p) for p in part)
+    return data
+
+
+class TestReadWkb:
+    def read(self, data: bytes, scale: float = aem_io.SCALE_NONE) -> list[float]:
+        out = array("d")
+        assert aem_io.read_wkb(data, out, scale) == len(data)
+        return list(out)
+
+    def test_point(self):
+        assert self.read(wkb(1, (1.0, 2.0))) == [1.0, 2.0]
+        assert self.read(wkb(1, (1.0, 2.0), order=">")) == [1.0, 2.0]
+
+    def test_linestring_scaled(self):
+        assert self.read(wkb(2, [(0.0, 0.0), (10.0, 20.0)]), scale=0.5) == [0.0, 0.0, 5.0, 10.0]
+
+    def test_polygon_z(self):
+        ring = [(0.0, 0.0, 9.0), (1.0, 0.0, 9.0), (1.0, 1.0, 9.0), (0.0, 0.0, 9.0)]
+        assert self.read(wkb(1003, ring)) == [0.0, 0.0, 1.0, 0.0, 1.0, 1.0, 0.0, 0.0]
+
+    def test_multipoint(self):
+        data = wkb(4, wkb(1, (1.0, 2.0)), wkb(1, (3.0, 4.0), order=">"))
+        assert self.read(data) == [1.0, 2.0, 3.0, 4.0]
+
+    def test_unsupported(self):
+        with pytest.raises(aem_io.ValidationError):
+            self.read(struct.pack("<BI", 1, 17))
+
+
+def test_shape_batch() -> None:
+    batch = aem_io.ShapeBatch(array("d", [0.0, 1.0, 2.0, 3.0, 4.0, 5.0]), array("q", [0, 1, 3]),
+                              {"NAME": ["A", "B"], "QW": [1.0, 2.0]})
+    assert list(batch.shapes()) == [([(0.0, 1.0)], {"NAME": "A", "QW": 1.0}),
+                                    ([(2.0, 3.0), (4.0, 5.0)], {"NAME": "B", "QW": 2.0})]
+
+
+def test_columnar_layer() -> None:
+    shapes = [([(0.0, 1.0)], {"NAME": "Ä1", "QW": "2 * Q", "RW": 0.5, "N": 1}),
+              ([(2.0, 3.0), (4.0, 5.0)], {"NAME": "B", "QW": "1.0", "RW": 0.25, "N": None})]
+    layer = aem_io.ColumnarLayer(shapes)
+    assert len(layer) == 2
+    # The layer is re-iterable, and packs the string and float columns
+    assert list(layer) == shapes and list(layer) == shapes
+    assert type(layer.columns["RW"]) is array and type(layer.columns["N"]) is list
+    layer.append([(6.0, 7.0)], {"NAME": "C"})
+    assert list(layer)[2] == ([(6.0, 7.0)], {"NAME": "C", "QW": None, "RW": None, "N": None})
+
+
+def test_predicate_ranges() -> None:
+    assert not aem_io._range_may_match(1, 5, "==", 6)
+    assert aem_io._range_may_match(1, 5, "==", 5)
+    assert not aem_io._range_may_match(3, 3, "!=", 3)
+    assert not aem_io._range_may_match(1, 5, ">", 5)
+    assert not aem_io._range_may_match(1, 5, "in", [0, 7])
+    # Values that cannot be compared never skip a row group
+    assert aem_io._range_may_match("a", "z", "<", 3)
+
+
+def well_table(pa, n: int = 6):
+    table = pa.table({"geometry": [wkb(1, (float(i), 0.0)) for i in range(n)],
+                      "NAME": [f"W{i}" for i in range(n)],
+                      "QW": [100.0 * i for i in range(n)]})
+    return table.replace_schema_metadata(
+        {"geo": json.dumps({"primary_column": "geometry", "columns": {"geometry": {"encoding": "WKB"}}})})
+
+
+def test_parquet_reader(tmp_path) -> None:
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+    table = well_table(pa)
+    file_name = str(tmp_path / "wells.parquet")
+    pq.write_table(table, file_name, row_group_size=2)
+
+    shapes = list(aem_io.parquet_reader(file_name))
+    assert shapes[4] == ([(4.0, 0.0)], {"NAME": "W4", "QW": 400.0})
+    shapes = list(aem_io.parquet_reader(file_name, columns=["NAME"], filters=[("QW", ">=", 300.0)]))
+    assert shapes == [([(float(i), 0.0)], {"NAME": f"W{i}"}) for i in (3, 4, 5)]
+    assert len(aem_io.ParquetSource(file_name)) == 6
+
+
+def test_parquet_row_group_skipping(tmp_path, monkeypatch) -> None:
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+    file_name = str(tmp_path / "wells.parquet")
+    pq.write_table(well_table(pa), file_name, row_group_size=2)
+    metadata = pq.ParquetFile(file_name).metadata
+    assert [aem_io._row_group_may_match(metadata.row_group(i), [("QW", ">=", 300.0)])
+            for i in range(metadata.num_row_groups)] == [False, True, True]
+
+    read = []
+    iter_batches = pq.ParquetFile.iter_batches
+
+    def spy(self, *args, row_groups=None, **kwargs):
+        read.append(row_groups)
+        return iter_batches(self, *args, row_groups=row_groups, **kwargs)
+
+    monkeypatch.setattr(pq.ParquetFile, "iter_batches", spy)
+    # Only the row groups whose QW statistics can match are read
+    shapes = list(aem_io.parquet_reader(file_name, filters=[("QW", ">=", 300.0)]))
+    assert [attrs["NAME"] for _, attrs in shapes] == ["W3", "W4", "W5"]
+    assert read == [[1, 2]]
+    # No row group is read when the statistics exclude them all
+    assert list(aem_io.parquet_reader(file_name, filters=[("QW", ">", 1000.0)])) == []
+    assert read == [[1, 2]]
+
+
+def test_arrow_reader(tmp_path) -> None:
+    pa = pytest.importorskip("pyarrow")
+    pytest.importorskip("pyarrow.ipc")
+    table = well_table(pa)
+    file_name = str(tmp_path / "wells.arrow")
+    with pa.OSFile(file_name, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        for batch in table.to_batches(max_chunksize=4):
+            writer.write_batch(batch)
+
+    # One ShapeBatch per record batch of the file
+    batches = list(aem_io.arrow_batches(file_name))
+    assert [len(batch) for batch in batches] == [4, 2]
+    shapes = list(aem_io.arrow_reader(file_name, scale=2.0))
+    assert shapes[5] == ([(10.0, 0.0)], {"NAME": "W5", "QW": 500.0})
+    shapes = list(aem_io.arrow_reader(file_name, columns=["NAME"], filters=[("QW", "in", [100.0, 500.0])]))
+    assert shapes == [([(float(i), 0.0)], {"NAME": f"W{i}"}) for i in (1, 5)]
@@ -0,0 +1,56 @@
+"""
+aem_helper/$/$
+
+Copyright (c) .year Vic Kelson, Kelson Engineering LLC
+All Rights Reserved
+
+Tests for aem_helper/modaem/linesink.py
+
+"""
+
+import pytest
+
+from aem_helper import aem_io
+from aem_helper.aem_diff import parse_records
+from aem_helper.modaem.linesink import Ls0Element, Ls2Collection, Ls2Element
+from aem_helper.modaem.model import Model
+
+STREAMS = [([(0.0, 0.0), (10.0, 0.0), (20.0, 5.0)], {"NAME": "A", "HEAD": "100.0", "COND": "2.0", "WIDTH": "5.0",
+                                                     "DEPTH": "1.5"}),
+           ([(0.0, 10.0), (10.0, 10.0)], {"NAME": "B", "HEAD": "H0 - 1", "COND": "2.0"})]
+
+
+def test_ls0_element() -> None:
+    el = Ls0Element(*STREAMS[0], {})
+    assert "".join(el.build()) == ("  str 3 None\n"
+                                   "    (0.0, 0.0) 100.0\n"
+                                   "    (10.0, 0.0) 100.0\n"
+                                   "    (20.0, 5.0) 100.0\n")
+    with pytest.raises(aem_io.ValidationError):
+        Ls0Element(STREAMS[0][0], {}, {})
+
+
+def test_ls2_collection_in_batches() -> None:
+    model = Model(0.0, 10.0, 1.0, 0.2)
+    model.config = {"H0": 90.0}
+    model.read_element_shapefile("ls2", STREAMS * 3)
+    text = "".join(model.build())
+    lines = text.splitlines()
+    assert lines[1] == "ls2 6"
+    assert lines[2] == "  str 3 2.0 5.0 1.5 1"
+    assert lines[6] == "  str 2 2.0 1.0 0.0 2"
+    assert lines[7] == "    (0.0, 10.0) 89.0"
+    assert lines[-2:] == ["end", "eod"]
+
+    # Rendering in batches gives the same text as one batch, and as element by element
+    collection = Ls2Collection(model.elements)
+    collection.batch_size = 4
+    assert "".join(collection.build()) == "\n".join(lines[1:-1]) + "\n"
+    per_element = "".join("".join(el.build()) for el in model.elements)
+    assert "".join(collection.body()) == per_element
+    assert len([r for r in parse_records([text]) if r.block == "ls2"]) == 6
+
+
+def test_ls1_requires_conductance() -> None:
+    with pytest.raises(aem_io.ValidationError):
+        Ls2Element(STREAMS[0][0], {"HEAD": "1.0"}, {})
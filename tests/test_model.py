@@ -0,0 +1,96 @@
+"""
+aem_helper/$/$
+
+Copyright (c) .year Vic Kelson, Kelson Engineering LLC
+All Rights Reserved
+
+Tests for aem_helper/aem_model.py
+
+"""
+
+import pathlib
+
+import pytest
+import shapefile
+import tempfile
+
+from aem_helper import aem_io
+from aem_helper.modaem.model import Model
+
+
+@pytest.fixture()
+def well_shapefile() -> str:
+    """
+    Prepares a shapefile with three wells in it.
+    :return: None
+    """
+    with tempfile.TemporaryDirectory() as tmpdirname:
+        shape_path = pathlib.Path(tmpdirname) / "wells"
+        w = shapefile.Writer(shape_path, shapeType=shapefile.POINT)
+        w.field("NAME", "C", 32)
+        w.field("QW", "C", 32)
+        w.field("RW", "C", 32)
+        for i in range(3):
+            w.point(100.0 * i, 50.0)
+            w.record(f"W{i}", f"{1000.0 * i}", "0.5")
+        w.close()
+        yield shape_path
+
+
+def test_shapefile_source_len(well_shapefile) -> None:
+    source = aem_io.ShapefileSource(well_shapefile)
+    assert len(source) == 3
+    assert len(list(source)) == 3
+    # The source is re-iterable
+    assert len(list(source)) == 3
+
+
+def test_streaming_matches_in_memory(well_shapefile) -> None:
+    in_memory = Model(0.0, 10.0, 1.0, 0.2)
+    in_memory.read_element_shapefile("wl0", aem_io.shapefile_reader(well_shapefile))
+    streamed = Model(0.0, 10.0, 1.0, 0.2)
+    streamed.add_layer("wl0", aem_io.ShapefileSource(well_shapefile))
+
+    text = "".join(streamed.build_streaming())
+    assert text == "".join(in_memory.build())
+    assert text.splitlines()[1] == "wl0 3"
+    assert streamed.elements == []
+    # A repeated build assigns the same element_ids
+    assert "".join(streamed.build_streaming()) == text
+
+
+def test_columnar_layer_build(well_shapefile) -> None:
+    in_memory = Model(0.0, 10.0, 1.0, 0.2)
+    in_memory.read_element_shapefile("wl0", aem_io.shapefile_reader(well_shapefile))
+    columnar = Model(0.0, 10.0, 1.0, 0.2)
+    columnar.add_layer("wl0", aem_io.ColumnarLayer(aem_io.shapefile_reader(well_shapefile)))
+    assert "".join(columnar.build_streaming()) == "".join(in_memory.build())
+
+
+def test_streaming_rejects_generators(well_shapefile) -> None:
+    model = Model(0.0, 10.0, 1.0, 0.2)
+    with pytest.raises(aem_io.ValidationError):
+        model.add_layer("wl0", aem_io.shapefile_reader(well_shapefile))
+
+
+def test_lazy_model(well_shapefile) -> None:
+    model = Model(0.0, 10.0, 1.0, 0.2)
+    model.lazy = True
+    elements = model.read_element_shapefile("wl0", aem_io.shapefile_reader(well_shapefile))
+    assert not any(el.evaluated for el in elements)
+    assert model.get_element("W2") is elements[2]
+    eager = Model(0.0, 10.0, 1.0, 0.2)
+    eager.read_element_shapefile("wl0", aem_io.shapefile_reader(well_shapefile))
+    assert "".join(model.build()) == "".join(eager.build())
+
+
+def test_lazy_names_are_indexed_without_evaluation() -> None:
+    model = Model(0.0, 10.0, 1.0, 0.2)
+    model.lazy = True
+    bad, good = model.read_element_shapefile("wl0", [([(0.0, 0.0)], {"NAME": "BAD", "QW": "UNDEFINED", "RW": "0.5"}),
+                                                     ([(1.0, 0.0)], {"NAME": "GOOD", "QW": "1.0", "RW": "0.5"})])
+    assert model.get_element("GOOD") is good
+    assert model.get_element("BAD") is bad
+    assert not bad.evaluated and not good.evaluated
+    with pytest.raises(NameError):
+        bad.qw
@@ -0,0 +1,86 @@
+"""
+aem_helper/$/$
+
+Copyright (c) .year Vic Kelson, Kelson Engineering LLC
+All Rights Reserved
+
+Tests for aem_helper/aem_post.py
+
+"""
+
+from math import isnan
+
+import pytest
+
+from aem_helper import aem_post
+from aem_helper.modaem.model import Model
+
+# Heads h = 100 + x + 2 y on the nodes x = 0, 10, 20 and y = 0, 10, which bilinear
+# interpolation reproduces exactly
+SURFER = """DSAA
+3 2
+0.0 20.0
+0.0 10.0
+100.0 140.0
+100.0 110.0 120.0
+120.0 130.0 140.0
+"""
+
+ESRI = """ncols 3
+nrows 2
+xllcorner -5.0
+yllcorner -5.0
+cellsize 10.0
+NODATA_value -9999
+120.0 130.0 -9999
+100.0 110.0 120.0
+"""
+
+TARGETS = [([(5.0, 5.0)], {"NAME": "T1", "HEAD": "116.0", "GROUP": "upland"}),
+           ([(20.0, 0.0)], {"NAME": "T2", "HEAD": "118.0", "GROUP": "upland", "WEIGHT": "2.0"}),
+           ([(0.0, 10.0)], {"NAME": "T3", "HEAD": "120.0"}),
+           ([(50.0, 0.0)], {"NAME": "T4", "HEAD": "100.0"})]
+
+
+@pytest.fixture()
+def targets() -> aem_post.HeadTargets:
+    model = Model(0.0, 10.0, 1.0, 0.2)
+    model.read_element_shapefile("tgt", TARGETS)
+    assert "".join(model.build()) == "aem\neod\n"
+    return aem_post.HeadTargets.from_model(model)
+
+
+def test_read_grids(tmp_path) -> None:
+    (tmp_path / "heads.grd").write_text(SURFER)
+    (tmp_path / "heads.asc").write_text(ESRI)
+    surfer = aem_post.read_head_grid(str(tmp_path / "heads.grd"))
+    esri = aem_post.read_head_grid(str(tmp_path / "heads.asc"))
+    assert surfer.geometry == esri.geometry == (3, 2, 0.0, 0.0, 10.0, 10.0)
+    assert list(surfer.values) == [100.0, 110.0, 120.0, 120.0, 130.0, 140.0]
+    assert isnan(esri.values[5])
+
+
+def test_interpolation_and_statistics(targets, tmp_path) -> None:
+    (tmp_path / "heads.grd").write_text(SURFER)
+    grid = aem_post.read_head_grid(str(tmp_path / "heads.grd"))
+    heads = targets.interpolate(grid)
+    assert list(heads[:3]) == [115.0, 120.0, 120.0]
+    assert isnan(heads[3])
+    assert targets.lookup(grid) is targets.lookup(grid)
+
+    stats = targets.statistics(grid)
+    assert stats["all"].n == 3 and stats["all"].n_missing == 1
+    assert stats["all"].mean_error == pytest.approx(-1.0 / 3.0)
+    assert stats["upland"].rmse == pytest.approx(((1.0 + 4.0) / 2.0) ** 0.5)
+    assert stats["upland"].phi == pytest.approx(1.0 + 16.0)
+    assert stats["(none)"].n == 1 and stats["(none)"].max == 0.0
+
+
+def test_streaming_build_with_targets() -> None:
+    model = Model(0.0, 10.0, 1.0, 0.2)
+    model.read_element_shapefile("tgt", TARGETS[:1])
+    model.read_element_shapefile("wl0", [([(1.0, 2.0)], {"NAME": "W", "QW": "1.0", "RW": "0.5"})])
+    model.add_layer("tgt", TARGETS[1:])
+    text = "".join(model.build_streaming())
+    assert text == "aem\nwl0 1\n  (1.0, 2.0) 1.0 0.5 2\nend\neod\n"
+    assert "".join(model.build_streaming()) == text
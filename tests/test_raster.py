@@ -0,0 +1,67 @@
+"""
+aem_helper/$/$
+
+Copyright (c) .year Vic Kelson, Kelson Engineering LLC
+All Rights Reserved
+
+Tests for aem_helper/aem_raster.py
+
+"""
+
+import pathlib
+
+import pytest
+import tempfile
+
+from aem_helper import aem_geometry, aem_raster
+from aem_helper.aem_io import ValidationError
+from aem_helper.modaem.model import Model
+
+
+@pytest.fixture()
+def recharge_grid() -> str:
+    """
+    Prepares a 4 x 4 ASCII grid with two recharge zones and one missing cell, and converts
+    it to a binary float grid.
+    """
+    with tempfile.TemporaryDirectory() as tmpdirname:
+        asc_path = pathlib.Path(tmpdirname) / "recharge.asc"
+        asc_path.write_text("ncols 4\nnrows 4\nxllcorner 100.0\nyllcorner 200.0\n"
+                            "cellsize 10.0\nNODATA_value -9999\n"
+                            "0.001 0.001 0.002 0.002\n0.001 0.001 0.002 0.002\n"
+                            "0.001 0.001 0.002 0.002 0.001 0.001\n0.002 -9999\n")
+        flt_path = pathlib.Path(tmpdirname) / "recharge.flt"
+        aem_raster.ascii_grid_to_float(asc_path, flt_path)
+        yield flt_path
+
+
+def test_grid_header(recharge_grid) -> None:
+    with aem_raster.RasterGrid(recharge_grid) as grid:
+        assert (grid.nrows, grid.ncols) == (4, 4)
+        assert grid.block_stats(0, 0, 4, 4)[:2] == (16, 15)
+        assert grid.block_xy(0, 0, 1, 1) == [(100.0, 230.0), (110.0, 230.0), (110.0, 240.0), (100.0, 240.0)]
+
+
+def test_quadtree_merges_zones(recharge_grid) -> None:
+    with aem_raster.RasterGrid(recharge_grid) as grid:
+        shapes = aem_raster.raster_area_sinks(grid, max_elements=100, tolerance=1.0e-6)
+    # Three uniform quadrants, and the three valid cells of the bottom-right quadrant
+    assert len(shapes) == 6
+    assert sorted(attrs["RATE"] for _, attrs in shapes) == pytest.approx([0.001] * 2 + [0.002] * 4)
+
+
+def test_element_count_is_bounded(recharge_grid) -> None:
+    model = Model(0.0, 10.0, 1.0, 0.2)
+    with aem_raster.RasterGrid(recharge_grid) as grid:
+        model.read_element_shapefile("as0", aem_raster.raster_area_sinks(grid, max_elements=6))
+    assert 1 <= len(model.elements) <= 6
+    # The blocks cover the 15 valid cells, and not the missing one
+    assert sum(aem_geometry.signed_area(el.xy) for el in model.elements) == pytest.approx(15 * 100.0)
+    text = "".join(model.build())
+    assert text.splitlines()[1] == f"as0 {len(model.elements)}"
+
+
+def test_budget_must_cover_valid_cells(recharge_grid) -> None:
+    with aem_raster.RasterGrid(recharge_grid) as grid:
+        with pytest.raises(ValidationError):
+            aem_raster.quadtree_blocks(grid, max_blocks=4)
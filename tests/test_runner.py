@@ -0,0 +1,83 @@
+"""
+aem_helper/$/$
+
+Copyright (c) .year Vic Kelson, Kelson Engineering LLC
+All Rights Reserved
+
+Tests for aem_helper/aem_runner.py
+
+"""
+
+import pathlib
+import sys
+
+import pytest
+
+from aem_helper import aem_runner
+
+# A stand-in for the solver: writes a head grid "<name>.grd"; an input that contains "fail"
+# fails on its first attempt, one that contains "hang" sleeps, and one that contains "empty"
+# writes an empty grid
+STUB = '''
+import pathlib, sys, time
+path = pathlib.Path(sys.argv[1])
+text = path.read_text()
+marker = path.with_suffix(".tried")
+if "fail" in text and not marker.exists():
+    marker.write_text("")
+    sys.exit(3)
+if "hang" in text:
+    time.sleep(10)
+if "empty" in text:
+    path.with_suffix(".grd").write_text("")
+    sys.exit(0)
+path.with_suffix(".grd").write_text("DSAA\\n2 2\\n0 1\\n0 1\\n1 1\\n1 1\\n1 1\\n")
+print("solved", path.stem)
+'''
+
+
+@pytest.fixture()
+def stub(tmp_path) -> list[str]:
+    script = tmp_path / "stub_solver.py"
+    script.write_text(STUB)
+    return [sys.executable, str(script), "{input}"]
+
+
+def make_inputs(directory: pathlib.Path, contents: list[str]) -> list[str]:
+    names = []
+    for i, text in enumerate(contents):
+        path = directory / f"run{i}.aem"
+        path.write_text(text)
+        names.append(str(path))
+    return names
+
+
+def test_run_jobs(stub, tmp_path) -> None:
+    inputs = make_inputs(tmp_path, ["aem\neod\n"] * 3 + ["fail\n"])
+    results = aem_runner.run_jobs(inputs, stub, max_workers=2, retries=1, outputs={"heads": "{name}.grd"})
+    assert [r.input_file for r in results] == inputs
+    assert all(r.ok for r in results)
+    assert [r.attempts for r in results] == [1, 1, 1, 2]
+    assert results[0].outputs["heads"].geometry == (2, 2, 0.0, 0.0, 1.0, 1.0)
+    assert "solved run0" in (tmp_path / "run0.log").read_text()
+    assert all(r.wall_time > 0.0 and r.queue_wait >= 0.0 for r in results)
+    assert aem_runner.summary(results).startswith("4 jobs: 4 ok;")
+
+
+def test_failure_and_timeout(stub, tmp_path) -> None:
+    inputs = make_inputs(tmp_path, ["fail\n", "hang\n"])
+    failed, timed_out = aem_runner.run_jobs(inputs, stub, timeout=0.5)
+    assert failed.status == "failed" and failed.returncode == 3 and failed.attempts == 1
+    assert timed_out.status == "timeout" and timed_out.outputs == {}
+
+
+def test_missing_solver(tmp_path) -> None:
+    result, = aem_runner.run_jobs(make_inputs(tmp_path, ["aem\n"]), ["no-such-solver", "{name}"], retries=2)
+    assert result.status == "failed" and result.attempts == 1
+
+
+def test_unreadable_output(stub, tmp_path) -> None:
+    inputs = make_inputs(tmp_path, ["empty\n", "aem\neod\n"])
+    empty, solved = aem_runner.run_jobs(inputs, stub, outputs={"heads": "{name}.grd"})
+    assert empty.status == "failed" and "cannot read output" in empty.error
+    assert solved.ok and "heads" in solved.outputs
@@ -0,0 +1,53 @@
+"""
+aem_helper/$/$
+
+Copyright (c) .year Vic Kelson, Kelson Engineering LLC
+All Rights Reserved
+
+Tests for aem_helper/aem_tiling.py
+
+"""
+
+import pathlib
+import tempfile
+
+from aem_helper import aem_tiling
+from aem_helper.modaem.model import Model
+
+
+def well_model() -> Model:
+    model = Model(0.0, 10.0, 1.0, 0.2)
+    model.read_element_shapefile("wl0", [([(x, 50.0)], {"NAME": f"W{x:.0f}", "QW": "100.0", "RW": "0.5"})
+                                         for x in (10.0, 45.0, 55.0, 90.0, 150.0)])
+    return model
+
+
+def test_tiles_with_buffer() -> None:
+    model = well_model()
+    tiles = aem_tiling.grid_tiles(0.0, 0.0, 100.0, 100.0, 2, 1)
+    west, east = model.tile(tiles, buffer=10.0)
+    assert [el.name for el in west.elements] == ["W10", "W45", "W55"]
+    assert [el.name for el in east.elements] == ["W45", "W55", "W90"]
+    # Tile models have their own elements and element_ids
+    assert [el.element_id for el in east.elements] == [1, 2, 3]
+    assert model.get_element("W90").element_id == 4
+    assert type(east) is Model
+
+
+def test_build_tiles() -> None:
+    models = well_model().tile(aem_tiling.grid_tiles(0.0, 0.0, 100.0, 100.0, 2, 1))
+    with tempfile.TemporaryDirectory() as tmpdirname:
+        names = [str(pathlib.Path(tmpdirname) / f"tile{i}.aem") for i in range(len(models))]
+        assert aem_tiling.build_tiles(models, names, max_workers=2) == names
+        assert [pathlib.Path(name).read_text() for name in names] == ["".join(m.build()) for m in models]
+
+
+def test_assign_elements_reads_candidate_geometry_only(monkeypatch) -> None:
+    elements = well_model().elements
+    assert aem_tiling.coords_bbox(elements[0]) == (10.0, 50.0, 10.0, 50.0)
+    fetched = []
+    xy = aem_tiling.BaseElement.xy
+    monkeypatch.setattr(aem_tiling.BaseElement, "xy", property(lambda el: fetched.append(el.name) or xy.fget(el)))
+    tile = [(0.0, 0.0), (20.0, 0.0), (20.0, 100.0), (0.0, 100.0)]
+    assert [el.name for el in aem_tiling.assign_elements(elements, [tile], buffer=5.0)[0]] == ["W10"]
+    assert "W150" not in fetched